@@ -0,0 +1,323 @@
+"""
+Офлайн-бектест: свічки (записані або з MarketSimulator) проганяються через той самий
+SignalGenerator.generate_signal, що й у бойовому режимі, з віртуальним часом
+замість Config.get_kyiv_time(). Кожен сигнал перевіряється майбутніми свічками
+в момент entry_time + duration.
+
+Запуск:
+    python backend/backtest.py --days 3 --assets EURUSD_otc,GBPJPY_otc
+    python backend/backtest.py --data recorded/ --analyzer groq --output backtest.json
+"""
+import argparse
+import asyncio
+import bisect
+import csv
+import json
+import logging
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timedelta
+from pathlib import Path
+
+import pytz
+
+sys.path.insert(0, str(Path(__file__).parent))
+
+from config import Config
+from market_simulator import Candle, MarketSimulator
+from metrics import metrics
+from screener import SignalScreener
+from signal_generator import SignalGenerator
+from usage_tracker import UsageTracker
+
+logger = logging.getLogger("signal_bot")
+
+
+def _parse_timestamp(value):
+    try:
+        return datetime.fromtimestamp(float(value), pytz.UTC)
+    except ValueError:
+        moment = datetime.fromisoformat(str(value).replace('Z', '+00:00'))
+        return moment if moment.tzinfo else pytz.UTC.localize(moment)
+
+
+def load_candles(path):
+    """Записані свічки: CSV або JSON з полями timestamp (epoch або ISO), open, high, low, close"""
+    path = Path(path)
+    with open(path, 'r', encoding='utf-8') as f:
+        rows = json.load(f) if path.suffix == '.json' else list(csv.DictReader(f))
+    candles = [
+        Candle(_parse_timestamp(row['timestamp']), float(row['open']), float(row['high']),
+                       float(row['low']), float(row['close']))
+        for row in rows
+    ]
+    candles.sort(key=lambda candle: candle.timestamp)
+    return candles
+
+
+class ReplayCandleSource:
+    """Замінник PocketOptionClient: віддає свічки, закриті на поточний віртуальний момент"""
+
+    client = True
+
+    def __init__(self, series, timeframe=60):
+        self.series = series
+        self.timeframe = timeframe
+        self.cursor = 0
+
+    async def connect(self):
+        return True
+
+    async def ensure_connected(self):
+        return True
+
+    async def disconnect(self):
+        pass
+
+    async def get_candles(self, asset, timeframe, count=50):
+        candles = self.series.get(asset, [])
+        return candles[max(0, self.cursor - count):self.cursor]
+
+
+class RuleAnalyzer:
+    """Детермінований аналізатор без мережі: напрямок за EMA, підтвердження MACD/RSI/Stochastic"""
+
+    def __init__(self):
+        self.pattern_memory = None
+        self.usage = UsageTracker()
+
+    def _signal(self, asset, indicators):
+        if indicators is None or indicators.get('ema_9') is None:
+            return None
+        direction = 'UP' if indicators['ema_9'] > indicators['ema_21'] else 'DOWN'
+        sign = 1 if direction == 'UP' else -1
+        confirmations = sum([
+            sign * indicators.get('macd_hist', 0) > 0,
+            sign * (indicators.get('rsi', 50) - 50) > 0,
+            sign * (indicators.get('stoch_k', 50) - 50) > 0,
+            sign * (indicators['price'] - indicators['ema_9']) > 0,
+        ])
+        return {
+            'asset': asset,
+            'direction': direction,
+            'confidence': round(0.6 + 0.1 * confirmations, 2),
+            'duration': 2 if indicators.get('volatility', 0) > 0.5 else 3,
+            'volatility': indicators.get('volatility', 0.0)
+        }
+
+    async def analyze_market_async(self, asset, candles_data, language='uk', indicators=None, timeframes=None):
+        return self._signal(asset, indicators)
+
+    async def analyze_batch_async(self, items, language='uk'):
+        return {item['asset']: self._signal(item['asset'], item.get('indicators')) for item in items}
+
+    def flush_cache(self):
+        pass
+
+
+class NullDataHandler:
+    """Бектест нічого не записує в data/"""
+    pattern_memory = None
+
+
+def resolve_signal(signal, now, series, starts, timeframe):
+    """Результат сигналу за майбутніми свічками: ціна відкриття на вході, закриття на виході.
+    starts - epoch-час початку кожної свічки series (для бінарного пошуку)"""
+    entry_ts = (now + timedelta(minutes=signal.get('entry_delay', 2))).timestamp()
+    exit_ts = entry_ts + float(signal.get('duration', 2)) * 60
+
+    entry_index = bisect.bisect_left(starts, entry_ts)
+    exit_index = bisect.bisect_right(starts, exit_ts - timeframe) - 1
+    if entry_index >= len(series) or exit_index < entry_index or exit_index >= len(series):
+        return None
+
+    entry_price = series[entry_index].open
+    exit_price = series[exit_index].close
+    if signal['direction'] == 'UP':
+        return exit_price > entry_price
+    return exit_price < entry_price
+
+
+async def backtest_asset(asset, series, analyzer='rules', step=None, timeframe=60, warmup=50, screener=True):
+    """Прогін одного активу; повертає сигнали з результатами та час етапів"""
+    step = step or Config.SIGNAL_INTERVAL
+    source = ReplayCandleSource({asset: series}, timeframe)
+    if analyzer == 'groq':
+        from groq_analyzer import GroqAnalyzer
+        analyzer_impl = GroqAnalyzer()
+    else:
+        analyzer_impl = RuleAnalyzer()
+    signal_screener = SignalScreener()
+    signal_screener.enabled = screener
+
+    generator = SignalGenerator(
+        pocket_client=source, analyzer=analyzer_impl, data_handler=NullDataHandler(), screener=signal_screener
+    )
+
+    starts = [candle.timestamp.timestamp() for candle in series]
+    candles_per_step = max(1, int(step // timeframe))
+    results = []
+    started = time.perf_counter()
+
+    for cursor in range(warmup, len(series), candles_per_step):
+        source.cursor = cursor
+        # Момент закриття останньої доступної свічки
+        now = series[cursor - 1].timestamp + timedelta(seconds=timeframe)
+        token = Config.set_virtual_time(now)
+        try:
+            signal = await generator.generate_signal(asset)
+        finally:
+            Config.reset_virtual_time(token)
+
+        if signal:
+            with generator._stage('resolve'):
+                outcome = resolve_signal(signal, now, series, starts, timeframe)
+            results.append({
+                'generated_at': signal['generated_at'],
+                'direction': signal['direction'],
+                'confidence': signal['confidence'],
+                'duration': signal['duration'],
+                'success': outcome
+            })
+
+    hours = len(series) * timeframe / 3600
+    return {
+        'asset': asset,
+        'candles': len(series),
+        'hours': round(hours, 2),
+        'steps': len(range(warmup, len(series), candles_per_step)),
+        'signals': results,
+        'stage_timings': generator.stage_timings,
+        'wall_time': time.perf_counter() - started
+    }
+
+
+def _run_asset(asset, options):
+    """Точка входу процесу-воркера"""
+    logging.basicConfig(level=options['log_level'], format='%(message)s')
+    logging.getLogger("signal_bot").setLevel(options['log_level'])
+    # Тисячі кроків реплею - метрики лише додали б накладних витрат
+    metrics.enabled = False
+    if options.get('data'):
+        series = load_candles(options['data'][asset])
+    else:
+        simulator = MarketSimulator(seed=options['seed'], timeframe=options['timeframe'])
+        series = simulator.candles(asset, int(options['days'] * 24 * 3600 // options['timeframe']))
+    return asyncio.run(backtest_asset(
+        asset, series, options['analyzer'], options['step'], options['timeframe'], screener=options['screener']
+    ))
+
+
+def summarize(results, wall_time):
+    """Звіт: точність, сигналів за годину, середній час етапів"""
+    report = {'assets': {}, 'stage_timings_ms': {}, 'wall_time': round(wall_time, 3)}
+    totals = {'signals': 0, 'resolved': 0, 'wins': 0, 'hours': 0.0, 'candles': 0}
+    stages = {}
+
+    for result in results:
+        resolved = [s for s in result['signals'] if s['success'] is not None]
+        wins = sum(1 for s in resolved if s['success'])
+        report['assets'][result['asset']] = {
+            'signals': len(result['signals']),
+            'resolved': len(resolved),
+            'wins': wins,
+            'win_rate': round(wins / len(resolved) * 100, 2) if resolved else None,
+            'signals_per_hour': round(len(result['signals']) / result['hours'], 3) if result['hours'] else 0.0,
+            'steps': result['steps'],
+            'wall_time': round(result['wall_time'], 3)
+        }
+        totals['signals'] += len(result['signals'])
+        totals['resolved'] += len(resolved)
+        totals['wins'] += wins
+        totals['hours'] += result['hours']
+        totals['candles'] += result['candles']
+        for name, (count, seconds) in result['stage_timings'].items():
+            stage = stages.setdefault(name, [0, 0.0])
+            stage[0] += count
+            stage[1] += seconds
+
+    report['totals'] = {
+        'signals': totals['signals'],
+        'resolved': totals['resolved'],
+        'wins': totals['wins'],
+        'win_rate': round(totals['wins'] / totals['resolved'] * 100, 2) if totals['resolved'] else None,
+        'signals_per_hour': round(totals['signals'] / totals['hours'], 3) if totals['hours'] else 0.0,
+        'simulated_hours': round(totals['hours'], 2),
+        'candles_per_second': round(totals['candles'] / wall_time, 1) if wall_time else None
+    }
+    report['stage_timings_ms'] = {
+        name: {'calls': count, 'mean': round(seconds / count * 1000, 4), 'total': round(seconds * 1000, 2)}
+        for name, (count, seconds) in stages.items()
+    }
+    return report
+
+
+def print_report(report):
+    totals = report['totals']
+    print("=" * 60)
+    print(f"📊 БЕКТЕСТ: {totals['simulated_hours']} год даних за {report['wall_time']} сек "
+          f"({totals['candles_per_second']} свічок/сек)")
+    print(f"🎯 Сигналів: {totals['signals']}, перевірено: {totals['resolved']}, "
+          f"точність: {totals['win_rate']}%, сигналів/год: {totals['signals_per_hour']}")
+    for asset, stats in report['assets'].items():
+        print(f"   • {asset}: {stats['signals']} сигналів, точність {stats['win_rate']}%, "
+              f"{stats['signals_per_hour']}/год, {stats['wall_time']} сек")
+    print("⏱️  Етапи (середнє на виклик):")
+    for name, stage in report['stage_timings_ms'].items():
+        print(f"   • {name:<11} {stage['mean']:9.4f} ms  x{stage['calls']}")
+    print("=" * 60)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Офлайн-бектест генератора сигналів")
+    parser.add_argument('--assets', default=','.join(Config.ASSETS), help="активи через кому")
+    parser.add_argument('--days', type=float, default=1.0, help="днів синтетичних свічок")
+    parser.add_argument('--data', help="тека з записаними свічками <АКТИВ>.csv або <АКТИВ>.json")
+    parser.add_argument('--timeframe', type=int, default=Config.TIMEFRAMES)
+    parser.add_argument('--step', type=int, default=Config.SIGNAL_INTERVAL, help="секунд між запусками генерації")
+    parser.add_argument('--analyzer', choices=['rules', 'groq'], default='rules')
+    parser.add_argument('--no-screener', action='store_true')
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--output', help="JSON-файл для звіту")
+    parser.add_argument('--log-level', default='ERROR')
+    args = parser.parse_args()
+
+    assets = [asset.strip() for asset in args.assets.split(',') if asset.strip()]
+    options = {
+        'days': args.days,
+        'timeframe': args.timeframe,
+        'step': args.step,
+        'analyzer': args.analyzer,
+        'screener': not args.no_screener,
+        'seed': args.seed,
+        'log_level': args.log_level.upper(),
+        'data': None
+    }
+    if args.data:
+        files = {path.stem: path for path in Path(args.data).iterdir() if path.suffix in ('.csv', '.json')}
+        missing = [asset for asset in assets if asset not in files]
+        if missing:
+            parser.error(f"немає записаних свічок для: {', '.join(missing)}")
+        options['data'] = {asset: str(files[asset]) for asset in assets}
+
+    started = time.perf_counter()
+    workers = max(1, min(args.workers, len(assets)))
+    if workers > 1:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            results = list(pool.map(_run_asset, assets, [options] * len(assets)))
+    else:
+        results = [_run_asset(asset, options) for asset in assets]
+
+    report = summarize(results, time.perf_counter() - started)
+    print_report(report)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2, ensure_ascii=False)
+        print(f"💾 Звіт збережено: {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,150 @@
+import logging
+import math
+import time
+from bisect import bisect_left
+from collections.abc import Sequence
+from datetime import datetime
+
+logger = logging.getLogger("signal_bot")
+
+
+def candle_timestamp(candle):
+    """Мітка часу свічки в секундах epoch"""
+    ts = candle.timestamp
+    if isinstance(ts, datetime):
+        return int(ts.timestamp())
+    return int(ts)
+
+
+class CandleWindow(Sequence):
+    """Вікно лише для читання поверх кільцевого буфера (без копіювання)"""
+    __slots__ = ('_buffer', '_start_seq', '_length')
+
+    def __init__(self, buffer, start_seq, length):
+        self._buffer = buffer
+        self._start_seq = start_seq
+        self._length = length
+
+    def __len__(self):
+        return self._length
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(self._length))]
+        if index < 0:
+            index += self._length
+        if not 0 <= index < self._length:
+            raise IndexError("індекс поза вікном свічок")
+        return self._buffer._get(self._start_seq + index)
+
+    def __repr__(self):
+        return f"CandleWindow(len={self._length})"
+
+
+class CandleRingBuffer:
+    """Кільцевий буфер свічок фіксованого розміру, впорядкований за часом"""
+
+    def __init__(self, capacity):
+        self.capacity = capacity
+        self._items = [None] * capacity
+        self._timestamps = [0] * capacity
+        self._first_seq = 0  # порядковий номер найстаршої свічки
+        self._next_seq = 0   # порядковий номер наступної свічки
+
+    def __len__(self):
+        return self._next_seq - self._first_seq
+
+    @property
+    def last_timestamp(self):
+        if not len(self):
+            return None
+        return self._timestamps[(self._next_seq - 1) % self.capacity]
+
+    def _get(self, seq):
+        if seq < self._first_seq or seq >= self._next_seq:
+            raise RuntimeError("вікно свічок застаріло: буфер перезаписано")
+        return self._items[seq % self.capacity]
+
+    def _find_seq(self, ts):
+        """Бінарний пошук свічки за часом, повертає seq або None"""
+        seqs = range(self._first_seq, self._next_seq)
+        pos = bisect_left(seqs, ts, key=lambda seq: self._timestamps[seq % self.capacity])
+        if pos < len(seqs) and self._timestamps[seqs[pos] % self.capacity] == ts:
+            return seqs[pos]
+        return None
+
+    def _append(self, ts, candle):
+        slot = self._next_seq % self.capacity
+        self._items[slot] = candle
+        self._timestamps[slot] = ts
+        self._next_seq += 1
+        if len(self) > self.capacity:
+            self._first_seq += 1
+
+    def merge(self, candles):
+        """Додає свічки, оновлюючи дублікати за часом. Повертає кількість нових"""
+        added = 0
+        for candle in sorted(candles, key=candle_timestamp):
+            ts = candle_timestamp(candle)
+            last_ts = self.last_timestamp
+
+            if last_ts is None or ts > last_ts:
+                self._append(ts, candle)
+                added += 1
+            else:
+                # Перекриття: оновлюємо вже відому свічку (могла бути незакритою)
+                seq = self._find_seq(ts)
+                if seq is not None:
+                    self._items[seq % self.capacity] = candle
+        return added
+
+    def window(self, count):
+        """Останні count свічок як вікно лише для читання"""
+        length = min(count, len(self))
+        return CandleWindow(self, self._next_seq - length, length)
+
+
+class CandleCache:
+    """Кеш свічок по активах із інкрементальним дозавантаженням"""
+
+    def __init__(self, capacity=200):
+        self.capacity = capacity
+        self._buffers = {}
+        self.stats = {
+            'full_fetches': 0,
+            'incremental_fetches': 0,
+            'requested_candles': 0,
+            'new_candles': 0
+        }
+
+    def buffer(self, asset, timeframe):
+        key = (asset, timeframe)
+        if key not in self._buffers:
+            self._buffers[key] = CandleRingBuffer(self.capacity)
+        return self._buffers[key]
+
+    def missing_count(self, asset, timeframe, count, now=None):
+        """Скільки свічок треба запросити, щоб мати актуальне вікно з count свічок"""
+        buffer = self.buffer(asset, timeframe)
+        if len(buffer) < count:
+            self.stats['full_fetches'] += 1
+            self.stats['requested_candles'] += count
+            return count
+
+        now = now if now is not None else time.time()
+        elapsed = max(0, now - buffer.last_timestamp)
+        # +1 свічка перекриття: остання могла бути ще не закритою
+        missing = min(count, math.floor(elapsed / timeframe) + 1)
+        self.stats['incremental_fetches'] += 1
+        self.stats['requested_candles'] += missing
+        return missing
+
+    def merge(self, asset, timeframe, candles):
+        added = self.buffer(asset, timeframe).merge(candles)
+        self.stats['new_candles'] += added
+        return added
+
+    def window(self, asset, timeframe, count):
+        """Копія останніх count свічок: вікно-подання зсунулося б після наступного merge,
+        а потоковий режим і тригери дописують у кеш, поки викликач ще працює зі свічками"""
+        return list(self.buffer(asset, timeframe).window(count))
@@ -3,6 +3,7 @@ import sys
 import json
 import re
 import logging
+from contextvars import ContextVar
 from pathlib import Path
 from dotenv import load_dotenv
 from datetime import datetime
@@ -16,40 +17,149 @@ logger = logging.getLogger("signal_bot")
 
 BASE_DIR = Path(__file__).parent.parent
 
+# Віртуальний час бектесту (свій для кожної задачі asyncio)
+_virtual_now = ContextVar('virtual_now', default=None)
+
 class Config:
     # Pocket Option
     POCKET_SSID = os.getenv('POCKET_SSID')
     POCKET_DEMO = os.getenv('POCKET_DEMO', 'true').lower() == 'true'
+    POCKET_WS_URL = os.getenv('POCKET_WS_URL', '')  # власний wss-сервер (напр. benchmarks/pocket_stub.py)
+    
+    # Підключення: повтори з експоненційною затримкою, готовність за подією автентифікації
+    POCKET_CONNECT_ATTEMPTS = int(os.getenv('POCKET_CONNECT_ATTEMPTS', 3))
+    POCKET_RECONNECT_DELAY = float(os.getenv('POCKET_RECONNECT_DELAY', 1.0))  # секунд, перша затримка
+    POCKET_RECONNECT_MAX_DELAY = float(os.getenv('POCKET_RECONNECT_MAX_DELAY', 30.0))
+    POCKET_READY_TIMEOUT = float(os.getenv('POCKET_READY_TIMEOUT', 10.0))  # очікування автентифікації/балансу
+    POCKET_LIVENESS_TTL = float(os.getenv('POCKET_LIVENESS_TTL', 60.0))  # секунд без повторної перевірки балансу
+    
+    # Пул сесій PocketOption (активи розподіляються між сесіями)
+    # SSID містять коми, тому роздільник - '|'; порожньо - лише POCKET_SSID
+    POCKET_SSIDS = [ssid.strip() for ssid in os.getenv('POCKET_SSIDS', '').split('|') if ssid.strip()]
+    POCKET_SESSIONS_PER_SSID = int(os.getenv('POCKET_SESSIONS_PER_SSID', 1))
+    POCKET_SESSION_MAX_IN_FLIGHT = int(os.getenv('POCKET_SESSION_MAX_IN_FLIGHT', 5))  # запитів на сесію
+    POCKET_SESSION_MAX_FAILURES = int(os.getenv('POCKET_SESSION_MAX_FAILURES', 3))  # збоїв поспіль до заміни
     
     # Groq AI
     GROQ_API_KEY = os.getenv('GROQ_API_KEY')
     GROQ_MODEL = os.getenv('GROQ_MODEL', 'llama-3.3-70b-versatile')
+    GROQ_BASE_URL = os.getenv('GROQ_BASE_URL') or None  # сумісний сервер (напр. benchmarks/groq_stub.py)
+    GROQ_MAX_IN_FLIGHT = int(os.getenv('GROQ_MAX_IN_FLIGHT', 3))  # одночасних запитів до Groq
+    
+    # Кеш відповідей Groq
+    GROQ_CACHE_ENABLED = os.getenv('GROQ_CACHE_ENABLED', 'true').lower() == 'true'
+    GROQ_CACHE_MAX_ENTRIES = int(os.getenv('GROQ_CACHE_MAX_ENTRIES', 500))
+    GROQ_CACHE_TTL_CANDLES = int(os.getenv('GROQ_CACHE_TTL_CANDLES', 1))  # TTL у свічках таймфрейму
+    GROQ_BATCH_SIZE = int(os.getenv('GROQ_BATCH_SIZE', 0))  # активів в одному запиті (0/1 - вимкнено)
+    GROQ_PROMPT_FORMAT = os.getenv('GROQ_PROMPT_FORMAT', 'compact')  # compact / verbose
+    GROQ_PROMPT_TOKEN_BUDGET = int(os.getenv('GROQ_PROMPT_TOKEN_BUDGET', 700))  # оцінка токенів промпту
+    GROQ_PROMPT_MAX_CANDLES = int(os.getenv('GROQ_PROMPT_MAX_CANDLES', 30))
+    GROQ_MAX_TOKENS = int(os.getenv('GROQ_MAX_TOKENS', 800))
+    GROQ_PRICE_INPUT_PER_M = float(os.getenv('GROQ_PRICE_INPUT_PER_M', 0.15))  # USD за 1M вхідних токенів
+    GROQ_PRICE_OUTPUT_PER_M = float(os.getenv('GROQ_PRICE_OUTPUT_PER_M', 0.75))  # USD за 1M вихідних токенів
     
     # Сигнали
     SIGNAL_INTERVAL = int(os.getenv('SIGNAL_INTERVAL', 600))  # 10 хвилин
     MIN_CONFIDENCE = float(os.getenv('MIN_CONFIDENCE', 0.75))  # Змінено з 0.7 на 0.75
     MAX_DURATION = float(os.getenv('MAX_DURATION', 5.0))
-    MAX_SIGNALS_HISTORY = int(os.getenv('MAX_SIGNALS_HISTORY', 100))
+    MAX_SIGNALS_HISTORY = int(os.getenv('MAX_SIGNALS_HISTORY', 100))  # записів у data/history.json для сайту
+    HISTORY_RETENTION_DAYS = int(os.getenv('HISTORY_RETENTION_DAYS', 0))  # 0 - зберігати журнал історії без обмежень
+    STORAGE_BACKEND = os.getenv('STORAGE_BACKEND', 'json')  # json / sqlite (JSON-файли лишаються для сайту)
     ACTIVE_SIGNAL_TIMEOUT = int(os.getenv('ACTIVE_SIGNAL_TIMEOUT', 10))  # 10 хвилин
     MAX_SIGNALS_ON_SITE = int(os.getenv('MAX_SIGNALS_ON_SITE', 6))  # Макс 6 сигналів
+
+    MAX_ASSETS_PER_RUN = int(os.getenv('MAX_ASSETS_PER_RUN', 3))  # активів за один запуск
     
+    # Паралельна обробка активів
+    CONCURRENT_GENERATION = os.getenv('CONCURRENT_GENERATION', 'true').lower() == 'true'
+    MAX_CONCURRENT_ASSETS = int(os.getenv('MAX_CONCURRENT_ASSETS', 3))
+    ASSET_TIMEOUT = float(os.getenv('ASSET_TIMEOUT', 60))  # секунд на один актив
+
+    # Режим демона (постійне з'єднання, власний планувальник)
+    DAEMON_MODE = os.getenv('DAEMON_MODE', 'false').lower() == 'true'
+
     # Актив
     ASSETS_RAW = [asset.strip() for asset in os.getenv('ASSETS', 'GBPJPY_otc,EURUSD_otc,USDJPY_otc').split(',')]
     ASSETS = [asset.replace('/', '') for asset in ASSETS_RAW]
     
     TIMEFRAMES = int(os.getenv('TIMEFRAMES', 60))  # Змінено з 120 на 60 (1 хвилина)
+
+    # Старші таймфрейми для промпту - локально з базового ряду TIMEFRAMES, без запитів до брокера
+    MTF_TIMEFRAMES = [int(tf) for tf in os.getenv('MTF_TIMEFRAMES', '120,300,900').split(',') if tf.strip()]
+    MTF_BASE_CANDLES = int(os.getenv('MTF_BASE_CANDLES', 200))  # базових свічок для перетворення
+
+    # Потоковий режим демона: тіки -> локальні OHLC-свічки у кеші (без запиту свічок у циклі)
+    STREAMING_ENABLED = os.getenv('STREAMING_ENABLED', 'false').lower() == 'true'
+    STREAM_TIMEFRAMES = [int(tf) for tf in os.getenv('STREAM_TIMEFRAMES', str(TIMEFRAMES)).split(',') if tf.strip()]
+    STREAM_HISTORY = int(os.getenv('STREAM_HISTORY', 50))  # свічок історії перед підпискою
+    STREAM_CLOSE_GRACE = float(os.getenv('STREAM_CLOSE_GRACE', 0.3))  # секунд після межі на запізнілі тіки
+
+    # Тригери демона: позачергова генерація на закритті свічки
+    TRIGGERS_ENABLED = os.getenv('TRIGGERS_ENABLED', 'false').lower() == 'true'
+    TRIGGERS = [name.strip() for name in os.getenv(
+        'TRIGGERS', 'ema_cross,volatility_breakout,pattern_match'
+    ).split(',') if name.strip()]
+    TRIGGER_COOLDOWN = float(os.getenv('TRIGGER_COOLDOWN', 300))  # секунд між сигналами одного активу
+    TRIGGER_RATE_PER_MINUTE = float(os.getenv('TRIGGER_RATE_PER_MINUTE', 2))  # глобально, усі активи
+    TRIGGER_BURST = float(os.getenv('TRIGGER_BURST', 3))
+    TRIGGER_VOLATILITY_RATIO = float(os.getenv('TRIGGER_VOLATILITY_RATIO', 2.0))
+    TRIGGER_PATTERN_EDGE = float(os.getenv('TRIGGER_PATTERN_EDGE', 25))  # |P(вгору) - 50%|, пункти
+
+    # Синтетичний ринок (демо-свічки, бектест, навантажувальні тести)
+    SIMULATOR_SEED = int(os.getenv('SIMULATOR_SEED')) if os.getenv('SIMULATOR_SEED') else None  # None - щоразу інший ряд
+
+    # Скринер перед запитом до AI
+    SCREENER_ENABLED = os.getenv('SCREENER_ENABLED', 'true').lower() == 'true'
+    SCREENER_RULES = [rule.strip() for rule in os.getenv(
+        'SCREENER_RULES', 'trend_alignment,volatility_band,rsi_extreme,stochastic_extreme,bollinger_touch'
+    ).split(',') if rule.strip()]
+    SCREENER_MIN_RULES = int(os.getenv('SCREENER_MIN_RULES', 2))
+    SCREENER_VOLATILITY_MIN = float(os.getenv('SCREENER_VOLATILITY_MIN', 0.02))  # %
+    SCREENER_VOLATILITY_MAX = float(os.getenv('SCREENER_VOLATILITY_MAX', 1.5))  # %
+    SCREENER_RSI_LOW = float(os.getenv('SCREENER_RSI_LOW', 30))
+    SCREENER_RSI_HIGH = float(os.getenv('SCREENER_RSI_HIGH', 70))
+    SCREENER_STOCH_LOW = float(os.getenv('SCREENER_STOCH_LOW', 20))
+    SCREENER_STOCH_HIGH = float(os.getenv('SCREENER_STOCH_HIGH', 80))
+
+    # Кеш свічок (кільцевий буфер на актив)
+    CANDLE_CACHE_ENABLED = os.getenv('CANDLE_CACHE_ENABLED', 'true').lower() == 'true'
+    CANDLE_CACHE_SIZE = int(os.getenv('CANDLE_CACHE_SIZE', 200))
     
     # Навчання
     FEEDBACK_ENABLED = os.getenv('FEEDBACK_ENABLED', 'true').lower() == 'true'
+    PATTERN_MEMORY_ENABLED = os.getenv('PATTERN_MEMORY_ENABLED', 'true').lower() == 'true'
+    PATTERN_MEMORY_SIZE = int(os.getenv('PATTERN_MEMORY_SIZE', 5000))  # ситуацій у пам'яті шаблонів
+    PATTERN_WINDOW = int(os.getenv('PATTERN_WINDOW', 20))  # свічок у векторі ознак
+    PATTERN_METRIC = os.getenv('PATTERN_METRIC', 'cosine')  # cosine / l2
+    PATTERN_NEIGHBORS = int(os.getenv('PATTERN_NEIGHBORS', 10))
+    PATTERN_MIN_SAMPLES = int(os.getenv('PATTERN_MIN_SAMPLES', 3))  # мінімум сусідів для промпту
     CLEANUP_COUNT = 6  # Зберігаємо останні 6 сигналів
     
     # Шляхи до файлів
     DATA_DIR = BASE_DIR / 'data'
     SIGNALS_FILE = DATA_DIR / 'signals.json'
     HISTORY_FILE = DATA_DIR / 'history.json'
+    HISTORY_DIR = DATA_DIR / 'history'
+    SQLITE_FILE = DATA_DIR / 'signals.db'
     FEEDBACK_FILE = DATA_DIR / 'feedback.json'
+    FEEDBACK_DIR = DATA_DIR / 'feedback'  # журнал відгуків JSONL; feedback.json - лише підсумки
     ASSETS_CONFIG_FILE = DATA_DIR / 'assets_config.json'
     LESSONS_FILE = DATA_DIR / 'lessons.json'
+    FEEDBACK_STATS_FILE = DATA_DIR / 'feedback_stats.json'
+    # Локальні кеші (не комітяться; у GitHub Actions зберігаються між запусками через actions/cache)
+    CACHE_DIR = BASE_DIR / 'cache'
+    GROQ_CACHE_FILE = CACHE_DIR / 'groq_responses.json'
+    # Лічильники змінюються щозапуску - в data/ давали б коміт кожні 10 хвилин
+    SCREENER_STATS_FILE = CACHE_DIR / 'screener_stats.json'
+    USAGE_FILE = CACHE_DIR / 'usage_stats.json'
+    PATTERN_MEMORY_FILE = CACHE_DIR / 'pattern_memory.npz'  # бінарний, перезаписується з кожним сигналом
+    
+    # Метрики циклу генерації: підсумок metrics.json поруч із signals.json; трасування
+    # та текстовий файл Prometheus змінюються щозапуску, тому в cache/ і не комітяться
+    METRICS_ENABLED = os.getenv('METRICS_ENABLED', 'true').lower() == 'true'
+    METRICS_FILE = DATA_DIR / 'metrics.json'
+    METRICS_TRACE_FILE = CACHE_DIR / 'metrics_trace.json'
+    METRICS_PROM_FILE = CACHE_DIR / 'metrics.prom'
     
     # Налаштування логування
     LOG_LEVEL = os.getenv('LOG_LEVEL', 'INFO')
@@ -63,9 +173,21 @@ class Config:
 
     @staticmethod
     def get_kyiv_time():
-        """Отримання поточного часу в Києві"""
+        """Отримання поточного часу в Києві (віртуального, якщо його задано бектестом)"""
+        virtual = _virtual_now.get()
+        if virtual is not None:
+            return virtual.astimezone(Config.KYIV_TZ)
         return datetime.now(Config.KYIV_TZ)
 
+    @staticmethod
+    def set_virtual_time(moment):
+        """Підміна поточного часу (datetime з часовим поясом або None). Повертає токен для reset"""
+        return _virtual_now.set(moment)
+
+    @staticmethod
+    def reset_virtual_time(token):
+        _virtual_now.reset(token)
+
     @staticmethod
     def validate_ssid_format(ssid):
         """Перевіряє чи SSID у правильному форматі"""
@@ -79,9 +201,9 @@ class Config:
         return True, "SSID валідний"
     
     @classmethod
-    def get_validated_ssid(cls):
-        """Повертає валідований SSID"""
-        ssid = cls.POCKET_SSID
+    def get_validated_ssid(cls, ssid=None):
+        """Повертає валідований SSID (за замовчуванням - POCKET_SSID)"""
+        ssid = ssid or cls.POCKET_SSID
         
         if not ssid:
             logger.error("SSID не знайдено! Перевірте .env або GitHub Secrets")
@@ -109,7 +231,7 @@ class Config:
         """Перевірка конфігурації"""
         errors = []
         
-        if not cls.POCKET_SSID:
+        if not cls.POCKET_SSID and not cls.POCKET_SSIDS:
             errors.append("❌ POCKET_SSID не встановлено")
         
         if not cls.GROQ_API_KEY:
@@ -1,8 +1,12 @@
 import json
 import os
-from datetime import datetime, timedelta
+from datetime import datetime
 import pytz
 from config import Config
+from pattern_memory import PatternMemory
+from expiry_index import ExpiryIndex, signal_timestamps
+from metrics import metrics
+from storage import create_storage, empty_signals_document
 
 class DataHandler:
     def __init__(self):
@@ -13,6 +17,14 @@ class DataHandler:
         self.lessons_file = Config.LESSONS_FILE
         self.kyiv_tz = pytz.timezone('Europe/Kiev')
         self.create_data_dir()
+        self.storage = create_storage()
+        self.feedback_stats = self.storage.feedback_stats
+        self.pattern_memory = PatternMemory() if Config.PATTERN_MEMORY_ENABLED else None
+        if not self.feedback_stats.exists():
+            # Одноразовий перерахунок статистики для вже наявних відгуків
+            feedback = self.storage.all_feedback()
+            if feedback:
+                self.feedback_stats.rebuild(feedback, self.storage.find_signal)
     
     def create_data_dir(self):
         """Створення директорій для даних"""
@@ -37,7 +49,6 @@ class DataHandler:
         if not os.path.exists(self.feedback_file):
             with open(self.feedback_file, 'w', encoding='utf-8') as f:
                 json.dump({
-                    "feedback_history": [],
                     "success_count": 0,
                     "total_feedback": 0,
                     "accuracy_percentage": 0
@@ -51,6 +62,7 @@ class DataHandler:
                     "learned_patterns": []
                 }, f, indent=2, ensure_ascii=False)
     
+    @metrics.timed('data_save_signals')
     def save_signals(self, signals):
         """Збереження сигналів з обмеженням до 6 останніх"""
         try:
@@ -72,12 +84,11 @@ class DataHandler:
                         now_kyiv = Config.get_kyiv_time()
                         signal['id'] = f"{signal['asset']}_{now_kyiv.strftime('%Y%m%d%H%M%S')}"
                     
-                    # Додаємо час зникнення (10 хвилин після генерації)
+                    # Додаємо час зникнення (10 хвилин після генерації): epoch для індексу, ISO для сайту
                     if 'generated_at' in signal:
-                        gen_time = self._parse_datetime(signal['generated_at'])
-                        if gen_time:
-                            expiry_time = gen_time + timedelta(minutes=10)
-                            signal['expires_at'] = expiry_time.isoformat()
+                        expires_at_ts = signal_timestamps(signal, self._parse_datetime)
+                        if expires_at_ts:
+                            signal['expires_at'] = datetime.fromtimestamp(expires_at_ts, self.kyiv_tz).isoformat()
                     
                     valid_signals.append(signal)
             
@@ -91,35 +102,14 @@ class DataHandler:
             existing_data = self.load_signals()
             existing_signals = existing_data.get('signals', [])
             
-            # Фільтруємо старі сигнали (старіші 10 хвилин)
-            current_signals = []
-            for signal in existing_signals:
-                try:
-                    gen_time_str = signal.get('generated_at')
-                    if gen_time_str:
-                        gen_time = self._parse_datetime(gen_time_str)
-                        if gen_time and (now_kyiv - gen_time <= timedelta(minutes=10)):
-                            current_signals.append(signal)
-                except:
-                    continue
-            
-            # Додаємо нові сигнали
-            all_signals = current_signals + valid_signals
-            
-            # Обмежуємо загальну кількість сигналів (максимум 6)
-            if len(all_signals) > Config.MAX_SIGNALS_ON_SITE:
-                # Залишаємо тільки найновіші 6 сигналів
-                all_signals = sorted(
-                    all_signals, 
-                    key=lambda x: self._parse_datetime(x.get('generated_at', '') or ''),
-                    reverse=True
-                )[:Config.MAX_SIGNALS_ON_SITE]
-            
-            # Рахуємо активні сигнали
-            active_count = 0
-            for signal in all_signals:
-                if self._is_signal_active(signal):
-                    active_count += 1
+            # Індекс за часом зникнення: старі (старіші 10 хвилин) сигнали - на вершині купи
+            index = ExpiryIndex(existing_signals + valid_signals, self._parse_datetime)
+            index.pop_expired(now_kyiv.timestamp())
+            
+            # Обмежуємо загальну кількість сигналів (максимум 6), залишаючи найновіші
+            index.trim(Config.MAX_SIGNALS_ON_SITE)
+            all_signals = index.signals()
+            active_count = len(index)
             
             # Оновлюємо дані
             data = {
@@ -131,12 +121,11 @@ class DataHandler:
                 "generation_count": existing_data.get('generation_count', 0) + 1
             }
             
-            # Зберігаємо
-            with open(self.signals_file, 'w', encoding='utf-8') as f:
-                json.dump(data, f, indent=2, ensure_ascii=False, default=str)
-            
-            # Додаємо в історію
-            self._add_to_history(valid_signals)
+            # Зберігаємо документ і історію однією транзакцією
+            with self.storage.transaction():
+                self.storage.save_signals_document(data)
+                self._add_to_history(valid_signals)
+            self.storage.export_views()
             
             # Оновлюємо статистику навчання
             self.update_learning_stats()
@@ -174,112 +163,67 @@ class DataHandler:
             return None
     
     def load_signals(self):
-        """Завантаження сигналів з файлу"""
+        """Завантаження документа активних сигналів зі сховища"""
         try:
-            if os.path.exists(self.signals_file):
-                with open(self.signals_file, 'r', encoding='utf-8') as f:
-                    data = json.load(f)
-                    
-                    # Переконуємося, що є всі обов'язкові поля
-                    if 'signals' not in data:
-                        data['signals'] = []
-                    if 'total_signals' not in data:
-                        data['total_signals'] = len(data.get('signals', []))
-                    if 'active_signals' not in data:
-                        data['active_signals'] = len([s for s in data.get('signals', []) if self._is_signal_active(s)])
-                    if 'generation_count' not in data:
-                        data['generation_count'] = 0
-                    
-                    return data
-            return {
-                "last_update": None,
-                "signals": [],
-                "timezone": "Europe/Kiev (UTC+2)",
-                "total_signals": 0,
-                "active_signals": 0,
-                "generation_count": 0
-            }
+            data = self.storage.load_signals_document()
+            
+            # Переконуємося, що є всі обов'язкові поля
+            if 'signals' not in data:
+                data['signals'] = []
+            if 'total_signals' not in data:
+                data['total_signals'] = len(data.get('signals', []))
+            if 'active_signals' not in data:
+                data['active_signals'] = ExpiryIndex(data['signals'], self._parse_datetime).active_count()
+            if 'generation_count' not in data:
+                data['generation_count'] = 0
+            
+            return data
         except Exception as e:
             print(f"❌ Помилка завантаження сигналів: {e}")
-            return {
-                "last_update": None,
-                "signals": [],
-                "timezone": "Europe/Kiev (UTC+2)",
-                "total_signals": 0,
-                "active_signals": 0,
-                "generation_count": 0
-            }
+            return empty_signals_document()
     
     def _is_signal_active(self, signal):
         """Перевірка чи сигнал ще активний (точно 10 хвилин з моменту генерації)"""
         try:
-            now_kyiv = Config.get_kyiv_time()
-            
-            # Час генерації сигналу
-            gen_time_str = signal.get('generated_at')
-            if not gen_time_str:
-                return False
-            
-            generated_at = self._parse_datetime(gen_time_str)
-            if not generated_at:
-                return False
-            
-            # Сигнал активний точно 10 хвилин з моменту генерації
-            time_since_generation = now_kyiv - generated_at
-            is_active = time_since_generation <= timedelta(minutes=10)
-            
-            return is_active
-            
+            expires_at_ts = signal_timestamps(signal, self._parse_datetime)
+            return Config.get_kyiv_time().timestamp() <= expires_at_ts
         except Exception as e:
             print(f"⚠️ Помилка перевірки активності сигналу: {e}")
             return False
     
     def _add_to_history(self, signals):
-        """Додавання сигналів до історії з обмеженням"""
+        """Додавання сигналів до журналу історії та оновлення history.json для сайту"""
         try:
             if not signals:
                 return
             
-            history = []
-            if os.path.exists(self.history_file):
-                with open(self.history_file, 'r', encoding='utf-8') as f:
-                    history = json.load(f)
-            
             now_kyiv = Config.get_kyiv_time()
+            entries = []
             for signal in signals:
                 # Створюємо копію сигналу для історії
                 history_entry = signal.copy()
                 history_entry['saved_at'] = now_kyiv.isoformat()
                 history_entry['history_id'] = f"{signal.get('asset', 'unknown')}_{now_kyiv.strftime('%Y%m%d%H%M%S')}"
                 history_entry['status'] = 'saved'
-                history.append(history_entry)
-            
-            # Обмежуємо історію (останні 100 записів)
-            if len(history) > Config.MAX_SIGNALS_HISTORY:
-                history = history[-Config.MAX_SIGNALS_HISTORY:]
+                entries.append(history_entry)
             
-            with open(self.history_file, 'w', encoding='utf-8') as f:
-                json.dump(history, f, indent=2, ensure_ascii=False, default=str)
+            # Дописуємо в журнал, history.json - лише останні MAX_SIGNALS_HISTORY записів
+            self.storage.append_history(entries)
+            if self.pattern_memory:
+                self.pattern_memory.save()
                 
             print(f"📚 Додано {len(signals)} сигналів до історії")
                 
         except Exception as e:
             print(f"❌ Помилка додавання в історію: {e}")
     
+    @metrics.timed('data_save_feedback')
     def save_feedback(self, signal_id, success, user_comment=""):
         """Збереження відгуку про результат угоди для навчання AI"""
         try:
             if not Config.FEEDBACK_ENABLED:
                 return False
             
-            # Завантажуємо існуючі feedback
-            feedback_data = {}
-            if os.path.exists(self.feedback_file):
-                with open(self.feedback_file, 'r', encoding='utf-8') as f:
-                    feedback_data = json.load(f)
-            
-            feedback_history = feedback_data.get('feedback_history', [])
-            
             now_kyiv = Config.get_kyiv_time()
             feedback_entry = {
                 'signal_id': signal_id,
@@ -289,104 +233,109 @@ class DataHandler:
                 'learned': False
             }
             
-            feedback_history.append(feedback_entry)
+            signal = self.storage.find_signal(signal_id)
             
-            # Оновлюємо статистику
-            total_feedback = len(feedback_history)
-            success_count = len([f for f in feedback_history if f.get('success', False)])
-            accuracy = (success_count / total_feedback * 100) if total_feedback > 0 else 0
+            with self.storage.transaction():
+                # Навчання AI лише на новому відгуку - без проходу по всій історії
+                self._learn([feedback_entry])
+                self.storage.add_feedback(feedback_entry)
+                self.feedback_stats.record(feedback_entry, signal)
             
-            feedback_data.update({
-                'feedback_history': feedback_history,
-                'success_count': success_count,
-                'total_feedback': total_feedback,
-                'accuracy_percentage': round(accuracy, 2)
-            })
-            
-            with open(self.feedback_file, 'w', encoding='utf-8') as f:
-                json.dump(feedback_data, f, indent=2, ensure_ascii=False, default=str)
-            
-            # Запускаємо навчання AI на основі feedback
-            self.learn_from_feedback()
+            summary = self.feedback_stats.summary()
+            self.storage.export_views()
             
             print(f"💾 Збережено відгук для сигналу {signal_id}: {'✅ Успіх' if success else '❌ Невдача'}")
-            print(f"📊 Нова точність AI: {accuracy:.2f}% ({success_count}/{total_feedback})")
+            print(f"📊 Нова точність AI: {summary['accuracy_percentage']:.2f}% "
+                  f"({summary['success_count']}/{summary['total_feedback']})")
             return True
             
         except Exception as e:
             print(f"❌ Помилка збереження відгуку: {e}")
             return False
     
+    def get_feedback(self, signal_id):
+        """Відгуки для сигналу (індекс за signal_id у SQLite)"""
+        return self.storage.feedback_for_signal(signal_id)
+    
+    def get_feedback_stats(self, dimension=None, key=None):
+        """Готова статистика відгуків: загальна, розріз (asset/hour/direction/confidence) або один ключ"""
+        if dimension is None:
+            return self.feedback_stats.summary()
+        if key is None:
+            return self.feedback_stats.breakdown(dimension)
+        return self.feedback_stats.breakdown(dimension).get(key)
+    
+    def get_history(self, limit=None, asset=None, start=None, end=None):
+        """Історія сигналів: останні limit записів або діапазон часу генерації"""
+        if start is not None or end is not None:
+            start = start or datetime.fromtimestamp(0, pytz.UTC)
+            end = end or Config.get_kyiv_time()
+            entries = self.storage.history_between(start, end, asset)
+            return entries[:limit] if limit else entries
+        return self.storage.recent_history(limit or Config.MAX_SIGNALS_HISTORY, asset)
+    
     def learn_from_feedback(self):
         """Навчання ШІ на основі feedback (аналіз чому сигнал був правильний/неправильний)"""
         try:
-            if not os.path.exists(self.feedback_file):
-                return []
-            
-            with open(self.feedback_file, 'r', encoding='utf-8') as f:
-                feedback_data = json.load(f)
-            
-            feedback = feedback_data.get('feedback_history', [])
-            
-            unlearned = [fb for fb in feedback if not fb.get('learned', False)]
+            unlearned = self.storage.unlearned_feedback()
             
             if not unlearned:
                 return []
             
-            # Завантажуємо уроки
-            lessons_data = {}
-            if os.path.exists(self.lessons_file):
-                with open(self.lessons_file, 'r', encoding='utf-8') as f:
-                    lessons_data = json.load(f)
-            
-            lessons = lessons_data.get('lessons', [])
-            
-            now_kyiv = Config.get_kyiv_time()
-            new_lessons = []
-            
-            for fb in unlearned:
-                # Аналізуємо чому сигнал був правильний/неправильний
-                lesson = {
-                    'signal_id': fb.get('signal_id', ''),
-                    'success': fb.get('success', False),
-                    'feedback_at': fb.get('feedback_at', ''),
-                    'learned_at': now_kyiv.isoformat(),
-                    'asset': fb.get('signal_id', '').split('_')[0] if '_' in fb.get('signal_id', '') else '',
-                    'patterns': self._extract_patterns(fb),
-                    'analysis': self._analyze_feedback(fb)  # Аналіз причин
-                }
-                new_lessons.append(lesson)
-                
-                fb['learned'] = True
-            
-            # Оновлюємо feedback файл
-            feedback_data['feedback_history'] = feedback
-            with open(self.feedback_file, 'w', encoding='utf-8') as f:
-                json.dump(feedback_data, f, indent=2, ensure_ascii=False, default=str)
-            
-            # Додаємо нові уроки
-            all_lessons = lessons + new_lessons
-            
-            # Оновлюємо уроки
-            lessons_data.update({
-                'lessons': all_lessons,
-                'last_learning': now_kyiv.isoformat(),
-                'learned_patterns': self._update_learned_patterns(all_lessons)
-            })
-            
-            with open(self.lessons_file, 'w', encoding='utf-8') as f:
-                json.dump(lessons_data, f, indent=2, ensure_ascii=False, default=str)
-            
-            print(f"🧠 ШІ навчився на {len(new_lessons)} нових прикладах")
+            with self.storage.transaction():
+                new_lessons = self._learn(unlearned)
+                # Позначаємо feedback як вивчений
+                self.storage.mark_feedback_learned(unlearned)
             return new_lessons
             
         except Exception as e:
             print(f"❌ Помилка навчання ШІ: {e}")
             return []
     
+    def _learn(self, feedback_entries):
+        """Уроки з переданих відгуків; відгуки позначаються як вивчені"""
+        now_kyiv = Config.get_kyiv_time()
+        new_lessons = []
+        
+        for fb in feedback_entries:
+            # Аналізуємо чому сигнал був правильний/неправильний
+            lesson = {
+                'signal_id': fb.get('signal_id', ''),
+                'success': fb.get('success', False),
+                'feedback_at': fb.get('feedback_at', ''),
+                'learned_at': now_kyiv.isoformat(),
+                'asset': fb.get('signal_id', '').split('_')[0] if '_' in fb.get('signal_id', '') else '',
+                'patterns': self._extract_patterns(fb),
+                'analysis': self._analyze_feedback(fb)  # Аналіз причин
+            }
+            new_lessons.append(lesson)
+            fb['learned'] = True
+        
+        # Додаємо нові уроки
+        self.storage.add_lessons(new_lessons, now_kyiv.isoformat(), self._update_learned_patterns())
+        if self.pattern_memory:
+            self.pattern_memory.save()
+        
+        print(f"🧠 ШІ навчився на {len(new_lessons)} нових прикладах")
+        return new_lessons
+    
     def _extract_patterns(self, feedback_entry):
-        """Витягнення шаблонів з feedback (заглушка)"""
-        return []
+        """Результат сигналу в пам'ять шаблонів і найближчі до нього минулі ситуації"""
+        if not self.pattern_memory:
+            return []
+        signal_id = feedback_entry.get('signal_id', '')
+        if not self.pattern_memory.set_outcome(signal_id, feedback_entry.get('success', False)):
+            return []
+        similar = self.pattern_memory.query_signal(signal_id)
+        if not similar:
+            return []
+        return [{
+            'type': 'knn',
+            'metric': similar['metric'],
+            'neighbors': [neighbor['signal_id'] for neighbor in similar['neighbors']],
+            'win_rate': similar['win_rate'],
+            'up_probability': similar['up_probability']
+        }]
     
     def _analyze_feedback(self, feedback_entry):
         """Аналіз причин успіху/невдачі сигналу"""
@@ -401,14 +350,17 @@ class DataHandler:
         
         return analysis
     
-    def _update_learned_patterns(self, all_lessons):
-        """Оновлення вивчених шаблонів (заглушка)"""
-        return []
+    def _update_learned_patterns(self):
+        """Вивчені шаблони: статистика розмічених ситуацій пам'яті за напрямками"""
+        if not self.pattern_memory:
+            return []
+        return self.pattern_memory.summary()
     
     def update_learning_stats(self):
         """Оновлення статистики навчання"""
         pass
     
+    @metrics.timed('data_cleanup')
     def auto_cleanup_old_signals(self):
         """Автоматичне очищення сигналів старіших 10 хвилин"""
         try:
@@ -420,32 +372,31 @@ class DataHandler:
             if len(signals) == 0:
                 return
             
-            now_kyiv = Config.get_kyiv_time()
-            active_signals = []
-            removed_count = 0
+            # Видаляємо лише прострочені сигнали з вершини купи
+            index = ExpiryIndex(signals, self._parse_datetime)
+            expired = index.pop_expired(Config.get_kyiv_time().timestamp())
+            for signal in expired:
+                print(f"🗑️ Видаляємо старий сигнал: {signal.get('asset')}")
+            removed_count = len(expired)
+            active_signals = index.signals()
             
-            for signal in signals:
-                try:
-                    gen_time_str = signal.get('generated_at')
-                    if gen_time_str:
-                        gen_time = self._parse_datetime(gen_time_str)
-                        if gen_time and (now_kyiv - gen_time <= timedelta(minutes=10)):
-                            active_signals.append(signal)
-                        else:
-                            removed_count += 1
-                            print(f"🗑️ Видаляємо старий сигнал: {signal.get('asset')}")
-                except:
-                    continue
-            
-            # Оновлюємо файл
+            # Оновлюємо сховище
             data['signals'] = active_signals
             data['total_signals'] = len(active_signals)
-            data['active_signals'] = len([s for s in active_signals if self._is_signal_active(s)])
+            data['active_signals'] = len(active_signals)
             
-            with open(self.signals_file, 'w', encoding='utf-8') as f:
-                json.dump(data, f, indent=2, ensure_ascii=False, default=str)
+            self.storage.save_signals_document(data)
+            self.storage.export_views()
             
             print(f"✅ Автоочищення: видалено {removed_count} старих сигналів, залишено {len(active_signals)} актуальних")
             
         except Exception as e:
             print(f"❌ Помилка автоочищення: {e}")
+    
+    def batch(self):
+        """Усі записи всередині `with data_handler.batch():` - один атомарний запис на файл"""
+        return self.storage.uow
+    
+    def close(self):
+        """Завершення роботи зі сховищем (фонова компакція, WAL SQLite)"""
+        self.storage.close()
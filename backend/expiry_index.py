@@ -0,0 +1,91 @@
+import heapq
+from datetime import datetime
+import pytz
+from config import Config
+
+
+def signal_timestamps(signal, parse_datetime=None):
+    """Заповнення epoch-полів generated_ts та expires_at_ts сигналу.
+
+    Рядок generated_at розбирається лише один раз: далі сигнал (і файл
+    signals.json) несе готові числа. ISO-поле expires_at лишається для сайту.
+    """
+    if 'expires_at_ts' in signal and 'generated_ts' in signal:
+        return signal['expires_at_ts']
+
+    generated_at = None
+    value = signal.get('generated_at')
+    if value:
+        try:
+            if parse_datetime:
+                generated_at = parse_datetime(value)
+            else:
+                generated_at = datetime.fromisoformat(value.replace('Z', '+00:00'))
+                if generated_at.tzinfo is None:
+                    generated_at = pytz.UTC.localize(generated_at)
+        except (TypeError, ValueError):
+            generated_at = None
+
+    if generated_at is None:
+        # Сигнал без коректного часу вважається простроченим
+        signal['generated_ts'] = 0.0
+        signal['expires_at_ts'] = 0.0
+    else:
+        signal['generated_ts'] = generated_at.timestamp()
+        signal['expires_at_ts'] = signal['generated_ts'] + Config.ACTIVE_SIGNAL_TIMEOUT * 60
+    return signal['expires_at_ts']
+
+
+class ExpiryIndex:
+    """Мін-купа активних сигналів за часом зникнення.
+
+    Оскільки всі сигнали живуть однаковий ACTIVE_SIGNAL_TIMEOUT, порядок
+    за expires_at_ts збігається з порядком генерації: вершина купи - і
+    найближчий до зникнення, і найстаріший сигнал. Тому і очищення, і
+    обрізання до MAX_SIGNALS_ON_SITE - це O(k log n) по видалених сигналах.
+    """
+
+    def __init__(self, signals=(), parse_datetime=None):
+        self._parse_datetime = parse_datetime
+        self._heap = []
+        self._counter = 0
+        for signal in signals:
+            self.push(signal)
+
+    def __len__(self):
+        return len(self._heap)
+
+    def push(self, signal):
+        expires_at_ts = signal_timestamps(signal, self._parse_datetime)
+        # Лічильник зберігає порядок додавання для однакових часів
+        heapq.heappush(self._heap, (expires_at_ts, signal.get('generated_ts', 0.0), self._counter, signal))
+        self._counter += 1
+
+    def pop_expired(self, now_ts=None):
+        """Видалення сигналів, час яких минув. Повертає видалені сигнали"""
+        now_ts = now_ts if now_ts is not None else Config.get_kyiv_time().timestamp()
+        expired = []
+        while self._heap and self._heap[0][0] < now_ts:
+            expired.append(heapq.heappop(self._heap)[3])
+        return expired
+
+    def trim(self, limit):
+        """Залишити лише limit найновіших сигналів. Повертає видалені"""
+        removed = []
+        while len(self._heap) > limit:
+            removed.append(heapq.heappop(self._heap)[3])
+        return removed
+
+    def next_expiry(self):
+        return self._heap[0][0] if self._heap else None
+
+    def active_count(self, now_ts=None):
+        """Кількість активних сигналів (прострочені спершу треба видалити pop_expired)"""
+        now_ts = now_ts if now_ts is not None else Config.get_kyiv_time().timestamp()
+        if self._heap and self._heap[0][0] < now_ts:
+            return sum(1 for item in self._heap if item[0] >= now_ts)
+        return len(self._heap)
+
+    def signals(self):
+        """Сигнали від найновішого до найстарішого"""
+        return [item[3] for item in sorted(self._heap, key=lambda item: (item[0], item[1], item[2]), reverse=True)]
@@ -0,0 +1,121 @@
+import math
+from datetime import datetime
+from config import Config
+from unit_of_work import UnitOfWork
+
+
+class FeedbackStats:
+    """Накопичувальна статистика відгуків: O(1) оновлення на кожен відгук.
+
+    Документ feedback_stats.json містить загальні лічильники та розрізи
+    за активом, годиною генерації (Київ), напрямком і кошиком впевненості,
+    тож ні запис відгуку, ні дашборд не проходять усю історію.
+    """
+
+    DIMENSIONS = ('asset', 'hour', 'direction', 'confidence')
+    CONFIDENCE_BUCKET = 0.05
+
+    def __init__(self, uow=None, path=None):
+        self.uow = uow or UnitOfWork()
+        self.path = path or Config.FEEDBACK_STATS_FILE
+
+    @staticmethod
+    def _empty():
+        return {'total': 0, 'success': 0, 'accuracy': 0.0}
+
+    def load(self):
+        data = self.uow.read(self.path, {})
+        data.setdefault('totals', self._empty())
+        data.setdefault('by', {})
+        for dimension in self.DIMENSIONS:
+            data['by'].setdefault(dimension, {})
+        return data
+
+    @classmethod
+    def confidence_bucket(cls, confidence):
+        if confidence is None:
+            return None
+        low = math.floor(round(float(confidence) / cls.CONFIDENCE_BUCKET, 6)) * cls.CONFIDENCE_BUCKET
+        return f"{low:.2f}-{low + cls.CONFIDENCE_BUCKET:.2f}"
+
+    @staticmethod
+    def _hour(value):
+        try:
+            moment = datetime.fromisoformat(str(value).replace('Z', '+00:00'))
+        except (TypeError, ValueError):
+            return None
+        if moment.tzinfo is not None:
+            moment = moment.astimezone(Config.KYIV_TZ)
+        return f"{moment.hour:02d}"
+
+    def keys_for(self, entry, signal=None):
+        """Ключі розрізів для відгуку; сигнал (якщо знайдено) дає напрямок і впевненість"""
+        signal = signal or {}
+        signal_id = entry.get('signal_id', '')
+        asset = signal.get('asset') or (signal_id.rsplit('_', 1)[0] if '_' in signal_id else None)
+        return {
+            'asset': asset,
+            'hour': self._hour(signal.get('generated_at') or entry.get('feedback_at')),
+            'direction': signal.get('direction'),
+            'confidence': self.confidence_bucket(signal.get('confidence'))
+        }
+
+    @staticmethod
+    def _add(bucket, success):
+        bucket['total'] += 1
+        bucket['success'] += 1 if success else 0
+        bucket['accuracy'] = round(bucket['success'] / bucket['total'] * 100, 2)
+
+    def record(self, entry, signal=None, data=None):
+        """Оновлення лічильників одним відгуком"""
+        save = data is None
+        data = data or self.load()
+        success = bool(entry.get('success'))
+        self._add(data['totals'], success)
+        for dimension, key in self.keys_for(entry, signal).items():
+            if key is None:
+                continue
+            self._add(data['by'][dimension].setdefault(key, self._empty()), success)
+        data['updated_at'] = entry.get('feedback_at')
+        if save:
+            self.uow.stage(self.path, data)
+        return data
+
+    def rebuild(self, entries, find_signal):
+        """Повний перерахунок (міграція наявних відгуків)"""
+        data = {'totals': self._empty(), 'by': {dimension: {} for dimension in self.DIMENSIONS}}
+        for entry in entries:
+            self.record(entry, find_signal(entry.get('signal_id')), data)
+        self.uow.stage(self.path, data)
+        return data
+
+    def exists(self):
+        return bool(self.uow.read(self.path, {}))
+
+    # Запити
+    def summary(self):
+        totals = self.load()['totals']
+        return {
+            'success_count': totals['success'],
+            'total_feedback': totals['total'],
+            'accuracy_percentage': totals['accuracy']
+        }
+
+    def breakdown(self, dimension):
+        """Розріз {ключ: {'total', 'success', 'accuracy'}}"""
+        if dimension not in self.DIMENSIONS:
+            raise ValueError(f"Невідомий розріз статистики: {dimension}")
+        return self.load()['by'][dimension]
+
+    def accuracy(self, dimension=None, key=None):
+        """Точність у відсотках: загальна або для одного ключа розрізу"""
+        if dimension is None:
+            return self.load()['totals']['accuracy']
+        bucket = self.breakdown(dimension).get(key)
+        return bucket['accuracy'] if bucket else None
+
+    def best(self, dimension, min_count=5, limit=3, worst=False):
+        """Ключі розрізу з найвищою (або найнижчою) точністю серед достатньо частих"""
+        items = [(key, bucket) for key, bucket in self.breakdown(dimension).items() if bucket['total'] >= min_count]
+        items.sort(key=lambda item: (item[1]['accuracy'], item[1]['total']), reverse=not worst)
+        return items[:limit]
@@ -1,23 +1,46 @@
+import asyncio
 import json
 import logging
+import math
 import os
-from groq import Groq
+import time
+from groq import Groq, AsyncGroq
 from datetime import datetime, timedelta
 from config import Config
+from metrics import metrics
+from response_cache import ResponseCache
+from usage_tracker import UsageTracker
+from utils.helpers import Helpers
+from utils.indicators import IndicatorEngine
+from utils.resampler import Resampler
 
 logger = logging.getLogger("signal_bot")
 
 class GroqAnalyzer:
+    # Змінюється разом з форматом промпту, щоб не брати з кешу відповіді на старий промпт
+    PROMPT_VERSION = '3'
+    
     def __init__(self):
+        self.response_cache = ResponseCache() if Config.GROQ_CACHE_ENABLED else None
+        self.usage = UsageTracker()
+        # Пам'ять шаблонів підключає SignalGenerator (спільна з DataHandler)
+        self.pattern_memory = None
+        
+        # Обмеження одночасних запитів до Groq (створюється в циклі подій)
+        self.max_in_flight = max(1, Config.GROQ_MAX_IN_FLIGHT)
+        self._in_flight = None
+
         if not Config.GROQ_API_KEY:
             logger.error("❌ GROQ_API_KEY не налаштовано!")
             self.client = None
+            self.async_client = None
         else:
             proxy_vars = ['http_proxy', 'https_proxy', 'HTTP_PROXY', 'HTTPS_PROXY']
             for var in proxy_vars:
                 os.environ.pop(var, None)
             
-            self.client = Groq(api_key=Config.GROQ_API_KEY)
+            self.client = Groq(api_key=Config.GROQ_API_KEY, base_url=Config.GROQ_BASE_URL)
+            self.async_client = AsyncGroq(api_key=Config.GROQ_API_KEY, base_url=Config.GROQ_BASE_URL)
             logger.info(f"✅ Groq AI ініціалізовано (модель: {Config.GROQ_MODEL})")
     
     def calculate_volatility(self, candles):
@@ -41,19 +64,24 @@ class GroqAnalyzer:
         volatility = ((max_price - min_price) / avg_price) * 100
         return round(volatility, 4)
     
-    def analyze_market(self, asset, candles_data, language='uk'):
-        """
-        Аналіз ринку через GPT OSS 120B AI з підтримкою мов
-        """
-        if not self.client:
-            logger.error("Groq AI не ініціалізовано.")
-            return None
-        
+    def _prepare_analysis(self, asset, candles_data, language='uk', indicators=None, timeframes=None):
+        """Підготовка промпту та контексту аналізу"""
         if not candles_data or len(candles_data) < 10:
             logger.error(f"Недостатньо даних для {asset}")
             return None
         
-        volatility = self.calculate_volatility(candles_data)
+        # Індикатори рахуємо локально, щоб модель не вгадувала їх зі свічок
+        if indicators is None:
+            indicators = IndicatorEngine.compute_batch({asset: candles_data})[asset]
+        indicators_str = IndicatorEngine.format_for_prompt(indicators)
+        patterns_str = self._similar_patterns(candles_data, language)
+        if patterns_str:
+            indicators_str += "\n" + patterns_str
+        # Старші таймфрейми (Resampler) - вже пораховані генератором з довшого ряду
+        timeframes_str = Resampler.format_for_prompt(timeframes, language)
+        if timeframes_str:
+            indicators_str += "\n" + timeframes_str
+        volatility = indicators['volatility']
         now_kyiv = Config.get_kyiv_time()
         
         # Фіксований час входу через 2 хвилини
@@ -66,15 +94,135 @@ class GroqAnalyzer:
         else:
             duration = 3
         
+        prompt_args = dict(
+            asset=asset,
+            language=language,
+            now_kyiv=now_kyiv,
+            volatility=volatility,
+            indicators_str=indicators_str,
+            duration=duration,
+            entry_time=entry_time,
+            candles_count=len(candles_data)
+        )
+        
         # Формуємо дані про свічки
-        candles_str = ""
-        for i, candle in enumerate(candles_data[-8:]):
-            time_str = candle.timestamp.strftime('%H:%M') if hasattr(candle, 'timestamp') else f"{i+1}"
-            candles_str += f"{time_str}: O={candle.open:.5f} C={candle.close:.5f}\n"
+        if Config.GROQ_PROMPT_FORMAT == 'compact':
+            # Свічкам дістається бюджет, що лишився після решти промпту
+            base_tokens = Helpers.estimate_tokens(self._build_prompt(candles_str="", **prompt_args))
+            candles_str = self._encode_candles(
+                candles_data, language, Config.GROQ_PROMPT_TOKEN_BUDGET - base_tokens
+            )
+        else:
+            candles_str = ""
+            for i, candle in enumerate(candles_data[-8:]):
+                time_str = candle.timestamp.strftime('%H:%M') if hasattr(candle, 'timestamp') else f"{i+1}"
+                candles_str += f"{time_str}: O={candle.open:.5f} C={candle.close:.5f}\n"
+        
+        prompt = self._build_prompt(candles_str=candles_str, **prompt_args)
         
+        return {
+            'asset': asset,
+            'prompt': prompt,
+            'now_kyiv': now_kyiv,
+            'volatility': volatility,
+            'indicators': indicators,
+            'candles_str': candles_str,
+            'indicators_str': indicators_str,
+            'duration': duration,
+            'entry_time': entry_time,
+            'candles_count': len(candles_data),
+            'cache_key': self._cache_key(asset, candles_data, language, patterns_str + timeframes_str)
+        }
+    
+    def _build_batch_prompt(self, contexts, language='uk'):
+        """Один промпт для кількох активів з відповіддю у вигляді JSON-масиву"""
+        now_kyiv = contexts[0]['now_kyiv']
+        entry_time = contexts[0]['entry_time']
+        sections = []
+        
+        for context in contexts:
+            if language == 'ru':
+                sections.append(f"""### {context['asset']}
+Волатильность: {context['volatility']:.2f}%, длительность: {context['duration']} мин
+Последние свечи:
+{context['candles_str']}Индикаторы ({context['candles_count']} свечей):
+{context['indicators_str']}
+""")
+            else:
+                sections.append(f"""### {context['asset']}
+Волатильність: {context['volatility']:.2f}%, тривалість: {context['duration']} хв
+Останні свічки:
+{context['candles_str']}Індикатори ({context['candles_count']} свічок):
+{context['indicators_str']}
+""")
+        
+        assets_block = "\n".join(sections)
+        if language == 'ru':
+            return f"""
+Таймфрейм: 1 минута
+Текущее время: {now_kyiv.strftime('%H:%M:%S')}
+Время входа: {entry_time}
+Минимальная уверенность: 75%
+
+{assets_block}
+Для КАЖДОГО актива отдельно проанализируй индикаторы RSI, MACD, Bollinger Bands, EMA 9/21, Stochastic, ATR, тренд и свечные паттерны.
+
+Ответ в JSON, ровно один элемент на актив:
+{{
+    "signals": [
+        {{
+            "asset": "название актива",
+            "direction": "UP или DOWN",
+            "confidence": 0.85,
+            "entry_time": "{entry_time}",
+            "duration": 3,
+            "reason": "Краткий анализ"
+        }}
+    ]
+}}
+"""
+        return f"""
+Таймфрейм: 1 хвилина
+Поточний час: {now_kyiv.strftime('%H:%M:%S')}
+Час входу: {entry_time}
+Мінімальна впевненість: 75%
+
+{assets_block}
+Для КОЖНОГО активу окремо проаналізуй індикатори RSI, MACD, Bollinger Bands, EMA 9/21, Stochastic, ATR, тренд та свічкові патерни.
+
+Відповідь у JSON, рівно один елемент на актив:
+{{
+    "signals": [
+        {{
+            "asset": "назва активу",
+            "direction": "UP або DOWN",
+            "confidence": 0.85,
+            "entry_time": "{entry_time}",
+            "duration": 3,
+            "reason": "Короткий аналіз"
+        }}
+    ]
+}}
+"""
+    
+    def _encode_candles(self, candles_data, language, token_budget):
+        """Компактний блок свічок: база + відхилення OHLC у кроках ціни"""
+        encoded, base, step, count = Helpers.encode_candles_compact(
+            candles_data, Config.GROQ_PROMPT_MAX_CANDLES, max(token_budget, 0)
+        )
+        digits = int(round(-math.log10(step)))
+        if language == 'ru':
+            legend = f"{count} свечей от старой к новой; база {base:.{digits}f}, шаг {step:.{digits}f}; O,H,L,C = база + N*шаг"
+        else:
+            legend = f"{count} свічок від старої до нової; база {base:.{digits}f}, крок {step:.{digits}f}; O,H,L,C = база + N*крок"
+        return f"{legend}\n{encoded}\n"
+    
+    def _build_prompt(self, asset, language, now_kyiv, volatility, candles_str, indicators_str,
+                      duration, entry_time, candles_count):
+        """Текст промпту для одного активу"""
         # Дуже простий промпт, як у робочому коді
         if language == 'ru':
-            prompt = f"""
+            return f"""
 Актив: {asset}
 Таймфрейм: 1 минута
 Текущее время: {now_kyiv.strftime('%H:%M:%S')}
@@ -82,8 +230,10 @@ class GroqAnalyzer:
 
 Последние свечи:
 {candles_str}
+Индикаторы (рассчитаны по последним {candles_count} свечам):
+{indicators_str}
 
-Проанализируй RSI, MACD, Bollinger Bands, EMA 9/21, Stochastic, тренд и свечные паттерны.
+Проанализируй приведённые индикаторы RSI, MACD, Bollinger Bands, EMA 9/21, Stochastic, ATR, тренд и свечные паттерны.
 Минимальная уверенность: 75%
 Длительность: {duration} мин
 Время входа: {entry_time}
@@ -100,7 +250,7 @@ class GroqAnalyzer:
 }}
 """
         else:
-            prompt = f"""
+            return f"""
 Актив: {asset}
 Таймфрейм: 1 хвилина
 Поточний час: {now_kyiv.strftime('%H:%M:%S')}
@@ -108,8 +258,10 @@ class GroqAnalyzer:
 
 Останні свічки:
 {candles_str}
+Індикатори (розраховані за останніми {candles_count} свічками):
+{indicators_str}
 
-Проаналізуй RSI, MACD, Bollinger Bands, EMA 9/21, Stochastic, тренд та свічкові патерни.
+Проаналізуй наведені індикатори RSI, MACD, Bollinger Bands, EMA 9/21, Stochastic, ATR, тренд та свічкові патерни.
 Мінімальна впевненість: 75%
 Тривалість: {duration} хв
 Час входу: {entry_time}
@@ -125,53 +277,263 @@ class GroqAnalyzer:
     "timestamp": "{now_kyiv.strftime('%Y-%m-%d %H:%M:%S')}"
 }}
 """
+    
+    def _similar_patterns(self, candles_data, language):
+        """Рядок про k найближчих минулих ситуацій з пам'яті шаблонів"""
+        if not self.pattern_memory:
+            return ""
+        similar = self.pattern_memory.query(candles_data)
+        if not similar or similar['count'] < Config.PATTERN_MIN_SAMPLES:
+            return ""
+        return self.pattern_memory.format_for_prompt(similar, language)
+    
+    def _cache_key(self, asset, candles_data, language, patterns_str=""):
+        if not self.response_cache:
+            return None
+        # Нова статистика схожих ситуацій змінює промпт, тож і ключ
+        return ResponseCache.make_key(
+            asset, candles_data, Config.GROQ_MODEL, language,
+            f"{self.PROMPT_VERSION}-{Config.GROQ_PROMPT_FORMAT}-{patterns_str}"
+        )
+    
+    def _cached_response(self, context):
+        """Відповідь з кешу без звернення до мережі"""
+        if not context['cache_key']:
+            return None
+        response_text = self.response_cache.get(context['cache_key'])
+        if response_text is not None:
+            logger.info(f"💾 Відповідь AI для {context['asset']} взято з кешу")
+            self.usage.record_cache_hit(context['asset'])
+        return response_text
+    
+    def _store_response(self, context, response_text):
+        if context['cache_key'] and context.get('cacheable'):
+            self.response_cache.put(context['cache_key'], response_text)
+    
+    def flush_cache(self):
+        """Збереження кешу відповідей на диск"""
+        if self.response_cache:
+            self.response_cache.log_summary()
+            self.response_cache.save()
+    
+    def _completion_params(self, prompt, max_tokens=None):
+        """Параметри запиту до Groq"""
+        return dict(
+            model=Config.GROQ_MODEL,
+            messages=[
+                {
+                    "role": "system", 
+                    "content": "Ти трейдер. Відповідай у JSON."
+                },
+                {
+                    "role": "user", 
+                    "content": prompt
+                }
+            ],
+            temperature=0.3,
+            max_tokens=max_tokens or Config.GROQ_MAX_TOKENS,
+            response_format={"type": "json_object"}
+        )
+    
+    def _parse_response(self, context, response_text):
+        """Розбір та перевірка відповіді AI"""
+        logger.debug(f"AI відповідь: {response_text[:200]}...")
+        return self._validate_response(context, json.loads(response_text))
+    
+    def _validate_response(self, context, response):
+        """Перевірка обов'язкових полів і впевненості одного сигналу"""
+        asset = context['asset']
+        now_kyiv = context['now_kyiv']
+        volatility = context['volatility']
+        
+        if not isinstance(response, dict):
+            logger.error(f"⚠️ Відповідь AI для {asset} не є JSON-об'єктом")
+            return None
+        
+        # Перевірка обов'язкових полів
+        required_fields = ['asset', 'direction', 'confidence', 'entry_time', 'duration']
+        for field in required_fields:
+            if field not in response:
+                logger.error(f"⚠️ Відповідь AI не містить поле {field}")
+                return None
+        context['cacheable'] = True
+        
+        # Додаємо додаткові поля
+        response['generated_at'] = now_kyiv.isoformat()
+        response['volatility'] = volatility
+        response['id'] = f"{asset}_{now_kyiv.strftime('%Y%m%d%H%M%S')}"
+        
+        # Перевірка впевненості
+        confidence = response.get('confidence', 0)
+        if confidence < Config.MIN_CONFIDENCE:
+            logger.warning(f"⚠️ Сигнал для {asset} має низьку впевненість: {confidence*100:.1f}% < {Config.MIN_CONFIDENCE*100}%")
+            return None
+        
+        logger.info(f"✅ AI повернув сигнал для {asset}: {response['direction']} ({confidence*100:.1f}%)")
+        return response
+    
+    @metrics.timed('groq_analyze', mode='sync')
+    def analyze_market(self, asset, candles_data, language='uk', indicators=None, timeframes=None):
+        """
+        Аналіз ринку через GPT OSS 120B AI з підтримкою мов (блокуючий виклик)
+        """
+        if not self.client:
+            logger.error("Groq AI не ініціалізовано.")
+            return None
+        
+        context = self._prepare_analysis(asset, candles_data, language, indicators, timeframes)
+        if not context:
+            return None
         
         try:
-            logger.info(f"🧠 Аналіз через {Config.GROQ_MODEL} для {asset}...")
-            
-            completion = self.client.chat.completions.create(
-                model=Config.GROQ_MODEL,
-                messages=[
-                    {
-                        "role": "system", 
-                        "content": "Ти трейдер. Відповідай у JSON."
-                    },
-                    {
-                        "role": "user", 
-                        "content": prompt
-                    }
-                ],
-                temperature=0.3,
-                max_tokens=800,
-                response_format={"type": "json_object"}
-            )
+            response_text = self._cached_response(context)
+            if response_text is not None:
+                return self._parse_response(context, response_text)
             
+            logger.info(f"🧠 Аналіз через {Config.GROQ_MODEL} для {asset}...")
+            started = time.monotonic()
+            with metrics.span('groq_request', mode='sync'):
+                completion = self.client.chat.completions.create(**self._completion_params(context['prompt']))
+            self.usage.record([asset], getattr(completion, 'usage', None), time.monotonic() - started)
             response_text = completion.choices[0].message.content
-            logger.debug(f"AI відповідь: {response_text[:200]}...")
-            
-            response = json.loads(response_text)
+            signal = self._parse_response(context, response_text)
+            self._store_response(context, response_text)
+            return signal
             
-            # Перевірка обов'язкових полів
-            required_fields = ['asset', 'direction', 'confidence', 'entry_time', 'duration']
-            for field in required_fields:
-                if field not in response:
-                    logger.error(f"⚠️ Відповідь AI не містить поле {field}")
-                    return None
-            
-            # Додаємо додаткові поля
-            response['generated_at'] = now_kyiv.isoformat()
-            response['volatility'] = volatility
-            response['id'] = f"{asset}_{now_kyiv.strftime('%Y%m%d%H%M%S')}"
-            
-            # Перевірка впевненості
-            confidence = response.get('confidence', 0)
-            if confidence < Config.MIN_CONFIDENCE:
-                logger.warning(f"⚠️ Сигнал для {asset} має низьку впевненість: {confidence*100:.1f}% < {Config.MIN_CONFIDENCE*100}%")
-                return None
+        except Exception as e:
+            logger.error(f"❌ Groq AI error: {e}")
+            return None
+    
+    @metrics.timed('groq_analyze', mode='single')
+    async def analyze_market_async(self, asset, candles_data, language='uk', indicators=None, timeframes=None):
+        """
+        Асинхронний аналіз ринку: не блокує цикл подій, кількість
+        одночасних запитів обмежена GROQ_MAX_IN_FLIGHT
+        """
+        if not self.async_client:
+            logger.error("Groq AI не ініціалізовано.")
+            return None
+        
+        context = self._prepare_analysis(asset, candles_data, language, indicators, timeframes)
+        if not context:
+            return None
+        
+        if self._in_flight is None:
+            self._in_flight = asyncio.Semaphore(self.max_in_flight)
+        
+        try:
+            response_text = self._cached_response(context)
+            if response_text is not None:
+                return self._parse_response(context, response_text)
             
-            logger.info(f"✅ AI повернув сигнал для {asset}: {response['direction']} ({confidence*100:.1f}%)")
-            return response
+            async with self._in_flight:
+                logger.info(f"🧠 Асинхронний аналіз через {Config.GROQ_MODEL} для {asset}...")
+                started = time.monotonic()
+                with metrics.span('groq_request', mode='single'):
+                    completion = await self.async_client.chat.completions.create(
+                        **self._completion_params(context['prompt'])
+                    )
+                self.usage.record([asset], getattr(completion, 'usage', None), time.monotonic() - started)
+            response_text = completion.choices[0].message.content
+            signal = self._parse_response(context, response_text)
+            self._store_response(context, response_text)
+            return signal
             
         except Exception as e:
             logger.error(f"❌ Groq AI error: {e}")
             return None
+    
+    @metrics.timed('groq_analyze', mode='batch')
+    async def analyze_batch_async(self, items, language='uk'):
+        """
+        Пакетний аналіз кількох активів одним запитом до AI.
+        
+        items - список {'asset', 'candles', 'indicators', 'timeframes'}. Повертає {актив: сигнал або None}.
+        Елементи з невалідною відповіддю повторно аналізуються поодинці.
+        """
+        if not self.async_client:
+            logger.error("Groq AI не ініціалізовано.")
+            return {}
+        
+        results = {}
+        contexts = []
+        for item in items:
+            context = self._prepare_analysis(
+                item['asset'], item['candles'], language, item.get('indicators'), item.get('timeframes')
+            )
+            if not context:
+                results[item['asset']] = None
+                continue
+            
+            response_text = self._cached_response(context)
+            if response_text is not None:
+                results[item['asset']] = self._parse_response(context, response_text)
+            else:
+                contexts.append(context)
+        
+        if not contexts:
+            return results
+        
+        if len(contexts) == 1:
+            item = next(item for item in items if item['asset'] == contexts[0]['asset'])
+            results[item['asset']] = await self.analyze_market_async(
+                item['asset'], item['candles'], language, item.get('indicators'), item.get('timeframes')
+            )
+            return results
+        
+        if self._in_flight is None:
+            self._in_flight = asyncio.Semaphore(self.max_in_flight)
+        
+        elements = {}
+        try:
+            prompt = self._build_batch_prompt(contexts, language)
+            async with self._in_flight:
+                logger.info(f"🧠 Пакетний аналіз {len(contexts)} активів через {Config.GROQ_MODEL}...")
+                started = time.monotonic()
+                with metrics.span('groq_request', mode='batch'):
+                    completion = await self.async_client.chat.completions.create(
+                        **self._completion_params(prompt, max_tokens=max(Config.GROQ_MAX_TOKENS, 300 * len(contexts)))
+                    )
+                self.usage.record(
+                    [context['asset'] for context in contexts],
+                    getattr(completion, 'usage', None), time.monotonic() - started
+                )
+            response = json.loads(completion.choices[0].message.content)
+            for element in response.get('signals', []) if isinstance(response, dict) else []:
+                if isinstance(element, dict) and element.get('asset') not in elements:
+                    elements[element.get('asset')] = element
+        except Exception as e:
+            logger.error(f"❌ Groq AI batch error: {e}")
+        
+        fallback = []
+        for context in contexts:
+            asset = context['asset']
+            element = elements.get(asset)
+            signal = None
+            if element is not None:
+                element_text = json.dumps(element, ensure_ascii=False)
+                try:
+                    signal = self._validate_response(context, element)
+                except Exception as e:
+                    logger.error(f"⚠️ Невалідний елемент пакетної відповіді для {asset}: {e}")
+                    context['cacheable'] = False
+            
+            if context.get('cacheable'):
+                results[asset] = signal
+                self._store_response(context, element_text)
+            else:
+                fallback.append(asset)
+        
+        if fallback:
+            logger.warning(f"⚠️ Пакетна відповідь невалідна для {fallback}, аналізую поодинці")
+            by_asset = {item['asset']: item for item in items}
+            signals = await asyncio.gather(*(
+                self.analyze_market_async(
+                    asset, by_asset[asset]['candles'], language, by_asset[asset].get('indicators'),
+                    by_asset[asset].get('timeframes')
+                )
+                for asset in fallback
+            ))
+            results.update(zip(fallback, signals))
+        
+        return results
@@ -0,0 +1,223 @@
+import json
+import logging
+import os
+import threading
+from datetime import timedelta
+from itertools import islice
+from config import Config
+from unit_of_work import atomic_write, dump_json
+
+logger = logging.getLogger("signal_bot")
+
+
+class HistoryStore:
+    """Історія сигналів у вигляді журналу JSONL з добовими сегментами.
+
+    Запис - дописування рядків у сегмент поточної доби (O(1) від розміру
+    історії). Читання йде з кінця: від найновішого сегмента до найстарішого
+    і від останнього рядка до першого, тож сторінка останніх записів не
+    потребує завантаження всієї історії. Закриті сегменти стискаються
+    у фоновому потоці: дублікати history_id прибираються, сегменти старші
+    за HISTORY_RETENTION_DAYS видаляються.
+    """
+
+    SEGMENT_SUFFIX = '.jsonl'
+    INDEX_FILE = 'index.json'
+    READ_BLOCK = 64 * 1024
+
+    def __init__(self, history_dir=None, retention_days=None):
+        self.history_dir = str(history_dir or Config.HISTORY_DIR)
+        self.retention_days = retention_days if retention_days is not None else Config.HISTORY_RETENTION_DAYS
+        self._lock = threading.Lock()
+        self._compaction = None
+        os.makedirs(self.history_dir, exist_ok=True)
+
+    def _segment_path(self, name):
+        return os.path.join(self.history_dir, f"{name}{self.SEGMENT_SUFFIX}")
+
+    def segments(self):
+        """Назви сегментів (YYYY-MM-DD) від старого до нового"""
+        return sorted(
+            entry[:-len(self.SEGMENT_SUFFIX)]
+            for entry in os.listdir(self.history_dir)
+            if entry.endswith(self.SEGMENT_SUFFIX)
+        )
+
+    def append(self, entries, now=None):
+        """Дописування записів у сегмент поточної доби (Київ)"""
+        if not entries:
+            return 0
+        now = now or Config.get_kyiv_time()
+        lines = ''.join(
+            json.dumps(entry, ensure_ascii=False, default=str, separators=(',', ':')) + '\n'
+            for entry in entries
+        )
+        with self._lock:
+            with open(self._segment_path(now.strftime('%Y-%m-%d')), 'a', encoding='utf-8') as f:
+                f.write(lines)
+        return len(entries)
+
+    def _read_reverse(self, path):
+        """Рядки файлу з кінця, блоками по READ_BLOCK байт"""
+        with open(path, 'rb') as f:
+            f.seek(0, os.SEEK_END)
+            position = f.tell()
+            remainder = b''
+            while position > 0:
+                size = min(self.READ_BLOCK, position)
+                position -= size
+                f.seek(position)
+                lines = (f.read(size) + remainder).split(b'\n')
+                remainder = lines.pop(0)
+                for line in reversed(lines):
+                    if line.strip():
+                        yield line
+            if remainder.strip():
+                yield remainder
+
+    def iter_recent(self, asset=None):
+        """Потокове читання записів від найновішого до найстарішого"""
+        for name in reversed(self.segments()):
+            try:
+                for line in self._read_reverse(self._segment_path(name)):
+                    try:
+                        entry = json.loads(line)
+                    except ValueError:
+                        # Недописаний рядок після аварійної зупинки
+                        continue
+                    if asset is None or entry.get('asset') == asset:
+                        yield entry
+            except FileNotFoundError:
+                # Сегмент видалено компакцією під час читання
+                continue
+
+    def recent(self, limit, asset=None):
+        """Останні limit записів від старого до нового (формат history.json)"""
+        entries = list(islice(self.iter_recent(asset), limit))
+        entries.reverse()
+        return entries
+
+    def page(self, page=0, page_size=50, asset=None):
+        """Сторінка історії, page=0 - найновіші записи"""
+        start = page * page_size
+        return list(islice(self.iter_recent(asset), start, start + page_size))
+
+    def import_json(self, history_file, key=None):
+        """Одноразове перенесення старого history.json (або списку key JSON-документа) у сегменти"""
+        if self.segments() or not os.path.exists(history_file):
+            return 0
+        try:
+            with open(history_file, 'r', encoding='utf-8') as f:
+                history = json.load(f)
+        except Exception as e:
+            logger.warning(f"⚠️ Не вдалося прочитати {history_file} для перенесення: {e}")
+            return 0
+        if key is not None:
+            history = history.get(key) if isinstance(history, dict) else None
+
+        by_segment = {}
+        for entry in history if isinstance(history, list) else []:
+            saved_at = str(entry.get('saved_at') or entry.get('generated_at') or entry.get('feedback_at') or '')
+            name = saved_at[:10] if len(saved_at) >= 10 else Config.get_kyiv_time().strftime('%Y-%m-%d')
+            by_segment.setdefault(name, []).append(entry)
+
+        with self._lock:
+            for name, entries in by_segment.items():
+                with open(self._segment_path(name), 'a', encoding='utf-8') as f:
+                    for entry in entries:
+                        f.write(json.dumps(entry, ensure_ascii=False, default=str, separators=(',', ':')) + '\n')
+
+        count = sum(len(entries) for entries in by_segment.values())
+        if count:
+            logger.info(f"📚 Перенесено {count} записів історії у {len(by_segment)} сегментів")
+        return count
+
+    def _load_index(self):
+        try:
+            with open(os.path.join(self.history_dir, self.INDEX_FILE), 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {'compacted': []}
+
+    def _save_index(self, index):
+        atomic_write(os.path.join(self.history_dir, self.INDEX_FILE), dump_json(index, indent=None))
+
+    def _compact_segment(self, name):
+        """Перезапис закритого сегмента без дублікатів history_id (залишається останній запис)"""
+        path = self._segment_path(name)
+        entries = {}
+        with open(path, 'r', encoding='utf-8') as f:
+            for number, line in enumerate(f):
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    continue
+                key = entry.get('history_id') or f"#{number}"
+                entries.pop(key, None)
+                entries[key] = entry
+
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            for entry in entries.values():
+                f.write(json.dumps(entry, ensure_ascii=False, default=str, separators=(',', ':')) + '\n')
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+        return len(entries)
+
+    def compact(self, now=None):
+        """Компакція закритих сегментів і застосування терміну зберігання"""
+        now = now or Config.get_kyiv_time()
+        today = now.strftime('%Y-%m-%d')
+        cutoff = (now - timedelta(days=self.retention_days)).strftime('%Y-%m-%d') if self.retention_days else None
+
+        index = self._load_index()
+        compacted = set(index.get('compacted', []))
+        removed = 0
+        rewritten = 0
+
+        for name in self.segments():
+            if name >= today:
+                continue
+            if cutoff and name < cutoff:
+                with self._lock:
+                    os.remove(self._segment_path(name))
+                compacted.discard(name)
+                removed += 1
+                continue
+            if name in compacted:
+                continue
+            with self._lock:
+                self._compact_segment(name)
+            compacted.add(name)
+            rewritten += 1
+
+        existing = set(self.segments())
+        index['compacted'] = sorted(compacted & existing)
+        self._save_index(index)
+
+        if removed or rewritten:
+            logger.info(f"🗜️ Компакція історії: стиснуто {rewritten}, видалено {removed} сегментів")
+        return rewritten, removed
+
+    def compact_in_background(self):
+        """Запуск компакції у фоновому потоці (не більше одного одночасно).
+
+        Потік не є демоном, тож інтерпретатор дочекається його завершення.
+        """
+        if self._compaction and self._compaction.is_alive():
+            return self._compaction
+
+        def run():
+            try:
+                self.compact()
+            except Exception as e:
+                logger.warning(f"⚠️ Помилка компакції історії: {e}")
+
+        self._compaction = threading.Thread(target=run, name='history-compaction')
+        self._compaction.start()
+        return self._compaction
+
+    def wait(self, timeout=None):
+        if self._compaction:
+            self._compaction.join(timeout)
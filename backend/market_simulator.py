@@ -0,0 +1,206 @@
+import zlib
+from collections import namedtuple
+from datetime import datetime
+import numpy as np
+import pytz
+
+Candle = namedtuple('Candle', ['timestamp', 'open', 'high', 'low', 'close'])
+
+SECONDS_PER_YEAR = 365 * 24 * 3600
+
+# Параметри активів: початкова ціна, річна волатильність, знаків після коми
+ASSET_PROFILES = {
+    'EURUSD': {'price': 1.0850, 'volatility': 0.07, 'decimals': 5},
+    'GBPUSD': {'price': 1.2700, 'volatility': 0.08, 'decimals': 5},
+    'AUDUSD': {'price': 0.6600, 'volatility': 0.09, 'decimals': 5},
+    'USDCAD': {'price': 1.3600, 'volatility': 0.06, 'decimals': 5},
+    'USDCHF': {'price': 0.8800, 'volatility': 0.07, 'decimals': 5},
+    'USDJPY': {'price': 150.00, 'volatility': 0.09, 'decimals': 3},
+    'EURJPY': {'price': 162.00, 'volatility': 0.09, 'decimals': 3},
+    'GBPJPY': {'price': 190.00, 'volatility': 0.10, 'decimals': 3},
+}
+DEFAULT_PROFILE = {'price': 100.0, 'volatility': 0.15, 'decimals': 3}
+
+# Режими ринку: множник волатильності, дрейф (річний, знак випадковий), середня тривалість у свічках
+REGIMES = (
+    {'name': 'calm', 'vol': 0.6, 'drift': 0.0, 'duration': 240},
+    {'name': 'trend', 'vol': 1.0, 'drift': 2.0, 'duration': 120},
+    {'name': 'volatile', 'vol': 2.2, 'drift': 0.0, 'duration': 45},
+)
+# Частка часу в режимі пропорційна тривалості; нормування тримає середню дисперсію профільною
+REGIME_VOL_NORM = (
+    sum(r['vol'] ** 2 * r['duration'] for r in REGIMES) / sum(r['duration'] for r in REGIMES)
+) ** 0.5
+
+
+class _AssetState:
+    """Стан ряду активу між чанками: ціна, лог-волатильність, поточний режим"""
+
+    def __init__(self, rng, price, timestamp):
+        self.rng = rng
+        self.price = price
+        self.log_vol = 0.0
+        self.regime = 0
+        self.regime_left = 0
+        self.drift_sign = 1.0
+        self.timestamp = timestamp
+
+
+class MarketSimulator:
+    """Векторизований генератор OHLC-свічок з фіксованим seed.
+
+    Модель на актив: геометричний броунівський рух, волатильність якого
+    множиться на марковський режим (спокій / тренд / сплеск) та на
+    AR(1)-процес лог-волатильності (кластеризація: великі рухи йдуть
+    групами). Ряд кожного активу має власний генератор NumPy від
+    (seed, актив), тож результат не залежить від порядку запитів, а
+    послідовні виклики generate продовжують той самий ряд.
+    """
+
+    def __init__(self, seed=None, timeframe=60, vol_persistence=0.98, vol_of_vol=0.15, block=256):
+        self.seed = seed
+        self.timeframe = timeframe
+        self.vol_persistence = vol_persistence
+        self.vol_of_vol = vol_of_vol
+        self.block = block
+        self._states = {}
+
+    @staticmethod
+    def profile(asset):
+        return ASSET_PROFILES.get(asset.replace('/', '').split('_')[0].upper(), DEFAULT_PROFILE)
+
+    def _state(self, asset, start=None):
+        state = self._states.get(asset)
+        if state is None:
+            seed = None if self.seed is None else [int(self.seed), zlib.crc32(asset.encode())]
+            start = start if start is not None else datetime(2024, 1, 1, tzinfo=pytz.UTC).timestamp()
+            state = _AssetState(np.random.default_rng(seed), self.profile(asset)['price'], start)
+            self._states[asset] = state
+        return state
+
+    def reset(self, asset=None):
+        if asset is None:
+            self._states.clear()
+        else:
+            self._states.pop(asset, None)
+
+    def _regimes(self, state, count):
+        """Індекси режимів на count свічок (тривалості - геометричні, одним викликом)"""
+        regimes = np.empty(count, dtype=np.int8)
+        drift_signs = np.empty(count)
+        filled = min(state.regime_left, count)
+        regimes[:filled] = state.regime
+        drift_signs[:filled] = state.drift_sign
+        state.regime_left -= filled
+
+        rng = state.rng
+        while filled < count:
+            # Запас відрізків з надлишком, щоб зазвичай вистачало одного проходу
+            segments = max(8, (count - filled) // 100 + 8)
+            chain = (state.regime + np.cumsum(rng.integers(1, len(REGIMES), segments))) % len(REGIMES)
+            lengths = rng.geometric(1 / np.array([REGIMES[i]['duration'] for i in chain]))
+            signs = rng.choice((-1.0, 1.0), segments)
+
+            ends = np.cumsum(lengths)
+            take = min(count - filled, int(ends[-1]))
+            last = int(np.searchsorted(ends, take))
+            regimes[filled:filled + take] = np.repeat(chain[:last + 1], lengths[:last + 1])[:take]
+            drift_signs[filled:filled + take] = np.repeat(signs[:last + 1], lengths[:last + 1])[:take]
+
+            state.regime = int(chain[last])
+            state.drift_sign = float(signs[last])
+            state.regime_left = int(ends[last]) - take
+            filled += take
+        return regimes, drift_signs
+
+    def _log_vol(self, state, shocks):
+        """AR(1) лог-волатильності блоками: всередині блоку - cumsum, між блоками - перенос стану"""
+        phi = self.vol_persistence
+        count = len(shocks)
+        block = self.block
+        padded = -(-count // block) * block
+        eps = np.zeros(padded)
+        eps[:count] = shocks
+        eps = eps.reshape(-1, block)
+
+        powers = phi ** np.arange(block)
+        # z[b, j] = sum_k<=j phi^(j-k) * eps[b, k]
+        inner = np.cumsum(eps / powers, axis=1) * powers
+        carry = np.empty(len(eps))
+        value = state.log_vol
+        phi_block = phi ** block
+        for b, last in enumerate(inner[:, -1]):
+            carry[b] = value
+            value = phi_block * value + last
+        log_vol = (inner + np.outer(carry, powers * phi)).ravel()[:count]
+        state.log_vol = float(log_vol[-1])
+        return log_vol
+
+    def generate(self, asset, count, start=None):
+        """Наступні count свічок ряду як масиви NumPy: timestamp (epoch), open, high, low, close"""
+        state = self._state(asset, start)
+        if start is not None:
+            state.timestamp = float(start)
+        profile = self.profile(asset)
+        rng = state.rng
+        dt = self.timeframe / SECONDS_PER_YEAR
+
+        regimes, drift_signs = self._regimes(state, count)
+        regime_vol = np.array([r['vol'] / REGIME_VOL_NORM for r in REGIMES])[regimes]
+        regime_drift = np.array([r['drift'] for r in REGIMES])[regimes] * drift_signs
+
+        # Стаціонарна дисперсія AR(1); зсув -var дає E[sigma²] рівним профільній дисперсії
+        stationary_var = self.vol_of_vol ** 2 / (1 - self.vol_persistence ** 2)
+        log_vol = self._log_vol(state, rng.standard_normal(count) * self.vol_of_vol)
+        sigma = profile['volatility'] * regime_vol * np.exp(log_vol - stationary_var)
+
+        shocks = rng.standard_normal(count)
+        returns = (regime_drift - sigma ** 2 / 2) * dt + sigma * np.sqrt(dt) * shocks
+        close = state.price * np.exp(np.cumsum(returns))
+        open_ = np.empty(count)
+        open_[0] = state.price
+        open_[1:] = close[:-1]
+
+        # Внутрішньосвічковий розмах пропорційний поточній волатильності
+        wick = sigma * np.sqrt(dt) * 0.5
+        body_high = np.maximum(open_, close)
+        body_low = np.minimum(open_, close)
+        high = body_high * (1 + np.abs(rng.standard_normal(count)) * wick)
+        low = body_low * (1 - np.abs(rng.standard_normal(count)) * wick)
+
+        decimals = profile['decimals']
+        timestamps = state.timestamp + np.arange(count, dtype=np.float64) * self.timeframe
+        state.price = float(close[-1])
+        state.timestamp = float(timestamps[-1] + self.timeframe)
+        return {
+            'timestamp': timestamps,
+            'open': np.round(open_, decimals),
+            'high': np.round(high, decimals),
+            'low': np.round(low, decimals),
+            'close': np.round(close, decimals),
+            'regime': regimes
+        }
+
+    def stream(self, asset, chunk_size=100_000, chunks=None, start=None):
+        """Нескінченний (або chunks штук) потік чанків generate одного ряду"""
+        produced = 0
+        while chunks is None or produced < chunks:
+            yield self.generate(asset, chunk_size, start if produced == 0 else None)
+            produced += 1
+
+    def candles(self, asset, count, start=None, end=None):
+        """Свічки-namedtuple з datetime (UTC), сумісні з клієнтом PocketOption.
+        end - момент закриття останньої свічки (вирівнюється на таймфрейм)"""
+        if end is not None:
+            end_ts = end.timestamp() if isinstance(end, datetime) else float(end)
+            start = (end_ts // self.timeframe) * self.timeframe - count * self.timeframe
+        elif isinstance(start, datetime):
+            start = start.timestamp()
+        arrays = self.generate(asset, count, start)
+        return [
+            Candle(datetime.fromtimestamp(ts, pytz.UTC), o, h, l, c)
+            for ts, o, h, l, c in zip(
+                arrays['timestamp'].tolist(), arrays['open'].tolist(), arrays['high'].tolist(),
+                arrays['low'].tolist(), arrays['close'].tolist()
+            )
+        ]
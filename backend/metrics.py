@@ -0,0 +1,241 @@
+import asyncio
+import functools
+import logging
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from contextvars import ContextVar
+from datetime import datetime
+from config import Config
+from unit_of_work import atomic_write, dump_json
+
+logger = logging.getLogger("signal_bot")
+
+PREFIX = 'signal_bot_'
+# Межі кошиків гістограм тривалості, секунди
+BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+MAX_TRACE_SPANS = 2000
+
+# Поточний відрізок (для вкладеності) і поточний запуск, свої для кожної задачі asyncio
+_current_span = ContextVar('current_span', default=None)
+_current_run = ContextVar('current_run', default=None)
+
+
+def _key(labels):
+    return tuple(sorted((name, str(value)) for name, value in labels.items()))
+
+
+class RunScope:
+    """Лічильники, тривалості та трасування одного запуску (цикл за розкладом або тригер)"""
+
+    def __init__(self, source):
+        self.source = source
+        self.started = time.perf_counter()
+        self.started_at = Config.get_kyiv_time().isoformat()
+        self.spans = []
+        self.counters = {}
+        self.durations = {}
+
+
+class Metrics:
+    """Легкі метрики циклу генерації: лічильники, гауги, гістограми та трасування відрізків.
+
+    Гістограми і лічильники накопичуються за весь час процесу (для Prometheus),
+    трасування та підсумок - окремо для кожного запуску run(source): записане поза
+    запуском потрапляє лише в Prometheus. Наприкінці запуску save() пише останній
+    підсумок кожного джерела у metrics.json поруч із signals.json, а трасування
+    і текстовий файл Prometheus (textfile collector node_exporter) - у cache/,
+    щоб вони не потрапляли в коміт кожного запуску.
+    """
+
+    def __init__(self, enabled=None):
+        self.enabled = Config.METRICS_ENABLED if enabled is None else enabled
+        self.counters = {}
+        self.gauges = {}
+        self.histograms = {}
+        self.last_runs = {}  # джерело -> {'summary', 'trace'} останнього завершеного запуску
+
+    @contextmanager
+    def run(self, source='cycle'):
+        """Запуск: записи цієї задачі та її дочірніх задач - у власний підсумок, наприкінці - save()"""
+        scope = RunScope(source)
+        token = _current_run.set(scope)
+        try:
+            with self.span('run', source=source):
+                yield scope
+        finally:
+            _current_run.reset(token)
+            self.save(scope)
+
+    # Запис
+    def inc(self, name, value=1, **labels):
+        if not self.enabled:
+            return
+        key = _key(labels)
+        series = self.counters.setdefault(name, {})
+        series[key] = series.get(key, 0) + value
+        scope = _current_run.get()
+        if scope is not None:
+            run = scope.counters.setdefault(name, {})
+            run[key] = run.get(key, 0) + value
+
+    def gauge(self, name, value, **labels):
+        if not self.enabled:
+            return
+        self.gauges.setdefault(name, {})[_key(labels)] = value
+
+    def observe(self, name, seconds, **labels):
+        if not self.enabled:
+            return
+        key = _key(labels)
+        series = self.histograms.setdefault(name, {})
+        histogram = series.get(key)
+        if histogram is None:
+            histogram = series[key] = {'buckets': [0] * (len(BUCKETS) + 1), 'sum': 0.0, 'count': 0}
+        histogram['buckets'][bisect_left(BUCKETS, seconds)] += 1
+        histogram['sum'] += seconds
+        histogram['count'] += 1
+        scope = _current_run.get()
+        if scope is not None:
+            scope.durations.setdefault(name, {}).setdefault(key, []).append(seconds)
+
+    @contextmanager
+    def span(self, name, **labels):
+        """Відрізок часу: гістограма {name}_seconds, лічильник помилок і запис у трасування"""
+        if not self.enabled:
+            yield
+            return
+        parent = _current_span.get()
+        token = _current_span.set(name)
+        started = time.perf_counter()
+        status = 'ok'
+        try:
+            yield
+        except BaseException:
+            status = 'error'
+            self.inc(f"{name}_errors_total", **labels)
+            raise
+        finally:
+            elapsed = time.perf_counter() - started
+            _current_span.reset(token)
+            self.observe(f"{name}_seconds", elapsed, **labels)
+            scope = _current_run.get()
+            if scope is not None and len(scope.spans) < MAX_TRACE_SPANS:
+                scope.spans.append({
+                    'name': name,
+                    'parent': parent,
+                    'start_ms': round((started - scope.started) * 1000, 3),
+                    'duration_ms': round(elapsed * 1000, 3),
+                    'status': status,
+                    **({'labels': dict(labels)} if labels else {})
+                })
+
+    def timed(self, name, **labels):
+        """Декоратор: увесь виклик функції (звичайної чи async) - відрізок name"""
+        def decorator(func):
+            if asyncio.iscoroutinefunction(func):
+                @functools.wraps(func)
+                async def wrapper(*args, **kwargs):
+                    with self.span(name, **labels):
+                        return await func(*args, **kwargs)
+            else:
+                @functools.wraps(func)
+                def wrapper(*args, **kwargs):
+                    with self.span(name, **labels):
+                        return func(*args, **kwargs)
+            return wrapper
+        return decorator
+
+    # Експорт
+    def run_summary(self, scope):
+        """Підсумок запуску для metrics.json"""
+        durations = {}
+        for name, series in scope.durations.items():
+            for key, samples in series.items():
+                samples = sorted(samples)
+                durations.setdefault(name, []).append({
+                    'labels': dict(key),
+                    'count': len(samples),
+                    'sum': round(sum(samples), 6),
+                    'max': round(samples[-1], 6),
+                    'p50': round(samples[len(samples) // 2], 6),
+                    'p95': round(samples[min(len(samples) - 1, int(len(samples) * 0.95))], 6)
+                })
+        return {
+            'source': scope.source,
+            'run_started_at': scope.started_at,
+            'duration_seconds': round(time.perf_counter() - scope.started, 6),
+            'counters': {
+                name: [{'labels': dict(key), 'value': value} for key, value in series.items()]
+                for name, series in scope.counters.items()
+            },
+            'gauges': {
+                name: [{'labels': dict(key), 'value': value} for key, value in series.items()]
+                for name, series in self.gauges.items()
+            },
+            'durations': durations
+        }
+
+    @staticmethod
+    def trace(scope):
+        """Трасування відрізків запуску"""
+        return {'run_started_at': scope.started_at, 'spans': scope.spans}
+
+    @staticmethod
+    def _format_labels(key, extra=None):
+        items = list(key) + (list(extra.items()) if extra else [])
+        if not items:
+            return ''
+        escaped = (
+            f'{name}="' + str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n') + '"'
+            for name, value in items
+        )
+        return '{' + ','.join(escaped) + '}'
+
+    def prometheus(self):
+        """Текстовий формат Prometheus 0.0.4"""
+        lines = []
+        for name, series in sorted(self.counters.items()):
+            metric = PREFIX + (name if name.endswith('_total') else f"{name}_total")
+            lines.append(f"# TYPE {metric} counter")
+            lines.extend(f"{metric}{self._format_labels(key)} {value}" for key, value in series.items())
+        for name, series in sorted(self.gauges.items()):
+            metric = PREFIX + name
+            lines.append(f"# TYPE {metric} gauge")
+            lines.extend(f"{metric}{self._format_labels(key)} {value}" for key, value in series.items())
+        for name, series in sorted(self.histograms.items()):
+            metric = PREFIX + name
+            lines.append(f"# TYPE {metric} histogram")
+            for key, histogram in series.items():
+                cumulative = 0
+                for bound, count in zip(BUCKETS + (float('inf'),), histogram['buckets']):
+                    cumulative += count
+                    le = '+Inf' if bound == float('inf') else repr(bound)
+                    lines.append(f"{metric}_bucket{self._format_labels(key, {'le': le})} {cumulative}")
+                lines.append(f"{metric}_sum{self._format_labels(key)} {histogram['sum']:.6f}")
+                lines.append(f"{metric}_count{self._format_labels(key)} {histogram['count']}")
+        return '\n'.join(lines) + '\n'
+
+    def save(self, scope=None):
+        """Запис metrics.json (останній запуск кожного джерела), трасування та metrics.prom (накопичені значення).
+        Без scope - лише оновлення файлів (зупинка демона)"""
+        if not self.enabled:
+            return
+        try:
+            if scope is not None:
+                self.gauge('last_run_timestamp_seconds', round(datetime.now().timestamp(), 3), source=scope.source)
+                self.gauge('last_run_duration_seconds', round(time.perf_counter() - scope.started, 6),
+                           source=scope.source)
+                self.last_runs[scope.source] = {'summary': self.run_summary(scope), 'trace': self.trace(scope)}
+            if self.last_runs:
+                runs = self.last_runs.items()
+                atomic_write(Config.METRICS_FILE, dump_json({source: run['summary'] for source, run in runs}))
+                atomic_write(Config.METRICS_TRACE_FILE,
+                             dump_json({source: run['trace'] for source, run in runs}, indent=None))
+            atomic_write(Config.METRICS_PROM_FILE, self.prometheus().encode('utf-8'))
+        except Exception as e:
+            logger.warning(f"⚠️ Не вдалося зберегти метрики: {e}")
+
+
+# Спільний реєстр для всіх модулів процесу
+metrics = Metrics()
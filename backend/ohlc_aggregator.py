@@ -0,0 +1,139 @@
+import logging
+from datetime import datetime
+import pytz
+from market_simulator import Candle
+
+logger = logging.getLogger("signal_bot")
+
+# Пропуск довший за стільки свічок не заповнюється пласкими свічками (потік переривався)
+MAX_GAP_FILL = 30
+
+
+class BarState:
+    """Поточна (незакрита) свічка одного активу на одному таймфреймі"""
+    __slots__ = ('start', 'open', 'high', 'low', 'close', 'ticks', 'partial', 'last_close', 'last_start')
+
+    def __init__(self):
+        self.start = None  # час відкриття поточної свічки; None - між свічками
+        self.open = self.high = self.low = self.close = 0.0
+        self.ticks = 0
+        self.partial = True  # перша свічка після підписки почалася до неї - неповна
+        self.last_close = None
+        self.last_start = None  # час відкриття останньої закритої свічки
+
+    def begin(self, start, price):
+        self.start = start
+        self.open = self.high = self.low = self.close = price
+        self.ticks = 1
+
+
+class OhlcAggregator:
+    """Збирає тіки в OHLC-свічки для кількох таймфреймів.
+
+    Свічка закривається на межі таймфрейму: першим тіком наступного інтервалу
+    або таймером close_due(now), якщо тіків після межі ще не було. Перша свічка після
+    підписки неповна і не віддається (її дасть історія брокера). Пропуски без тіків
+    заповнюються пласкими свічками за ціною останнього закриття.
+    on_close(asset, timeframe, candle) викликається для кожної закритої свічки.
+    """
+
+    def __init__(self, timeframes, on_close=None):
+        self.timeframes = sorted(set(int(tf) for tf in timeframes))
+        self.on_close = on_close
+        self._states = {}  # актив -> [BarState на кожен таймфрейм]
+        self.stats = {'ticks': 0, 'late_ticks': 0, 'closed': 0, 'filled': 0, 'partial_dropped': 0}
+
+    def _asset_states(self, asset):
+        states = self._states.get(asset)
+        if states is None:
+            states = self._states[asset] = [BarState() for _ in self.timeframes]
+        return states
+
+    def reset(self, asset=None):
+        """Забуває поточні свічки (після перепідключення наступна свічка знову неповна)"""
+        if asset is None:
+            self._states.clear()
+        else:
+            self._states.pop(asset, None)
+
+    def update(self, asset, ts, price):
+        """Тік: ts - секунди epoch, price - ціна"""
+        if not price or price <= 0:
+            return
+        self.stats['ticks'] += 1
+        for timeframe, state in zip(self.timeframes, self._asset_states(asset)):
+            bucket = int(ts // timeframe) * timeframe
+            if state.start is None:
+                if state.last_start is not None and bucket <= state.last_start:
+                    self.stats['late_ticks'] += 1
+                    continue
+                self._fill_gap(asset, timeframe, state, bucket)
+                state.begin(bucket, price)
+            elif bucket == state.start:
+                if price > state.high:
+                    state.high = price
+                elif price < state.low:
+                    state.low = price
+                state.close = price
+                state.ticks += 1
+            elif bucket > state.start:
+                self._close(asset, timeframe, state)
+                self._fill_gap(asset, timeframe, state, bucket)
+                state.begin(bucket, price)
+            else:
+                self.stats['late_ticks'] += 1
+
+    def close_due(self, now):
+        """Закриває свічки, чий інтервал уже минув (таймер на межах таймфреймів)"""
+        for asset, states in self._states.items():
+            for timeframe, state in zip(self.timeframes, states):
+                if state.start is not None and state.start + timeframe <= now:
+                    self._close(asset, timeframe, state)
+
+    def _close(self, asset, timeframe, state):
+        candle = Candle(
+            datetime.fromtimestamp(state.start, pytz.UTC), state.open, state.high, state.low, state.close
+        )
+        state.last_close = state.close
+        state.last_start = state.start
+        state.start = None
+        if state.partial:
+            state.partial = False
+            self.stats['partial_dropped'] += 1
+            return
+        self.stats['closed'] += 1
+        self._emit(asset, timeframe, candle)
+
+    def _fill_gap(self, asset, timeframe, state, bucket):
+        if state.last_start is None or state.partial:
+            return
+        missing = (bucket - state.last_start) // timeframe - 1
+        if missing <= 0:
+            return
+        if missing > MAX_GAP_FILL:
+            # Довга перерва: пласкі свічки спотворили б індикатори, краще дозавантажити історію
+            state.partial = True
+            return
+        price = state.last_close
+        for n in range(1, missing + 1):
+            start = state.last_start + n * timeframe
+            self.stats['filled'] += 1
+            self._emit(asset, timeframe, Candle(datetime.fromtimestamp(start, pytz.UTC), price, price, price, price))
+        state.last_start = bucket - timeframe
+
+    def _emit(self, asset, timeframe, candle):
+        if self.on_close:
+            try:
+                self.on_close(asset, timeframe, candle)
+            except Exception as e:
+                logger.warning(f"⚠️ Помилка обробника закриття свічки {asset}: {e}")
+
+    def current(self, asset, timeframe):
+        """Поточна незакрита свічка або None"""
+        states = self._states.get(asset)
+        if not states:
+            return None
+        state = states[self.timeframes.index(timeframe)]
+        if state.start is None:
+            return None
+        return Candle(datetime.fromtimestamp(state.start, pytz.UTC), state.open, state.high, state.low, state.close)
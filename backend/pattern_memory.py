@@ -0,0 +1,227 @@
+import io
+import logging
+import os
+import numpy as np
+from config import Config
+from unit_of_work import atomic_write
+
+logger = logging.getLogger("signal_bot")
+
+PENDING = -1
+DIRECTIONS = {'UP': 1, 'DOWN': -1}
+
+
+class PatternMemory:
+    """Пам'ять ринкових ситуацій для пошуку k найближчих сусідів.
+
+    Кожен сигнал зберігається як вектор ознак фіксованої довжини: z-нормовані
+    ціни закриття та тіла останніх PATTERN_WINDOW свічок. Результат (виграш/
+    програш) дописується, коли надходить відгук. Вектори лежать у кільцевому
+    буфері NumPy розміром PATTERN_MEMORY_SIZE, тож пам'ять обмежена, а пошук -
+    це одне матричне множення по розміченим рядкам.
+    """
+
+    def __init__(self, path=None, capacity=None, window=None, metric=None):
+        self.path = str(path or Config.PATTERN_MEMORY_FILE)
+        self.capacity = capacity or Config.PATTERN_MEMORY_SIZE
+        self.window = window or Config.PATTERN_WINDOW
+        self.metric = metric or Config.PATTERN_METRIC
+        self.dim = 2 * self.window
+
+        self.vectors = np.zeros((self.capacity, self.dim), dtype=np.float32)
+        self.norms = np.zeros(self.capacity, dtype=np.float32)
+        self.outcomes = np.full(self.capacity, PENDING, dtype=np.int8)
+        self.directions = np.zeros(self.capacity, dtype=np.int8)
+        self.ids = [None] * self.capacity
+        self._slots = {}
+        self.head = 0
+        self.size = 0
+        self._dirty = False
+        self._load()
+
+    def features(self, candles):
+        """Вектор ознак вікна свічок (None, якщо свічок замало або ціна стоїть)"""
+        if len(candles) < self.window:
+            return None
+        window = candles[-self.window:]
+        close = np.fromiter((c.close for c in window), dtype=np.float64, count=self.window)
+        open_ = np.fromiter((c.open for c in window), dtype=np.float64, count=self.window)
+        std = close.std()
+        if not std > 0:
+            return None
+        # Форма руху без масштабу ціни: однакові ситуації EURUSD і USDJPY порівнювані
+        return np.concatenate(((close - close.mean()) / std, (close - open_) / std)).astype(np.float32)
+
+    def add(self, signal_id, candles, direction):
+        """Додавання ситуації на момент сигналу; результат - пізніше через set_outcome"""
+        vector = self.features(candles)
+        if vector is None or direction not in DIRECTIONS:
+            return False
+
+        slot = self.head
+        old_id = self.ids[slot]
+        if old_id is not None:
+            self._slots.pop(old_id, None)
+
+        self.vectors[slot] = vector
+        self.norms[slot] = np.linalg.norm(vector)
+        self.outcomes[slot] = PENDING
+        self.directions[slot] = DIRECTIONS[direction]
+        self.ids[slot] = signal_id
+        self._slots[signal_id] = slot
+
+        self.head = (self.head + 1) % self.capacity
+        self.size = min(self.size + 1, self.capacity)
+        self._dirty = True
+        return True
+
+    def set_outcome(self, signal_id, success):
+        slot = self._slots.get(signal_id)
+        if slot is None:
+            return False
+        self.outcomes[slot] = 1 if success else 0
+        self._dirty = True
+        return True
+
+    def query(self, candles=None, k=None, vector=None, exclude=None):
+        """k найближчих розмічених ситуацій та їхня статистика"""
+        k = k or Config.PATTERN_NEIGHBORS
+        if vector is None:
+            vector = self.features(candles)
+        if vector is None or not self.size:
+            return None
+
+        labelled = self.outcomes[:self.size] != PENDING
+        if exclude is not None and exclude in self._slots:
+            labelled = labelled.copy()
+            labelled[self._slots[exclude]] = False
+        available = int(labelled.sum())
+        if not available:
+            return None
+
+        # Рахуємо по всьому буферу (без копіювання рядків), нерозмічені відкидаємо маскою
+        dots = self.vectors[:self.size] @ vector
+        if self.metric == 'l2':
+            # ||a - b||² = ||a||² + ||b||² - 2ab; менша відстань - ближче
+            scores = -(self.norms[:self.size] ** 2 + float(vector @ vector) - 2 * dots)
+        else:
+            scores = dots / (self.norms[:self.size] * np.linalg.norm(vector) + 1e-12)
+        scores[~labelled] = -np.inf
+
+        k = min(k, available)
+        top = np.argpartition(-scores, k - 1)[:k]
+        slots = top[np.argsort(-scores[top])]
+
+        outcomes = self.outcomes[slots]
+        directions = self.directions[slots]
+        wins = outcomes == 1
+        # Ціна пішла вгору, якщо виграв UP або програв DOWN
+        moved_up = (directions == 1) == wins
+
+        result = {
+            'count': int(k),
+            'metric': self.metric,
+            'win_rate': round(float(wins.mean()) * 100, 1),
+            'up_probability': round(float(moved_up.mean()) * 100, 1),
+            'neighbors': [
+                {
+                    'signal_id': self.ids[slot],
+                    'score': round(float(score), 4),
+                    'direction': 'UP' if direction == 1 else 'DOWN',
+                    'success': bool(outcome)
+                }
+                for slot, score, direction, outcome in zip(slots, scores[slots], directions, outcomes)
+            ]
+        }
+        for name, value in DIRECTIONS.items():
+            mask = directions == value
+            result[f"{name.lower()}_signals"] = int(mask.sum())
+            result[f"{name.lower()}_wins"] = int(wins[mask].sum())
+        return result
+
+    def query_signal(self, signal_id, k=None):
+        """Сусіди вже збереженої ситуації (без неї самої)"""
+        slot = self._slots.get(signal_id)
+        if slot is None:
+            return None
+        return self.query(vector=self.vectors[slot], k=k, exclude=signal_id)
+
+    @staticmethod
+    def format_for_prompt(result, language='uk'):
+        if not result:
+            return ""
+        if language == 'ru':
+            return (f"Похожие ситуации в прошлом ({result['count']}): UP выиграл {result['up_wins']}/{result['up_signals']}, "
+                    f"DOWN выиграл {result['down_wins']}/{result['down_signals']}, "
+                    f"цена шла вверх в {result['up_probability']}% случаев")
+        return (f"Схожі ситуації в минулому ({result['count']}): UP виграв {result['up_wins']}/{result['up_signals']}, "
+                f"DOWN виграв {result['down_wins']}/{result['down_signals']}, "
+                f"ціна йшла вгору в {result['up_probability']}% випадків")
+
+    def summary(self):
+        """Підсумок розмічених ситуацій за напрямками (для lessons.json)"""
+        outcomes = self.outcomes[:self.size]
+        directions = self.directions[:self.size]
+        labelled = outcomes != PENDING
+        patterns = []
+        for name, value in DIRECTIONS.items():
+            mask = labelled & (directions == value)
+            total = int(mask.sum())
+            wins = int((outcomes[mask] == 1).sum())
+            patterns.append({
+                'direction': name,
+                'window': self.window,
+                'samples': total,
+                'wins': wins,
+                'win_rate': round(wins / total * 100, 2) if total else None
+            })
+        return patterns
+
+    def _load(self):
+        if not os.path.exists(self.path):
+            return
+        try:
+            with np.load(self.path, allow_pickle=False) as data:
+                vectors = data['vectors']
+                if vectors.shape[1] != self.dim:
+                    logger.warning("⚠️ Пам'ять шаблонів має інше вікно, починаю з порожньої")
+                    return
+                # Порядок від найстаріших до найновіших, обрізаний до поточної ємності
+                count = min(len(vectors), self.capacity)
+                self.vectors[:count] = vectors[-count:]
+                self.outcomes[:count] = data['outcomes'][-count:]
+                self.directions[:count] = data['directions'][-count:]
+                ids = data['ids'][-count:].tolist()
+        except Exception as e:
+            logger.warning(f"⚠️ Не вдалося завантажити пам'ять шаблонів: {e}")
+            return
+
+        self.norms[:count] = np.linalg.norm(self.vectors[:count], axis=1)
+        self.ids[:count] = ids
+        self._slots = {signal_id: slot for slot, signal_id in enumerate(ids)}
+        self.size = count
+        self.head = count % self.capacity
+
+    def _ordered(self, array):
+        """Рядки від найстарішого до найновішого"""
+        if self.size < self.capacity:
+            return array[:self.size]
+        return np.concatenate((array[self.head:], array[:self.head]))
+
+    def save(self):
+        if not self._dirty:
+            return
+        try:
+            ids = self.ids[:self.size] if self.size < self.capacity else self.ids[self.head:] + self.ids[:self.head]
+            buffer = io.BytesIO()
+            np.savez_compressed(
+                buffer,
+                vectors=self._ordered(self.vectors),
+                outcomes=self._ordered(self.outcomes),
+                directions=self._ordered(self.directions),
+                ids=np.array(ids, dtype=str)
+            )
+            atomic_write(self.path, buffer.getvalue())
+            self._dirty = False
+        except Exception as e:
+            logger.warning(f"⚠️ Не вдалося зберегти пам'ять шаблонів: {e}")
@@ -1,7 +1,13 @@
 import asyncio
 import logging
+import random
+import time
 from datetime import datetime, timedelta
 from config import Config
+from candle_cache import CandleCache
+from market_simulator import MarketSimulator
+from ohlc_aggregator import OhlcAggregator
+from metrics import metrics
 
 # Налаштуємо логування для pocketoptionapi_async - відключимо DEBUG логи
 logging.getLogger("pocketoptionapi_async").setLevel(logging.WARNING)
@@ -11,14 +17,32 @@ logging.getLogger("pocketoptionapi_async.client").setLevel(logging.WARNING)
 logger = logging.getLogger("signal_bot")
 
 class PocketOptionClient:
-    def __init__(self):
+    def __init__(self, ssid=None, candle_cache=None):
+        """ssid=None - Config.POCKET_SSID; candle_cache - готовий кеш (пул передає його новій сесії)"""
+        self.ssid = ssid
         self.client = None
         self.connected = False
         self._initialized = False
         self._connection_attempts = 0
-        self._max_attempts = 3
+        self._max_attempts = max(1, Config.POCKET_CONNECT_ATTEMPTS)
         self._last_connection_time = None
-        self._reconnection_delay = 5  # секунд
+        self._reconnection_delay = Config.POCKET_RECONNECT_DELAY  # секунд, подвоюється з кожною спробою
+        self.state = 'disconnected'  # disconnected / connecting / authenticating / ready / backoff / failed
+        self._authenticated = asyncio.Event()
+        self._balance_received = asyncio.Event()
+        self._balance = None
+        self._last_alive = None  # time.monotonic() останньої ознаки живості (баланс, свічки, тіки)
+        self.aggregator = None  # OhlcAggregator потокового режиму
+        self._stream_assets = set()
+        self._stream_task = None
+        self._stream_handler = False
+        self.bar_listeners = []  # on_close(asset, timeframe, candle) після запису свічки в кеш
+        if candle_cache is None and Config.CANDLE_CACHE_ENABLED:
+            candle_cache = CandleCache(Config.CANDLE_CACHE_SIZE)
+        self.candle_cache = candle_cache
+        self.consecutive_failures = 0  # невдалих запитів свічок поспіль (перевірка здоров'я в пулі)
+        self.simulator = None  # тестові свічки демо-режиму
+        self._regions = None  # None - регіони бібліотеки за замовчуванням
     
     async def initialize(self):
         if self._initialized:
@@ -26,7 +50,7 @@ class PocketOptionClient:
         
         try:
             # Отримуємо SSID з конфігурації
-            ssid = Config.get_validated_ssid()
+            ssid = Config.get_validated_ssid(self.ssid)
             if not ssid:
                 logger.error("❌ Не вдалося отримати валідний SSID!")
                 return self
@@ -48,6 +72,17 @@ class PocketOptionClient:
                 enable_logging=False  # ← ВИМКНУТИ детальне логування!
             )
             
+            self.client.add_event_callback('authenticated', self._on_authenticated)
+            self.client.add_event_callback('balance_updated', self._on_balance)
+            self.client.add_event_callback('disconnected', self._on_disconnected)
+            
+            # Свій сервер замість регіонів брокера (локальна заглушка для тестів)
+            if Config.POCKET_WS_URL:
+                from pocketoptionapi_async.constants import REGIONS
+                REGIONS._REGIONS['CUSTOM'] = Config.POCKET_WS_URL
+                self._regions = ['CUSTOM']
+                logger.info(f"🧪 Підключення до власного сервера: {Config.POCKET_WS_URL}")
+            
             self._initialized = True
             logger.info("✅ Клієнт ініціалізовано")
             return self
@@ -58,77 +93,182 @@ class PocketOptionClient:
             logger.error(f"Деталі: {traceback.format_exc()}")
             return self
     
+    def _on_authenticated(self, data):
+        """Перший автентифікований кадр - з'єднання готове"""
+        self._authenticated.set()
+    
+    def _on_balance(self, balance):
+        """Кадр балансу приходить одразу після автентифікації - він же доказ живості"""
+        self._balance = balance
+        self._last_alive = time.monotonic()
+        self._balance_received.set()
+    
+    def _on_disconnected(self, data):
+        self.state = 'disconnected'
+        self._last_alive = None
+    
+    def _backoff_delay(self, attempt):
+        """Експоненційна затримка з розкидом: половина фіксована, половина випадкова"""
+        delay = min(Config.POCKET_RECONNECT_MAX_DELAY, self._reconnection_delay * 2 ** (attempt - 1))
+        return delay / 2 + random.uniform(0, delay / 2)
+    
+    @metrics.timed('pocket_connect')
     async def connect(self):
-        """Метод підключення до PocketOption"""
-        try:
-            if not self._initialized:
-                await self.initialize()
-            
-            if not self.client:
-                logger.error("❌ Клієнт не ініціалізований")
-                return False
-            
-            logger.info("🔗 Підключення до PocketOption...")
+        """Підключення з повторними спробами: connecting -> authenticating -> ready, між спробами - backoff"""
+        if not self._initialized:
+            await self.initialize()
+        
+        if not self.client:
+            logger.error("❌ Клієнт не ініціалізований")
+            return False
+        
+        self._connection_attempts = 0
+        while self._connection_attempts < self._max_attempts:
+            self._connection_attempts += 1
+            if await self._connect_once():
+                metrics.inc('pocket_connect_attempts_total', result='ok')
+                if self._stream_assets:
+                    # Нове з'єднання - підписки втрачено, поточні свічки неповні
+                    self.aggregator.reset()
+                    await self._subscribe()
+                return True
+            metrics.inc('pocket_connect_attempts_total', result='error')
             
-            # Спробуємо підключитися
+            self.state = 'backoff'
+            if self._connection_attempts >= self._max_attempts:
+                break
+            delay = self._backoff_delay(self._connection_attempts)
+            logger.warning(f"🔁 Спроба {self._connection_attempts}/{self._max_attempts} невдала, повтор через {delay:.1f} сек")
+            await asyncio.sleep(delay)
             try:
-                await self.client.connect()
-                logger.info("✅ Виклик connect() успішний")
-                await asyncio.sleep(2)  # Чекаємо на підключення
-            except Exception as e:
-                logger.error(f"❌ Помилка при виклику connect(): {e}")
-                return False
+                # Напівживе з'єднання попередньої спроби не повинно заважати новій
+                await self.client.disconnect()
+            except Exception:
+                pass
+        
+        self.state = 'failed'
+        self.connected = False
+        logger.error(f"❌ Не вдалося підключитися до PocketOption за {self._connection_attempts} спроб")
+        return False
+    
+    async def _connect_once(self):
+        """Одна спроба: з'єднання, очікування автентифікації та першого балансу"""
+        try:
+            logger.info("🔗 Підключення до PocketOption...")
+            self.state = 'connecting'
+            self.connected = False
+            self._authenticated.clear()
+            self._balance_received.clear()
             
-            # Спробуємо отримати баланс - це найкраща перевірка підключення
-            try:
-                logger.info("🔄 Перевірка підключення через баланс...")
-                balance = await self.client.get_balance()
-                if balance and hasattr(balance, 'balance'):
-                    self.connected = True
-                    logger.info(f"✅ Успішно підключено до PocketOption!")
-                    logger.info(f"💰 Баланс: {balance.balance} {balance.currency}")
-                    return True
-                else:
-                    logger.error("❌ Баланс не отримано або неправильний формат")
+            with metrics.span('pocket_connect_call'):
+                if not await self.client.connect(regions=self._regions):
+                    logger.error("❌ Виклик connect() невдалий")
                     return False
-            except Exception as e:
-                logger.error(f"❌ Не вдалося отримати баланс: {e}")
-                return False
+            logger.info("✅ Виклик connect() успішний")
+            
+            # Готовність - за подією автентифікації, а не за фіксованою паузою
+            self.state = 'authenticating'
+            with metrics.span('pocket_connect_ready'):
+                await asyncio.wait_for(self._authenticated.wait(), timeout=Config.POCKET_READY_TIMEOUT)
+                try:
+                    await asyncio.wait_for(self._balance_received.wait(), timeout=Config.POCKET_READY_TIMEOUT)
+                except asyncio.TimeoutError:
+                    # Баланс не надійшов сам - явна перевірка
+                    if not await self._probe():
+                        return False
+            
+            self.state = 'ready'
+            self.connected = True
+            self._last_connection_time = time.monotonic()
+            logger.info(f"✅ Успішно підключено до PocketOption!")
+            if self._balance is not None:
+                logger.info(f"💰 Баланс: {self._balance.balance} {self._balance.currency}")
+            return True
         
+        except asyncio.TimeoutError:
+            logger.error(f"❌ Автентифікацію не отримано за {Config.POCKET_READY_TIMEOUT:.0f} сек")
+            return False
         except Exception as e:
             logger.error(f"❌ Помилка підключення: {e}")
-            import traceback
-            logger.error(f"Трейс: {traceback.format_exc()}")
-            self.connected = False
             return False
     
+    async def _probe(self):
+        """Перевірка живості запитом балансу"""
+        try:
+            logger.info("🔄 Перевірка підключення через баланс...")
+            with metrics.span('pocket_balance'):
+                balance = await asyncio.wait_for(self.client.get_balance(), timeout=Config.POCKET_READY_TIMEOUT)
+            if balance and hasattr(balance, 'balance'):
+                self._on_balance(balance)
+                return True
+            logger.error("❌ Баланс не отримано або неправильний формат")
+        except Exception as e:
+            logger.error(f"❌ Не вдалося отримати баланс: {e}")
+        return False
+    
+    def is_alive(self):
+        """Чи є активне автентифіковане з'єднання"""
+        if not self.connected or not self.client:
+            return False
+        try:
+            return bool(self.client.is_connected)
+        except Exception:
+            return False
+    
+    async def ensure_connected(self):
+        """Повторно використовує живе з'єднання або підключається заново.
+        Баланс перевіряється лише коли остання ознака живості старша за POCKET_LIVENESS_TTL"""
+        if self.is_alive():
+            if self._last_alive is not None and time.monotonic() - self._last_alive < Config.POCKET_LIVENESS_TTL:
+                return True
+            if await self._probe():
+                return True
+        
+        if self.connected:
+            logger.warning("🔌 З'єднання з PocketOption втрачено, перепідключення...")
+            self.connected = False
+        return await self.connect()
+    
     async def get_candles(self, asset, timeframe, count=50):
         """Отримання свічок"""
         try:
             # Конвертуємо формат активу (видаляємо слеш)
             asset_clean = asset.replace('/', '')
             
+            # Потоковий режим: щойно закрита свічка вже в кеші - без запиту
+            if self._stream_fresh(asset_clean, timeframe, count):
+                metrics.inc('pocket_stream_hits_total', asset=asset_clean)
+                return self.candle_cache.window(asset_clean, timeframe, count)
+            
             if not self.connected:
                 logger.warning(f"🔌 Не підключено для {asset}, спробую підключитися...")
                 if not await self.connect():
                     logger.error(f"❌ Не вдалося підключитися для {asset}")
                     # У режимі демо повертаємо тестові дані
                     if Config.POCKET_DEMO:
-                        return await self._get_mock_candles(count)
+                        return await self._get_mock_candles(count, asset.replace('/', ''), timeframe)
                     return None
             
-            logger.info(f"📊 Запит свічок для {asset_clean}...")
-            candles = await self.client.get_candles(
-                asset=asset_clean,
-                timeframe=timeframe,
-                count=count
-            )
+            # Запитуємо лише свічки, новіші за останню в кеші
+            request_count = count
+            if self.candle_cache:
+                request_count = self.candle_cache.missing_count(asset_clean, timeframe, count)
+            
+            logger.info(f"📊 Запит свічок для {asset_clean} (count={request_count})...")
+            with metrics.span('pocket_get_candles', asset=asset_clean):
+                candles = await self.client.get_candles(
+                    asset=asset_clean,
+                    timeframe=timeframe,
+                    count=request_count
+                )
             
             if not candles:
                 logger.warning(f"⚠️ Не отримано свічок для {asset_clean}")
+                self.consecutive_failures += 1
+                metrics.inc('pocket_empty_candles_total', asset=asset_clean)
                 # У режимі демо повертаємо тестові дані
                 if Config.POCKET_DEMO:
-                    return await self._get_mock_candles(count)
+                    return await self._get_mock_candles(count, asset.replace('/', ''), timeframe)
                 return None
             
             # Перевіряємо, чи свічки містять реальні дані
@@ -137,64 +277,146 @@ class PocketOptionClient:
                 if hasattr(first_candle, 'close'):
                     if first_candle.close == 0 or first_candle.open == 0:
                         logger.warning(f"⚠️ Отримані нульові дані для {asset_clean}")
+                        self.consecutive_failures += 1
+                        metrics.inc('pocket_zero_candles_total', asset=asset_clean)
                         # У режимі демо повертаємо тестові дані
                         if Config.POCKET_DEMO:
-                            return await self._get_mock_candles(count)
+                            return await self._get_mock_candles(count, asset.replace('/', ''), timeframe)
                         return None
             
             logger.info(f"✅ Отримано {len(candles)} коректних свічок для {asset_clean}")
+            self.consecutive_failures = 0
+            self._last_alive = time.monotonic()
+            metrics.inc('pocket_candles_received_total', len(candles), asset=asset_clean)
+            
+            if self.candle_cache:
+                added = self.candle_cache.merge(asset_clean, timeframe, candles)
+                window = self.candle_cache.window(asset_clean, timeframe, count)
+                logger.info(f"🗃️ Кеш свічок {asset_clean}: +{added} нових, вікно {len(window)}")
+                return window
+            
             return candles
             
         except Exception as e:
             logger.error(f"❌ Помилка отримання свічок для {asset}: {e}")
+            self.consecutive_failures += 1
             # У режимі демо повертаємо тестові дані
             if Config.POCKET_DEMO:
-                return await self._get_mock_candles(count)
+                return await self._get_mock_candles(count, asset.replace('/', ''), timeframe)
             return None
     
-    async def _get_mock_candles(self, count=50):
-        """Повернення тестових свічок для демо-режиму"""
-        import random
-        from collections import namedtuple
-        
+    async def _get_mock_candles(self, count=50, asset='EURUSD_otc', timeframe=None):
+        """Повернення тестових свічок для демо-режиму (MarketSimulator, ряд окремий для кожного активу)"""
         logger.info("🔄 Генерую тестові свічки для демо-режиму...")
+        metrics.inc('pocket_mock_candles_total', asset=asset)
         
-        Candle = namedtuple('Candle', ['timestamp', 'open', 'high', 'low', 'close'])
-        now = datetime.now()
-        candles = []
-        
-        base_price = 150.0
-        
-        for i in range(count):
-            timestamp = now - timedelta(minutes=2 * (count - i))
-            
-            # Створюємо реалістичні коливання ціни
-            change = random.uniform(-0.5, 0.5)
-            open_price = base_price + random.uniform(-1, 1)
-            close_price = open_price + change
-            
-            high_price = max(open_price, close_price) + random.uniform(0, 0.3)
-            low_price = min(open_price, close_price) - random.uniform(0, 0.3)
-            
-            candle = Candle(
-                timestamp=timestamp,
-                open=round(open_price, 5),
-                high=round(high_price, 5),
-                low=round(low_price, 5),
-                close=round(close_price, 5)
-            )
-            candles.append(candle)
-            
-            base_price = close_price
+        timeframe = timeframe or Config.TIMEFRAMES
+        if self.simulator is None or self.simulator.timeframe != timeframe:
+            self.simulator = MarketSimulator(seed=Config.SIMULATOR_SEED, timeframe=timeframe)
+        candles = self.simulator.candles(asset, count, end=Config.get_kyiv_time())
         
         logger.info(f"✅ Згенеровано {len(candles)} тестових свічок")
         return candles
     
+    @property
+    def streaming(self):
+        return bool(self._stream_assets)
+    
+    async def start_streaming(self, assets, timeframes=None):
+        """Потокові тіки активів -> OhlcAggregator -> кеш свічок для кожного таймфрейму.
+        Історію спершу завантажує get_candles, далі кеш дорощується закритими свічками потоку"""
+        if self.candle_cache is None:
+            logger.warning("⚠️ Потоковий режим потребує кешу свічок (CANDLE_CACHE_ENABLED)")
+            return False
+        if not await self.ensure_connected():
+            return False
+        if getattr(self.client, '_is_persistent', False):
+            # У режимі persistent_connection кадри йдуть через keep-alive менеджер,
+            # а не через _websocket - обробник json_data нижче ніколи б не спрацював
+            logger.warning("⚠️ Потоковий режим не підтримує persistent_connection, свічки - через get_candles")
+            return False
+        
+        timeframes = timeframes or Config.STREAM_TIMEFRAMES
+        if self.aggregator is None or self.aggregator.timeframes != sorted(set(timeframes)):
+            self.aggregator = OhlcAggregator(timeframes, on_close=self._on_bar_closed)
+        if not self._stream_handler:
+            # Тіки updateStream приходять бінарним кадром, який бібліотека віддає лише
+            # подією json_data свого websocket-клієнта
+            self.client._websocket.add_event_handler('json_data', self._on_stream_frame)
+            self._stream_handler = True
+        
+        assets = list(dict.fromkeys(asset.replace('/', '') for asset in assets))
+        await asyncio.gather(*(
+            self.get_candles(asset, timeframe, Config.STREAM_HISTORY)
+            for asset in assets for timeframe in self.aggregator.timeframes
+        ))
+        self._stream_assets = set(assets)
+        await self._subscribe()
+        if self._stream_task is None or self._stream_task.done():
+            self._stream_task = asyncio.create_task(self._close_bars())
+        logger.info(f"📡 Потоковий режим: {len(assets)} активів, таймфрейми {self.aggregator.timeframes}")
+        return True
+    
+    async def _subscribe(self):
+        period = self.aggregator.timeframes[0]
+        for asset in self._stream_assets:
+            sent = await self.client.send_message(f'42["changeSymbol",{{"asset":"{asset}","period":{period}}}]')
+            if not sent:
+                logger.warning(f"⚠️ Не вдалося підписатися на {asset}")
+    
+    def _on_stream_frame(self, data):
+        """Кадр updateStream: [[актив, час, ціна], ...]"""
+        if not isinstance(data, list) or not self.aggregator:
+            return
+        for item in data:
+            if isinstance(item, list) and len(item) >= 3 and item[0] in self._stream_assets:
+                self.aggregator.update(item[0], float(item[1]), float(item[2]))
+                self._last_alive = time.monotonic()
+    
+    def add_bar_listener(self, listener):
+        self.bar_listeners.append(listener)
+    
+    def _on_bar_closed(self, asset, timeframe, candle):
+        self.candle_cache.merge(asset, timeframe, [candle])
+        metrics.inc('pocket_stream_bars_total', asset=asset)
+        for listener in self.bar_listeners:
+            listener(asset, timeframe, candle)
+    
+    async def _close_bars(self):
+        """Закриття свічок на межах найменшого таймфрейму, навіть якщо нового тіку ще немає"""
+        step = self.aggregator.timeframes[0]
+        while True:
+            now = time.time()
+            await asyncio.sleep((now // step + 1) * step - now + Config.STREAM_CLOSE_GRACE)
+            self.aggregator.close_due(time.time() - Config.STREAM_CLOSE_GRACE)
+    
+    def _stream_fresh(self, asset, timeframe, count):
+        """Чи є в кеші свічка, що закрилася на останній межі таймфрейму"""
+        if asset not in self._stream_assets or timeframe not in self.aggregator.timeframes:
+            return False
+        buffer = self.candle_cache.buffer(asset, timeframe)
+        if len(buffer) < count:
+            return False
+        return buffer.last_timestamp == (int(time.time() // timeframe) - 1) * timeframe
+    
+    async def stop_streaming(self):
+        if self._stream_task:
+            self._stream_task.cancel()
+            try:
+                await self._stream_task
+            except asyncio.CancelledError:
+                pass
+            self._stream_task = None
+        self._stream_assets = set()
+    
     async def disconnect(self):
+        await self.stop_streaming()
         if self.client:
             try:
                 await self.client.disconnect()
                 self.connected = False
+                self.state = 'disconnected'
+                self._last_alive = None
                 logger.info("✅ Відключено від PocketOption")
             except Exception as e:
                 logger.warning(f"⚠️ Помилка при відключенні: {e}")
@@ -0,0 +1,208 @@
+import asyncio
+import hashlib
+import logging
+from config import Config
+from metrics import metrics
+from pocket_client import PocketOptionClient
+
+logger = logging.getLogger("signal_bot")
+
+
+def _score(key, asset):
+    """Вага пари (сесія, актив) для rendezvous-хешування"""
+    digest = hashlib.blake2b(f"{key}:{asset}".encode(), digest_size=8).digest()
+    return int.from_bytes(digest, 'big')
+
+
+class PoolSession:
+    """Одна сесія пулу: клієнт, обмеження запитів у польоті та стан"""
+
+    def __init__(self, key, ssid, max_in_flight):
+        self.key = key  # стабільний ключ шардування: заміна сесії не переносить її активи
+        self.ssid = ssid
+        self.max_in_flight = max_in_flight
+        self.client = PocketOptionClient(ssid=ssid)
+        self.semaphore = asyncio.Semaphore(max_in_flight)
+        self.state = 'new'  # new / ready / draining / failed
+        self.in_flight = 0
+        self.replacements = 0
+
+    @property
+    def healthy(self):
+        return (
+            self.state == 'ready'
+            and self.client.is_alive()
+            and self.client.consecutive_failures < Config.POCKET_SESSION_MAX_FAILURES
+        )
+
+    async def connect(self):
+        connected = await self.client.connect()
+        self.state = 'ready' if connected else 'failed'
+        return connected
+
+    async def get_candles(self, asset, timeframe, count):
+        async with self.semaphore:
+            self.in_flight += 1
+            try:
+                return await self.client.get_candles(asset, timeframe, count)
+            finally:
+                self.in_flight -= 1
+
+    async def drain(self):
+        """Чекає завершення запитів у польоті (займає всі дозволи семафора)"""
+        for _ in range(self.max_in_flight):
+            await self.semaphore.acquire()
+        for _ in range(self.max_in_flight):
+            self.semaphore.release()
+
+
+class PocketOptionPool:
+    """Пул автентифікованих сесій PocketOption з шардуванням активів.
+
+    Кожен актив закріплений за сесією через rendezvous-хешування: той самий актив
+    завжди йде тим самим з'єднанням (і в той самий кеш свічок), а вибуття однієї
+    сесії переносить лише її активи. Несправна сесія виводиться з маршрутизації,
+    дочікується своїх запитів, відключається і замінюється новою з тим самим ключем.
+    Інтерфейс збігається з PocketOptionClient, тож SignalGenerator працює з обома.
+    """
+
+    def __init__(self, ssids=None, sessions_per_ssid=None, max_in_flight=None):
+        ssids = ssids or Config.POCKET_SSIDS or [Config.POCKET_SSID]
+        sessions_per_ssid = max(1, sessions_per_ssid or Config.POCKET_SESSIONS_PER_SSID)
+        max_in_flight = max(1, max_in_flight or Config.POCKET_SESSION_MAX_IN_FLIGHT)
+        self.sessions = [
+            PoolSession(f"s{i}.{n}", ssid, max_in_flight)
+            for i, ssid in enumerate(ssids)
+            for n in range(sessions_per_ssid)
+        ]
+        self._replacing = {}  # ключ сесії -> задача заміни
+        self._stream = None  # (активи, таймфрейми) потокового режиму
+        self.bar_listeners = []
+        self.connected = False
+
+    @property
+    def client(self):
+        """Сумісність з PocketOptionClient: перший ініціалізований клієнт"""
+        for session in self.sessions:
+            if session.client.client:
+                return session.client.client
+        return None
+
+    def is_alive(self):
+        return any(session.healthy for session in self.sessions)
+
+    def _update_gauges(self):
+        states = {}
+        for session in self.sessions:
+            states[session.state] = states.get(session.state, 0) + 1
+        for state in ('new', 'ready', 'draining', 'failed'):
+            metrics.gauge('pocket_pool_sessions', states.get(state, 0), state=state)
+
+    async def connect(self):
+        logger.info(f"🔗 Пул PocketOption: підключення {len(self.sessions)} сесій...")
+        results = await asyncio.gather(*(session.connect() for session in self.sessions))
+        self.connected = any(results)
+        self._update_gauges()
+        logger.info(f"✅ Пул PocketOption: готово {sum(results)}/{len(self.sessions)} сесій")
+        return self.connected
+
+    async def ensure_connected(self):
+        """Перевірка здоров'я сесій перед циклом: несправні замінюються, решта працює далі"""
+        if not self.connected:
+            return await self.connect()
+        self.check_health()
+        pending = [task for task in self._replacing.values() if not task.done()]
+        if not any(session.healthy for session in self.sessions) and pending:
+            # Жодної справної сесії - чекаємо замін, інакше цикл лишиться без свічок
+            await asyncio.gather(*pending, return_exceptions=True)
+        self.connected = self.is_alive()
+        return self.connected
+
+    def check_health(self):
+        """Запускає заміну сесій, що втратили з'єднання або збоять поспіль"""
+        for session in self.sessions:
+            if session.state in ('ready', 'failed') and not session.healthy:
+                self._schedule_replace(session)
+
+    def _schedule_replace(self, session):
+        task = self._replacing.get(session.key)
+        if task is None or task.done():
+            self._replacing[session.key] = asyncio.create_task(self._replace(session))
+
+    async def _replace(self, session):
+        logger.warning(f"♻️ Сесія {session.key} несправна (збоїв поспіль: {session.client.consecutive_failures}), заміна...")
+        session.state = 'draining'
+        self._update_gauges()
+        await session.drain()
+        try:
+            await session.client.disconnect()
+        except Exception as e:
+            logger.warning(f"⚠️ Помилка відключення сесії {session.key}: {e}")
+
+        # Кеш свічок переходить до нової сесії: активи шарду не завантажуються заново
+        session.client = PocketOptionClient(ssid=session.ssid, candle_cache=session.client.candle_cache)
+        session.client.bar_listeners = self.bar_listeners
+        session.replacements += 1
+        metrics.inc('pocket_pool_replacements_total')
+        connected = await session.connect()
+        self._update_gauges()
+        if connected and self._stream:
+            assets, timeframes = self._stream
+            await session.client.start_streaming([a for a in assets if self.route(a) is session], timeframes)
+        if connected:
+            logger.info(f"✅ Сесію {session.key} замінено")
+        else:
+            logger.error(f"❌ Не вдалося замінити сесію {session.key}")
+        return connected
+
+    def route(self, asset):
+        """Сесія для активу: найвища вага серед справних (або серед усіх, якщо справних немає)"""
+        candidates = [session for session in self.sessions if session.healthy] or self.sessions
+        return max(candidates, key=lambda session: _score(session.key, asset))
+
+    async def get_candles(self, asset, timeframe, count=50):
+        session = self.route(asset.replace('/', ''))
+        candles = await session.get_candles(asset, timeframe, count)
+        if session.state == 'ready' and not session.healthy:
+            self._schedule_replace(session)
+        return candles
+
+    def add_bar_listener(self, listener):
+        """Слухач закриття свічок усіх сесій (список спільний, тож діє і для замінених)"""
+        self.bar_listeners.append(listener)
+        for session in self.sessions:
+            session.client.bar_listeners = self.bar_listeners
+
+    @property
+    def streaming(self):
+        return self._stream is not None
+
+    async def start_streaming(self, assets, timeframes=None):
+        """Кожна сесія стрімить активи свого шарду"""
+        assets = [asset.replace('/', '') for asset in assets]
+        self._stream = (assets, timeframes)
+        shards = {}
+        for asset in assets:
+            shards.setdefault(self.route(asset).key, []).append(asset)
+        sessions = {session.key: session for session in self.sessions}
+        results = await asyncio.gather(*(
+            sessions[key].client.start_streaming(shard, timeframes) for key, shard in shards.items()
+        ))
+        return any(results)
+
+    async def disconnect(self):
+        self._stream = None
+        for task in self._replacing.values():
+            task.cancel()
+        await asyncio.gather(*self._replacing.values(), return_exceptions=True)
+        self._replacing.clear()
+        await asyncio.gather(*(session.client.disconnect() for session in self.sessions))
+        self.connected = False
+
+
+def create_pocket_client():
+    """Пул, якщо налаштовано кілька сесій, інакше звичайний клієнт"""
+    ssids = Config.POCKET_SSIDS or [Config.POCKET_SSID]
+    if len(ssids) * max(1, Config.POCKET_SESSIONS_PER_SSID) > 1:
+        return PocketOptionPool(ssids)
+    return PocketOptionClient(ssid=ssids[0])
@@ -0,0 +1,110 @@
+import hashlib
+import json
+import logging
+import os
+import time
+from collections import OrderedDict
+from candle_cache import candle_timestamp
+from config import Config
+from unit_of_work import atomic_write, dump_json
+
+logger = logging.getLogger("signal_bot")
+
+
+class ResponseCache:
+    """LRU-кеш відповідей Groq з TTL, що зберігається на диску між запусками.
+
+    Ключ - хеш активу, вікна свічок, моделі, мови та версії промпту, тож
+    повторний запуск з тими ж свічками не платить за ідентичну відповідь.
+    """
+
+    def __init__(self, path=None, max_entries=None, ttl=None):
+        self.path = path or Config.GROQ_CACHE_FILE
+        self.max_entries = max_entries or Config.GROQ_CACHE_MAX_ENTRIES
+        self.ttl = ttl if ttl is not None else Config.TIMEFRAMES * Config.GROQ_CACHE_TTL_CANDLES
+        self._entries = OrderedDict()
+        self._dirty = False
+        self.stats = {'hits': 0, 'misses': 0, 'expired': 0, 'evictions': 0}
+        self._load()
+
+    @staticmethod
+    def make_key(asset, candles, model, language, prompt_version):
+        """Відбиток запиту: однакові свічки та налаштування дають однаковий ключ"""
+        window = [
+            (candle_timestamp(c), c.open, c.high, c.low, c.close)
+            for c in candles
+        ]
+        payload = json.dumps([asset, model, language, prompt_version, window], separators=(',', ':'))
+        return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+    def _is_expired(self, entry, now=None):
+        return (now or time.time()) - entry['created_at'] > self.ttl
+
+    def get(self, key):
+        entry = self._entries.get(key)
+        if entry is None:
+            self.stats['misses'] += 1
+            return None
+
+        if self._is_expired(entry):
+            del self._entries[key]
+            self._dirty = True
+            self.stats['expired'] += 1
+            self.stats['misses'] += 1
+            return None
+
+        self._entries.move_to_end(key)
+        self.stats['hits'] += 1
+        return entry['response']
+
+    def put(self, key, response):
+        self._entries[key] = {'response': response, 'created_at': time.time()}
+        self._entries.move_to_end(key)
+        self._dirty = True
+        self._evict()
+
+    def _evict(self):
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.stats['evictions'] += 1
+
+    def _read_file(self):
+        if not os.path.exists(self.path):
+            return {}
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                return json.load(f).get('entries', {})
+        except Exception as e:
+            logger.warning(f"⚠️ Не вдалося прочитати кеш відповідей: {e}")
+            return {}
+
+    def _load(self):
+        now = time.time()
+        entries = sorted(self._read_file().items(), key=lambda item: item[1].get('created_at', 0))
+        for key, entry in entries:
+            if 'created_at' in entry and not self._is_expired(entry, now):
+                self._entries[key] = entry
+        self._evict()
+
+    def save(self):
+        """Атомарний запис з об'єднанням записів паралельного запуску"""
+        if not self._dirty:
+            return
+        try:
+            now = time.time()
+            for key, entry in self._read_file().items():
+                if key not in self._entries and 'created_at' in entry and not self._is_expired(entry, now):
+                    self._entries[key] = entry
+            self._entries = OrderedDict(sorted(self._entries.items(), key=lambda item: item[1]['created_at']))
+            self._evict()
+
+            atomic_write(self.path, dump_json({'entries': self._entries, 'stats': self.stats}, indent=None))
+            self._dirty = False
+        except Exception as e:
+            logger.warning(f"⚠️ Не вдалося зберегти кеш відповідей: {e}")
+
+    def log_summary(self):
+        total = self.stats['hits'] + self.stats['misses']
+        hit_rate = self.stats['hits'] / total * 100 if total else 0.0
+        logger.info(f"💾 Кеш відповідей AI: {self.stats['hits']} влучань, {self.stats['misses']} промахів "
+                    f"({hit_rate:.1f}%), записів: {len(self._entries)}")
@@ -0,0 +1,117 @@
+import json
+import logging
+import os
+from config import Config
+from unit_of_work import atomic_write, dump_json
+
+logger = logging.getLogger("signal_bot")
+
+
+class SignalScreener:
+    """Детермінований попередній відбір активів перед запитом до Groq.
+
+    Актив передається в AI, лише якщо спрацювало щонайменше
+    SCREENER_MIN_RULES правил з SCREENER_RULES.
+    """
+
+    def __init__(self, rules=None, min_rules=None, stats_file=None):
+        self.enabled = Config.SCREENER_ENABLED
+        self.rules = {}
+        for name in rules or Config.SCREENER_RULES:
+            rule = getattr(self, f"_rule_{name}", None)
+            if rule is None:
+                logger.warning(f"⚠️ Невідоме правило скринера: {name}")
+                continue
+            self.rules[name] = rule
+
+        self.min_rules = min_rules if min_rules is not None else Config.SCREENER_MIN_RULES
+        self.stats_file = stats_file or Config.SCREENER_STATS_FILE
+        self.stats = self._load_stats()
+
+    # Правила: отримують словник індикаторів IndicatorEngine
+    @staticmethod
+    def _rule_trend_alignment(ind):
+        """EMA9, EMA21 і ціна вишикувані в один бік"""
+        return (ind['price'] > ind['ema_9'] > ind['ema_21']) or (ind['price'] < ind['ema_9'] < ind['ema_21'])
+
+    @staticmethod
+    def _rule_volatility_band(ind):
+        """Волатильність у робочому діапазоні (не флет і не хаос)"""
+        return Config.SCREENER_VOLATILITY_MIN <= ind['volatility'] <= Config.SCREENER_VOLATILITY_MAX
+
+    @staticmethod
+    def _rule_rsi_extreme(ind):
+        """RSI у зоні перекупленості/перепроданості"""
+        return ind['rsi'] <= Config.SCREENER_RSI_LOW or ind['rsi'] >= Config.SCREENER_RSI_HIGH
+
+    @staticmethod
+    def _rule_stochastic_extreme(ind):
+        """Stochastic %K у крайніх зонах"""
+        return ind['stoch_k'] <= Config.SCREENER_STOCH_LOW or ind['stoch_k'] >= Config.SCREENER_STOCH_HIGH
+
+    @staticmethod
+    def _rule_bollinger_touch(ind):
+        """Ціна біля межі каналу Боллінджера"""
+        return ind['bb_percent'] <= 0.05 or ind['bb_percent'] >= 0.95
+
+    @staticmethod
+    def _rule_macd_momentum(ind):
+        """Гістограма MACD підтверджує напрямок EMA"""
+        return (ind['macd_hist'] > 0 and ind['ema_9'] > ind['ema_21']) or \
+            (ind['macd_hist'] < 0 and ind['ema_9'] < ind['ema_21'])
+
+    def evaluate(self, asset, indicators):
+        """Оцінка активу. Повертає (пройшов, список правил, що спрацювали)"""
+        if not self.enabled or not self.rules:
+            return True, []
+
+        hits = []
+        for name, rule in self.rules.items():
+            rule_stats = self.stats['rules'].setdefault(name, {'evaluated': 0, 'hits': 0, 'hit_rate': 0.0})
+            rule_stats['evaluated'] += 1
+            try:
+                hit = bool(rule(indicators))
+            except (KeyError, TypeError):
+                hit = False
+            if hit:
+                rule_stats['hits'] += 1
+                hits.append(name)
+            rule_stats['hit_rate'] = round(rule_stats['hits'] / rule_stats['evaluated'], 4)
+
+        passed = len(hits) >= self.min_rules
+        self.stats['screened'] += 1
+        self.stats['passed' if passed else 'rejected'] += 1
+
+        if passed:
+            logger.info(f"🔎 Скринер: {asset} пройшов ({len(hits)}/{len(self.rules)}: {', '.join(hits)})")
+        else:
+            logger.info(f"🔎 Скринер: {asset} відсіяно ({len(hits)}/{len(self.rules)} < {self.min_rules}), запит до AI не потрібен")
+        return passed, hits
+
+    def _load_stats(self):
+        """Накопичена статистика правил між запусками"""
+        stats = {'screened': 0, 'passed': 0, 'rejected': 0, 'rules': {}}
+        try:
+            if os.path.exists(self.stats_file):
+                with open(self.stats_file, 'r', encoding='utf-8') as f:
+                    stats.update(json.load(f))
+        except Exception as e:
+            logger.warning(f"⚠️ Не вдалося завантажити статистику скринера: {e}")
+        return stats
+
+    def save_stats(self):
+        try:
+            screened = self.stats['screened']
+            self.stats['llm_calls_saved_pct'] = round(self.stats['rejected'] / screened * 100, 2) if screened else 0.0
+            atomic_write(self.stats_file, dump_json(self.stats))
+        except Exception as e:
+            logger.warning(f"⚠️ Не вдалося зберегти статистику скринера: {e}")
+
+    def log_summary(self):
+        if not self.enabled:
+            return
+        stats = self.stats
+        logger.info(f"🔎 Скринер (усього): перевірено {stats['screened']}, пропущено {stats['passed']}, "
+                    f"зекономлено запитів до AI: {stats['rejected']}")
+        for name, rule_stats in stats['rules'].items():
+            logger.info(f"   • {name}: {rule_stats['hits']}/{rule_stats['evaluated']} ({rule_stats['hit_rate']*100:.1f}%)")
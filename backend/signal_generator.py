@@ -1,112 +1,385 @@
+import argparse
 import asyncio
 import logging
 import os
+import time
+from contextlib import contextmanager
 from datetime import datetime, timedelta
+from signal import SIGINT, SIGTERM
 import pytz
 import random
 from config import Config
-from pocket_client import PocketOptionClient
+from pocket_pool import create_pocket_client
 from groq_analyzer import GroqAnalyzer
 from data_handler import DataHandler
+from metrics import metrics
+from screener import SignalScreener
+from trigger_engine import TriggerEngine
+from utils.indicators import IndicatorEngine
+from utils.resampler import Resampler
 
 logger = logging.getLogger("signal_bot")
 
 class SignalGenerator:
-    def __init__(self):
-        self.pocket_client = PocketOptionClient()
-        self.analyzer = GroqAnalyzer()
-        self.data_handler = DataHandler()
+    def __init__(self, pocket_client=None, analyzer=None, data_handler=None, screener=None):
+        """Залежності можна підмінити (бектест): джерело свічок, аналізатор, сховище, скринер"""
+        self.pocket_client = pocket_client or create_pocket_client()
+        self.analyzer = analyzer or GroqAnalyzer()
+        self.data_handler = data_handler or DataHandler()
+        self.analyzer.pattern_memory = self.data_handler.pattern_memory
+        self.screener = screener or SignalScreener()
         self.signals = []
+        self.screened_out = set()
+        self.stage_timings = {}
+        self.stage_samples = None  # {етап: [секунди кожного виклику]}, якщо увімкнено (бенчмарк)
         
         # Обмеження для економії токенів
-        self.MAX_SIGNALS_PER_GENERATION = 3
-        self.REQUEST_DELAY = 2  # секунд між запитами
+        self.MAX_SIGNALS_PER_GENERATION = Config.MAX_ASSETS_PER_RUN
+        self.BATCH_SIZE = Config.GROQ_BATCH_SIZE
+        self.REQUEST_DELAY = 2  # секунд між запитами (лише послідовний режим)
+        
+        # Паралельна обробка активів
+        self.MAX_CONCURRENT_ASSETS = max(1, Config.MAX_CONCURRENT_ASSETS)
+        self.ASSET_TIMEOUT = Config.ASSET_TIMEOUT
+        self.asset_statuses = {}
+        
+        # Спільний кулдаун циклу та тригерів: актив -> time.monotonic() останнього сигналу
+        self.last_signal_at = {}
+        self.assets_in_flight = set()
+
+    @contextmanager
+    def _stage(self, name):
+        """Накопичення часу етапу обробки: {етап: [кількість, сумарні секунди]}"""
+        started = time.perf_counter()
+        try:
+            with metrics.span('stage', stage=name):
+                yield
+        finally:
+            elapsed = time.perf_counter() - started
+            stats = self.stage_timings.setdefault(name, [0, 0.0])
+            stats[0] += 1
+            stats[1] += elapsed
+            if self.stage_samples is not None:
+                self.stage_samples.setdefault(name, []).append(elapsed)
 
-    async def generate_signal(self, asset):
+    async def generate_signal(self, asset, screened_out=None):
         """Генерація одного сигналу з фіксованою затримкою входу 2 хвилини"""
         try:
-            logger.info(f"📈 Аналіз активу: {asset}")
-            
-            if not hasattr(self.pocket_client, 'client') or not self.pocket_client.client:
-                logger.error("❌ PocketOptionClient не ініціалізований")
+            prepared = await self._prepare_asset(asset, screened_out)
+            if not prepared:
                 return None
             
-            logger.info(f"📊 Запит свічок для {asset}...")
+            logger.info(f"🧠 Аналіз через GPT OSS 120B для {asset}...")
+            with self._stage('analyze'):
+                signal = await self.analyzer.analyze_market_async(
+                    asset, prepared['candles'], language=Config.LANGUAGE, indicators=prepared['indicators'],
+                    timeframes=prepared['timeframes']
+                )
+            with self._stage('finalize'):
+                return self._finalize_signal(asset, signal, prepared['candles'])
+                    
+        except Exception as e:
+            logger.error(f"❌ Помилка генерації сигналу для {asset}: {e}")
+            import traceback
+            logger.error(f"📋 Трейс: {traceback.format_exc()}")
+
+        return None
+
+    async def _prepare_asset(self, asset, screened_out=None):
+        """Свічки, індикатори та скринінг активу перед запитом до AI"""
+        logger.info(f"📈 Аналіз активу: {asset}")
+        
+        if not hasattr(self.pocket_client, 'client') or not self.pocket_client.client:
+            logger.error("❌ PocketOptionClient не ініціалізований")
+            return None
+        
+        logger.info(f"📊 Запит свічок для {asset}...")
+        with self._stage('candles'):
             candles = await self.pocket_client.get_candles(
                 asset=asset,
                 timeframe=Config.TIMEFRAMES,
-                count=50
+                count=self._base_count()
             )
+        
+        if not candles or len(candles) == 0:
+            logger.error(f"❌ Не вдалося отримати свічки для {asset}")
+            return None
+        
+        # Довший ряд - лише для старших таймфреймів, аналіз як і раніше за останніми 50 свічками
+        base_candles = candles
+        if len(candles) > 50:
+            candles = candles[-50:]
+
+        logger.info(f"✅ Отримано {len(candles)} свічок для {asset}")
+        
+        # Перевірка актуальності даних
+        if hasattr(candles[-1], 'timestamp'):
+            last_candle_time = candles[-1].timestamp
+            current_time = Config.get_kyiv_time()
             
-            if not candles or len(candles) == 0:
-                logger.error(f"❌ Не вдалося отримати свічки для {asset}")
-                return None
+            if last_candle_time.tzinfo is None:
+                last_candle_time = pytz.UTC.localize(last_candle_time)
+            
+            last_candle_time_kyiv = last_candle_time.astimezone(Config.KYIV_TZ)
+            time_diff = (current_time - last_candle_time_kyiv).total_seconds()
+            metrics.gauge('candle_staleness_seconds', round(time_diff, 3), asset=asset)
+            
+            if time_diff > 300:
+                logger.warning(f"⚠️ Остання свічка застаріла: {time_diff:.0f} сек тому")
+            else:
+                logger.info(f"🕐 Остання свічка актуальна: {time_diff:.0f} сек тому")
+        
+        # Локальні індикатори: для скринера і для промпту
+        with self._stage('indicators'):
+            indicators = IndicatorEngine.compute_batch({asset: candles})[asset]
+        
+        with self._stage('screener'):
+            passed, _ = self.screener.evaluate(asset, indicators)
+        if not passed:
+            (self.screened_out if screened_out is None else screened_out).add(asset)
+            return None
+        
+        timeframes = None
+        if Config.MTF_TIMEFRAMES:
+            with self._stage('resample'):
+                timeframes = self._higher_timeframes(base_candles)
+        
+        return {'asset': asset, 'candles': candles, 'indicators': indicators, 'timeframes': timeframes}
+
+    @staticmethod
+    def _base_count():
+        """Скільки базових свічок запитувати: 50 для аналізу або більше для старших таймфреймів"""
+        if not Config.MTF_TIMEFRAMES:
+            return 50
+        count = Config.MTF_BASE_CANDLES
+        if Config.CANDLE_CACHE_ENABLED:
+            # Вікно більше за кеш щоразу вимагало б повного дозавантаження
+            count = min(count, Config.CANDLE_CACHE_SIZE)
+        return max(50, count)
+
+    @staticmethod
+    def _higher_timeframes(base_candles):
+        """Стан старших таймфреймів з базового ряду (повні свічки + незакрита остання)"""
+        targets = [tf for tf in Config.MTF_TIMEFRAMES if tf > Config.TIMEFRAMES]
+        bars = Resampler.resample_many(
+            base_candles, Config.TIMEFRAMES, targets, now=Config.get_kyiv_time().timestamp()
+        )
+        return [Resampler.summarize(bars[tf], tf, Config.TIMEFRAMES) for tf in sorted(bars)]
 
-            logger.info(f"✅ Отримано {len(candles)} свічок для {asset}")
+    def _finalize_signal(self, asset, signal, candles=None):
+        """Перевірка впевненості та проставлення часу входу"""
+        if signal:
+            confidence = signal.get('confidence', 0)
+            logger.info(f"📝 AI повернув сигнал для {asset}: confidence={confidence*100:.1f}%")
             
-            # Перевірка актуальності даних
-            if hasattr(candles[-1], 'timestamp'):
-                last_candle_time = candles[-1].timestamp
-                current_time = Config.get_kyiv_time()
+            if confidence >= Config.MIN_CONFIDENCE:
+                duration = signal.get('duration', 2)
+                if duration > Config.MAX_DURATION:
+                    logger.warning(f"⚠️ Сигнал для {asset} має завелику тривалість: {duration} > {Config.MAX_DURATION}")
+                    signal['duration'] = Config.MAX_DURATION
                 
-                if last_candle_time.tzinfo is None:
-                    last_candle_time = pytz.UTC.localize(last_candle_time)
+                now_kyiv = Config.get_kyiv_time()
                 
-                last_candle_time_kyiv = last_candle_time.astimezone(Config.KYIV_TZ)
-                time_diff = (current_time - last_candle_time_kyiv).total_seconds()
+                # Фіксована затримка 2 хвилини для входу
+                delay_minutes = 2
+                entry_time_dt = now_kyiv + timedelta(minutes=2)  # Чітко через 2 хвилини
+                signal['entry_time'] = entry_time_dt.strftime('%H:%M')
+                signal['entry_delay'] = 2
                 
-                if time_diff > 300:
-                    logger.warning(f"⚠️ Остання свічка застаріла: {time_diff:.0f} сек тому")
+                signal['generated_at'] = now_kyiv.isoformat()
+                signal['generated_at_utc'] = datetime.utcnow().isoformat() + 'Z'
+                signal['asset'] = asset
+                signal['id'] = f"{asset}_{now_kyiv.strftime('%Y%m%d%H%M%S')}"
+                
+                # Додаємо інформацію про волатильність
+                if 'volatility' not in signal:
+                    signal['volatility'] = 0.0
+                
+                # Ситуація на момент сигналу - у пам'ять шаблонів, результат прийде з відгуком
+                if candles is not None and self.data_handler.pattern_memory:
+                    self.data_handler.pattern_memory.add(signal['id'], candles, signal.get('direction'))
+                
+                logger.info(f"✅ Створено сигнал для {asset}: {signal['direction']} ({signal['confidence']*100:.1f}%)")
+                logger.info(f"   📅 Вхід через {delay_minutes} хв о {signal['entry_time']}, Тривалість: {signal['duration']} хв")
+                return signal
+            else:
+                logger.warning(f"⚠️ Сигнал для {asset} має низьку впевненість: {confidence*100:.1f}% < {Config.MIN_CONFIDENCE*100}%")
+        else:
+            logger.warning(f"⚠️ AI не повернув сигнал для {asset}")
+        
+        return None
+
+    async def _process_asset(self, asset, semaphore=None, statuses=None, screened_out=None):
+        """Обробка одного активу з дедлайном та записом статусу.
+        
+        statuses/screened_out - власні контейнери запуску (тригер), інакше - поточного циклу
+        """
+        if semaphore is None:
+            semaphore = asyncio.Semaphore(1)
+        if screened_out is None:
+            screened_out = self.screened_out
+        
+        async with semaphore:
+            logger.info(f"💰 Обробка активу: {asset}")
+            started = time.monotonic()
+            status = 'no_signal'
+            signal = None
+            
+            try:
+                signal = await asyncio.wait_for(
+                    self.generate_signal(asset, screened_out),
+                    timeout=self.ASSET_TIMEOUT
+                )
+                if signal:
+                    status = 'signal'
+                    logger.info(f"✅ Сигнал для {asset} успішно створений")
+                elif asset in screened_out:
+                    status = 'screened'
                 else:
-                    logger.info(f"🕐 Остання свічка актуальна: {time_diff:.0f} сек тому")
+                    logger.warning(f"⚠️ Не створено сигнал для {asset}")
+            except asyncio.TimeoutError:
+                status = 'timeout'
+                logger.error(f"⏰ Перевищено дедлайн {self.ASSET_TIMEOUT:.0f} сек для {asset}, задачу скасовано")
+            except Exception as e:
+                status = 'error'
+                logger.error(f"❌ Помилка обробки {asset}: {e}")
             
-            logger.info(f"🧠 Аналіз через GPT OSS 120B для {asset}...")
-            signal = self.analyzer.analyze_market(asset, candles, language=Config.LANGUAGE)
-
-            if signal:
-                confidence = signal.get('confidence', 0)
-                logger.info(f"📝 AI повернув сигнал для {asset}: confidence={confidence*100:.1f}%")
-                
-                if confidence >= Config.MIN_CONFIDENCE:
-                    duration = signal.get('duration', 2)
-                    if duration > Config.MAX_DURATION:
-                        logger.warning(f"⚠️ Сигнал для {asset} має завелику тривалість: {duration} > {Config.MAX_DURATION}")
-                        signal['duration'] = Config.MAX_DURATION
-                    
-                    now_kyiv = Config.get_kyiv_time()
-                    
-                    # Фіксована затримка 2 хвилини для входу
-                    delay_minutes = 2
-                    entry_time_dt = now_kyiv + timedelta(minutes=2)  # Чітко через 2 хвилини
-                    signal['entry_time'] = entry_time_dt.strftime('%H:%M')
-                    signal['entry_delay'] = 2
-                    
-                    signal['generated_at'] = now_kyiv.isoformat()
-                    signal['generated_at_utc'] = datetime.utcnow().isoformat() + 'Z'
-                    signal['asset'] = asset
-                    signal['id'] = f"{asset}_{now_kyiv.strftime('%Y%m%d%H%M%S')}"
-                    
-                    # Додаємо інформацію про волатильність
-                    if 'volatility' not in signal:
-                        signal['volatility'] = 0.0
-                    
-                    logger.info(f"✅ Створено сигнал для {asset}: {signal['direction']} ({signal['confidence']*100:.1f}%)")
-                    logger.info(f"   📅 Вхід через {delay_minutes} хв о {signal['entry_time']}, Тривалість: {signal['duration']} хв")
-                    return signal
+            self._record_status(asset, status, started, statuses)
+            return asset, signal
+    
+    def _record_status(self, asset, status, started, statuses=None):
+        metrics.inc('assets_processed_total', status=status)
+        (self.asset_statuses if statuses is None else statuses)[asset] = {
+            'asset': asset,
+            'status': status,
+            'duration': round(time.monotonic() - started, 3)
+        }
+    
+    async def _process_assets_concurrently(self, assets):
+        """Паралельна обробка активів з обмеженням одночасних задач"""
+        self.asset_statuses = {}
+        self.screened_out = set()
+        logger.info(f"⚡ Паралельна обробка: до {self.MAX_CONCURRENT_ASSETS} активів одночасно, "
+                    f"дедлайн {self.ASSET_TIMEOUT:.0f} сек")
+        
+        semaphore = asyncio.Semaphore(self.MAX_CONCURRENT_ASSETS)
+        tasks = [asyncio.create_task(self._process_asset(asset, semaphore)) for asset in assets]
+        try:
+            # gather зберігає порядок активів незалежно від порядку завершення
+            return await asyncio.gather(*tasks)
+        finally:
+            for task in tasks:
+                if not task.done():
+                    task.cancel()
+    
+    async def _process_assets_batched(self, assets):
+        """Пакетний режим: свічки паралельно, потім один запит до AI на групу активів"""
+        self.asset_statuses = {}
+        self.screened_out = set()
+        started = time.monotonic()
+        semaphore = asyncio.Semaphore(self.MAX_CONCURRENT_ASSETS)
+        logger.info(f"📦 Пакетний аналіз: до {self.BATCH_SIZE} активів в одному запиті до AI")
+        
+        async def prepare(asset):
+            async with semaphore:
+                try:
+                    return await asyncio.wait_for(self._prepare_asset(asset), timeout=self.ASSET_TIMEOUT)
+                except asyncio.TimeoutError:
+                    logger.error(f"⏰ Перевищено дедлайн {self.ASSET_TIMEOUT:.0f} сек для {asset}, задачу скасовано")
+                    self._record_status(asset, 'timeout', started)
+                except Exception as e:
+                    logger.error(f"❌ Помилка обробки {asset}: {e}")
+                    self._record_status(asset, 'error', started)
+                return None
+        
+        prepared = [item for item in await asyncio.gather(*(prepare(asset) for asset in assets)) if item]
+        candles_by_asset = {item['asset']: item['candles'] for item in prepared}
+        batches = [prepared[i:i + self.BATCH_SIZE] for i in range(0, len(prepared), self.BATCH_SIZE)]
+        
+        async def analyze(batch):
+            try:
+                with self._stage('analyze'):
+                    return await asyncio.wait_for(
+                        self.analyzer.analyze_batch_async(batch, language=Config.LANGUAGE),
+                        timeout=self.ASSET_TIMEOUT
+                    )
+            except asyncio.TimeoutError:
+                logger.error(f"⏰ Перевищено дедлайн пакетного аналізу для {[item['asset'] for item in batch]}")
+                for item in batch:
+                    self._record_status(item['asset'], 'timeout', started)
+            except Exception as e:
+                logger.error(f"❌ Помилка пакетного аналізу: {e}")
+                for item in batch:
+                    self._record_status(item['asset'], 'error', started)
+            return {}
+        
+        analyzed = {}
+        for batch_result in await asyncio.gather(*(analyze(batch) for batch in batches)):
+            analyzed.update(batch_result)
+        
+        results = []
+        for asset in assets:
+            signal = None
+            if asset in analyzed:
+                with self._stage('finalize'):
+                    signal = self._finalize_signal(asset, analyzed[asset], candles_by_asset.get(asset))
+            if asset not in self.asset_statuses:
+                if signal:
+                    status = 'signal'
+                elif asset in self.screened_out:
+                    status = 'screened'
                 else:
-                    logger.warning(f"⚠️ Сигнал для {asset} має низьку впевненість: {confidence*100:.1f}% < {Config.MIN_CONFIDENCE*100}%")
-            else:
-                logger.warning(f"⚠️ AI не повернув сигнал для {asset}")
-                    
-        except Exception as e:
-            logger.error(f"❌ Помилка генерації сигналу для {asset}: {e}")
-            import traceback
-            logger.error(f"📋 Трейс: {traceback.format_exc()}")
+                    status = 'no_signal'
+                self._record_status(asset, status, started)
+            results.append((asset, signal))
+        return results
+    
+    async def _process_assets_sequentially(self, assets):
+        """Послідовна обробка активів із затримкою між запитами"""
+        self.asset_statuses = {}
+        self.screened_out = set()
+        results = []
+        
+        for asset in assets:
+            logger.info(f"\n{'='*30}")
+            results.append(await self._process_asset(asset))
+            
+            # Затримка між запитами для економії токенів
+            await asyncio.sleep(self.REQUEST_DELAY)
+        
+        return results
+    
+    def in_cooldown(self, asset, now=None, cooldown=None):
+        """Актив зараз обробляється або мав сигнал (з циклу чи тригера) менш ніж cooldown сек тому"""
+        if asset in self.assets_in_flight:
+            return True
+        last = self.last_signal_at.get(asset)
+        if last is None:
+            return False
+        now = time.monotonic() if now is None else now
+        return now - last < (Config.TRIGGER_COOLDOWN if cooldown is None else cooldown)
+    
+    def _log_asset_statuses(self, assets):
+        """Виведення статусу обробки кожного активу"""
+        logger.info("📋 Статус обробки активів:")
+        icons = {'signal': '✅', 'no_signal': '➖', 'screened': '🔎', 'timeout': '⏰', 'error': '❌'}
+        for asset in assets:
+            status = self.asset_statuses.get(asset)
+            if not status:
+                continue
+            icon = icons.get(status['status'], '•')
+            logger.info(f"   {icon} {status['asset']}: {status['status']} ({status['duration']:.2f} сек)")
 
-        return None
+    async def generate_all_signals(self, keep_connection=False):
+        """Генерація сигналів для всіх активів з обмеженням для економії токенів
+        
+        keep_connection=True залишає з'єднання з PocketOption відкритим
+        для наступного циклу (режим демона). Метрики циклу - у metrics.json / metrics.prom
+        """
+        with metrics.run('cycle'), self.analyzer.usage.scope('cycle'):
+            return await self._generate_all_signals(keep_connection)
 
-    async def generate_all_signals(self):
-        """Генерація сигналів для всіх активів з обмеженням для економії токенів"""
+    async def _generate_all_signals(self, keep_connection):
         logger.info("=" * 60)
         logger.info(f"🚀 ПОЧАТОК ГЕНЕРАЦІЇ СИГНАЛІВ")
         logger.info(f"🌐 Мова: {Config.LANGUAGE}")
@@ -125,12 +398,16 @@ class SignalGenerator:
             logger.info(f"  - Мова: {Config.LANGUAGE}")
             logger.info(f"  - Часовий пояс: Київ (UTC+2)")
             logger.info(f"  - Затримка входу: 2 хвилини")
+            logger.info(f"  - Паралельно: {Config.CONCURRENT_GENERATION} (до {self.MAX_CONCURRENT_ASSETS} активів)")
             
             # ⚠️ ВИДАЛЕНО ВСІ ПЕРЕВІРКИ ЧАСУ! Генеруємо завжди
             logger.info("🔗 Підключення до PocketOption...")
             logger.info(f"   Режим: {'DEMO' if Config.POCKET_DEMO else 'REAL'}")
             
-            connection_result = await self.pocket_client.connect()
+            if keep_connection:
+                connection_result = await self.pocket_client.ensure_connected()
+            else:
+                connection_result = await self.pocket_client.connect()
             
             if not connection_result:
                 logger.error("❌ Не вдалося підключитися до PocketOption")
@@ -138,6 +415,9 @@ class SignalGenerator:
                 return []
             
             logger.info("✅ Підключення успішне!")
+            if (Config.STREAMING_ENABLED and keep_connection and hasattr(self.pocket_client, 'start_streaming')
+                    and not self.pocket_client.streaming):
+                await self.pocket_client.start_streaming(Config.ASSETS)
             logger.info(f"🎯 Генерую сигнали для {self.MAX_SIGNALS_PER_GENERATION} активів...")
             
             valid_signals = []
@@ -145,52 +425,71 @@ class SignalGenerator:
             
             # Обмежуємо кількість активів для аналізу
             assets_to_process = Config.ASSETS[:self.MAX_SIGNALS_PER_GENERATION]
+            if Config.TRIGGERS_ENABLED:
+                # Свіжий сигнал за тригером не дублюється плановим циклом
+                cooling = [asset for asset in assets_to_process if self.in_cooldown(asset)]
+                if cooling:
+                    logger.info(f"🎯 Пропуск активів у кулдауні тригерів: {', '.join(cooling)}")
+                    assets_to_process = [asset for asset in assets_to_process if asset not in cooling]
             logger.info(f"📊 Обробляємо активи: {assets_to_process}")
             
-            for asset in assets_to_process:
-                logger.info(f"\n{'='*30}")
-                logger.info(f"💰 Обробка активу: {asset}")
-                logger.info(f"{'='*30}")
-                
-                signal = await self.generate_signal(asset)
+            self.assets_in_flight.update(assets_to_process)
+            try:
+                if self.BATCH_SIZE > 1:
+                    results = await self._process_assets_batched(assets_to_process)
+                elif Config.CONCURRENT_GENERATION:
+                    results = await self._process_assets_concurrently(assets_to_process)
+                else:
+                    results = await self._process_assets_sequentially(assets_to_process)
+            finally:
+                self.assets_in_flight.difference_update(assets_to_process)
+            
+            # Результати у тому ж порядку, що й активи
+            for asset, signal in results:
                 if signal:
                     valid_signals.append(signal)
-                    logger.info(f"✅ Сигнал для {asset} успішно створений")
+                    self.last_signal_at[asset] = time.monotonic()
+                    self.analyzer.usage.record_signal(asset)
                 else:
-                    logger.warning(f"⚠️ Не створено сигнал для {asset}")
                     failed_assets.append(asset)
-                
-                # Затримка між запитами для економії токенів
-                await asyncio.sleep(self.REQUEST_DELAY)
+            
+            self._log_asset_statuses(assets_to_process)
+            self.screener.log_summary()
+            self.analyzer.usage.log_summary()
+            self._flush_run_state()
 
-            if valid_signals:
-                logger.info(f"\n💾 Збереження {len(valid_signals)} сигналів...")
-                save_result = self.data_handler.save_signals(valid_signals)
+            # Збереження та очищення - один атомарний запис кожного файлу
+            metrics.gauge('run_signals', len(valid_signals))
+            with self._stage('save'), self.data_handler.batch():
+                if valid_signals:
+                    logger.info(f"\n💾 Збереження {len(valid_signals)} сигналів...")
+                    save_result = self.data_handler.save_signals(valid_signals)
                 
-                if save_result:
-                    logger.info(f"✅ Збережено {len(valid_signals)} сигналів")
+                    if save_result:
+                        logger.info(f"✅ Збережено {len(valid_signals)} сигналів")
                     
-                    logger.info(f"\n🎯 ЗГЕНЕРОВАНО {len(valid_signals)} СИГНАЛІВ:")
-                    for i, signal in enumerate(valid_signals, 1):
-                        entry_delay = signal.get('entry_delay', 0)
-                        logger.info(f"   {i}. {signal['asset']}: {signal['direction']} ({signal['confidence']*100:.1f}%)")
-                        logger.info(f"      Вхід через {entry_delay} хв о {signal.get('entry_time', 'N/A')}, Тривалість: {signal.get('duration', 'N/A')} хв")
-                        logger.info(f"      Волатильність: {signal.get('volatility', 0):.4f}%")
+                        logger.info(f"\n🎯 ЗГЕНЕРОВАНО {len(valid_signals)} СИГНАЛІВ:")
+                        for i, signal in enumerate(valid_signals, 1):
+                            entry_delay = signal.get('entry_delay', 0)
+                            logger.info(f"   {i}. {signal['asset']}: {signal['direction']} ({signal['confidence']*100:.1f}%)")
+                            logger.info(f"      Вхід через {entry_delay} хв о {signal.get('entry_time', 'N/A')}, Тривалість: {signal.get('duration', 'N/A')} хв")
+                            logger.info(f"      Волатильність: {signal.get('volatility', 0):.4f}%")
+                    else:
+                        logger.error("❌ Помилка збереження сигналів")
                 else:
-                    logger.error("❌ Помилка збереження сигналів")
-            else:
-                logger.warning("⚠️  Не створено жодного сигналу")
+                    logger.warning("⚠️  Не створено жодного сигналу")
                 
-                if failed_assets:
-                    logger.info(f"📉 Активи без сигналів: {', '.join(failed_assets)}")
-
-            logger.info("🔌 Відключення від PocketOption...")
-            await self.pocket_client.disconnect()
-            logger.info("✅ Відключено від PocketOption")
+                    if failed_assets:
+                        logger.info(f"📉 Активи без сигналів: {', '.join(failed_assets)}")
+                
+                # Автоматичне очищення старих сигналів
+                logger.info("🧹 Автоматичне очищення старих сигналів...")
+                self.data_handler.auto_cleanup_old_signals()
             
-            # Автоматичне очищення старих сигналів
-            logger.info("🧹 Автоматичне очищення старих сигналів...")
-            self.data_handler.auto_cleanup_old_signals()
+            if not keep_connection:
+                logger.info("🔌 Відключення від PocketOption...")
+                await self.pocket_client.disconnect()
+                logger.info("✅ Відключено від PocketOption")
             
             logger.info(f"\n⏱️  Час виконання: {Config.get_kyiv_time().strftime('%H:%M:%S')}")
             logger.info(f"📊 Підсумок: {len(valid_signals)} сигналів з {len(assets_to_process)} активів")
@@ -204,6 +503,116 @@ class SignalGenerator:
             logger.error(f"📋 Трейс: {traceback.format_exc()}")
             return []
 
+    async def generate_for_trigger(self, asset, triggers):
+        """Позачерговий сигнал одного активу (TriggerEngine): генерація і одразу збереження.
+        Статуси, метрики та облік Groq - власні (source=trigger), тож не змішуються з циклом,
+        що йде паралельно, і записуються на диск одразу після запуску"""
+        if asset in self.assets_in_flight:
+            logger.info(f"🎯 {asset}: вже обробляється, тригер пропущено")
+            return None
+        self.assets_in_flight.add(asset)
+        try:
+            with metrics.run('trigger'), self.analyzer.usage.scope('trigger'):
+                try:
+                    _, signal = await self._process_asset(asset, statuses={}, screened_out=set())
+                    if not signal:
+                        return None
+                    self.last_signal_at[asset] = time.monotonic()
+                    signal['trigger'] = ','.join(triggers)
+                    self.analyzer.usage.record_signal(asset)
+                    with self._stage('save'), self.data_handler.batch():
+                        self.data_handler.save_signals([signal])
+                    logger.info(f"⚡ Сигнал за тригером: {asset} {signal['direction']} ({signal['confidence']*100:.1f}%)")
+                    return signal
+                finally:
+                    self._flush_run_state()
+        finally:
+            self.assets_in_flight.discard(asset)
+
+    def _flush_run_state(self):
+        """Кеш відповідей, статистика скринера та облік Groq поточного запуску - на диск"""
+        self.screener.save_stats()
+        self.analyzer.flush_cache()
+        self.analyzer.usage.save()
+
+    async def run_daemon(self, stop_event=None):
+        """Резидентний режим: одне з'єднання та аналізатор на всі цикли,
+        запуск точно на межах інтервалу (:00, :10, :20...), між ними - тригери (TRIGGERS_ENABLED)"""
+        stop_event = stop_event or asyncio.Event()
+        logger.info(f"👹 Запуск демона: інтервал {Config.SIGNAL_INTERVAL} сек")
+        trigger_engine = None
+        
+        try:
+            if Config.TRIGGERS_ENABLED:
+                trigger_engine = await TriggerEngine(self).start()
+            
+            while not stop_event.is_set():
+                now_utc = datetime.utcnow()
+                next_run = get_next_run_time(now_utc)
+                wait_seconds = (next_run - now_utc).total_seconds()
+                logger.info(f"⏰ Наступний цикл о {next_run.strftime('%H:%M:%S')} UTC (через {wait_seconds:.0f} сек)")
+                
+                # Заздалегідь перевіряємо з'єднання, щоб цикл стартував рівно на межі
+                if wait_seconds > 5:
+                    try:
+                        await asyncio.wait_for(stop_event.wait(), timeout=wait_seconds - 5)
+                        break
+                    except asyncio.TimeoutError:
+                        pass
+                    await self.pocket_client.ensure_connected()
+                    wait_seconds = (next_run - datetime.utcnow()).total_seconds()
+                
+                try:
+                    await asyncio.wait_for(stop_event.wait(), timeout=max(0, wait_seconds))
+                    break
+                except asyncio.TimeoutError:
+                    pass
+                
+                signals = await self.generate_all_signals(keep_connection=True)
+                logger.info(f"🔁 Цикл завершено: {len(signals)} сигналів")
+        finally:
+            logger.info("🛑 Зупинка демона...")
+            if trigger_engine:
+                await trigger_engine.stop()
+                trigger_engine.log_summary()
+            # Тригери записують свій стан самі; тут - усе накопичене після останнього запуску
+            self.screener.save_stats()
+            self.analyzer.flush_cache()
+            metrics.save()
+            await self.pocket_client.disconnect()
+            self.data_handler.close()
+
+def get_next_run_time(now_utc, interval=None):
+    """Наступна межа інтервалу генерації (для 600 сек: :00, :10, :20...)"""
+    interval = interval or Config.SIGNAL_INTERVAL
+    epoch = datetime(1970, 1, 1)
+    elapsed = (now_utc.replace(tzinfo=None) - epoch).total_seconds()
+    next_boundary = (int(elapsed // interval) + 1) * interval
+    return now_utc + timedelta(seconds=next_boundary - elapsed)
+
+async def run_daemon():
+    """Запуск генератора в режимі демона до SIGINT/SIGTERM"""
+    if not Config.validate():
+        print("❌ Помилка валідації конфігурації. Перевірте ваші змінні оточення.")
+        return
+    
+    logging.basicConfig(
+        level=getattr(logging, Config.LOG_LEVEL),
+        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
+        datefmt='%Y-%m-%d %H:%M:%S'
+    )
+    
+    stop_event = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (SIGINT, SIGTERM):
+        try:
+            loop.add_signal_handler(sig, stop_event.set)
+        except NotImplementedError:
+            pass  # Windows
+    
+    generator = SignalGenerator()
+    await generator.run_daemon(stop_event)
+
 async def main():
     """Головна функція - запускається ТІЛЬКИ ОДИН РАЗ"""
     print("\n" + "="*60)
@@ -211,7 +620,7 @@ async def main():
     print(f"📅 Поточний час UTC: {datetime.utcnow().strftime('%Y-%m-%d %H:%M:%S')}")
     print(f"⏰ Автоматичний запуск: кожні 10 хвилин (у :00, :10, :20, :30, :40, :50)")
     print(f"🌐 Мова: {Config.LANGUAGE}")
-    print(f"💰 Обмеження: 3 сигнали для економії токенів Groq")
+    print(f"💰 Обмеження: {Config.MAX_ASSETS_PER_RUN} активів для економії токенів Groq")
     print(f"🔄 Режим: {'DEMO' if Config.POCKET_DEMO else 'REAL'}")
     print("="*60)
     
@@ -246,25 +655,16 @@ async def main():
     print(f"\n✅ Генерація сигналів завершена о {Config.get_kyiv_time().strftime('%H:%M:%S')}")
     print("="*60)
     
-    # Очищаємо старі сигнали після генерації
-    generator.data_handler.auto_cleanup_old_signals()
+    # Старі сигнали вже очищено в generate_all_signals
+    generator.data_handler.close()
     
     # Важливо: Повідомляємо про наступний автоматичний запуск
     print(f"\n⏰ НАСТУПНИЙ АВТОМАТИЧНИЙ ЗАПУСК:")
     
-    # ВИПРАВЛЕНИЙ КОД:
     now_utc = datetime.utcnow()
     
     # Розраховуємо наступний 10-хвилинний інтервал
-    current_minute = now_utc.minute
-    next_minute = ((current_minute // 10) + 1) * 10
-    
-    if next_minute >= 60:
-        # Перехід на наступну годину
-        next_time_utc = now_utc.replace(minute=0, second=0, microsecond=0) + timedelta(hours=1)
-    else:
-        # Це ж година
-        next_time_utc = now_utc.replace(minute=next_minute, second=0, microsecond=0)
+    next_time_utc = get_next_run_time(now_utc)
     
     # Розраховуємо різницю в часі
     time_diff = next_time_utc - now_utc
@@ -275,4 +675,12 @@ async def main():
     print("="*60)
 
 if __name__ == "__main__":
-    asyncio.run(main())
+    parser = argparse.ArgumentParser(description="Генератор торгових сигналів")
+    parser.add_argument('--daemon', action='store_true', default=Config.DAEMON_MODE,
+                        help="резидентний режим з постійним з'єднанням")
+    args = parser.parse_args()
+    
+    if args.daemon:
+        asyncio.run(run_daemon())
+    else:
+        asyncio.run(main())
@@ -0,0 +1,508 @@
+import json
+import logging
+import os
+import sqlite3
+import threading
+from contextlib import contextmanager
+from datetime import datetime
+from itertools import islice
+from config import Config
+from feedback_stats import FeedbackStats
+from history_store import HistoryStore
+from unit_of_work import UnitOfWork
+
+logger = logging.getLogger("signal_bot")
+
+
+def empty_signals_document():
+    return {
+        "last_update": None,
+        "signals": [],
+        "timezone": "Europe/Kiev (UTC+2)",
+        "total_signals": 0,
+        "active_signals": 0,
+        "generation_count": 0
+    }
+
+
+def to_timestamp(value):
+    """ISO-рядок або datetime у epoch-секунди (None, якщо не вдалося розібрати)"""
+    if not value:
+        return None
+    try:
+        if isinstance(value, str):
+            value = datetime.fromisoformat(value.replace('Z', '+00:00'))
+        if value.tzinfo is None:
+            value = Config.KYIV_TZ.localize(value)
+        return value.timestamp()
+    except (TypeError, ValueError):
+        return None
+
+
+class StorageBackend:
+    """Інтерфейс сховища DataHandler: активні сигнали, історія, відгуки та уроки.
+
+    Реалізації мають атрибути uow (UnitOfWork для JSON-файлів) та
+    feedback_stats (накопичувальна статистика відгуків).
+
+    JSON-файли в data/ завжди лишаються представленням для статичного сайту,
+    незалежно від того, де зберігаються дані.
+    """
+
+    name = 'base'
+
+    @contextmanager
+    def transaction(self):
+        """Групування кількох записів в одну транзакцію"""
+        yield self
+
+    def load_signals_document(self):
+        raise NotImplementedError
+
+    def save_signals_document(self, data):
+        raise NotImplementedError
+
+    def append_history(self, entries):
+        raise NotImplementedError
+
+    def recent_history(self, limit, asset=None):
+        """Останні limit записів історії від старого до нового"""
+        raise NotImplementedError
+
+    def history_between(self, start, end, asset=None):
+        """Записи історії з generated_at у [start, end] від нового до старого"""
+        raise NotImplementedError
+
+    def find_signal(self, signal_id):
+        """Сигнал за id серед активних або в історії (None, якщо не знайдено)"""
+        raise NotImplementedError
+
+    def add_feedback(self, entry):
+        raise NotImplementedError
+
+    def all_feedback(self):
+        raise NotImplementedError
+
+    def feedback_for_signal(self, signal_id):
+        raise NotImplementedError
+
+    def unlearned_feedback(self):
+        raise NotImplementedError
+
+    def mark_feedback_learned(self, entries):
+        raise NotImplementedError
+
+    def load_lessons(self):
+        raise NotImplementedError
+
+    def add_lessons(self, lessons, last_learning, learned_patterns):
+        raise NotImplementedError
+
+    def export_views(self):
+        """Оновлення JSON-файлів для сайту"""
+
+    def close(self):
+        pass
+
+
+class JsonStorage(StorageBackend):
+    """Поточний формат: окремі JSON-документи та журнали історії і відгуків HistoryStore.
+
+    Відгуки лише дописуються в журнал FEEDBACK_DIR, feedback.json - підсумок
+    FeedbackStats. Позначка «вивчено» - окремий запис журналу з type='learned'.
+    """
+
+    name = 'json'
+
+    def __init__(self, uow=None):
+        self.uow = uow or UnitOfWork()
+        self.feedback_stats = FeedbackStats(self.uow)
+        self.signals_file = Config.SIGNALS_FILE
+        self.history_file = Config.HISTORY_FILE
+        self.feedback_file = Config.FEEDBACK_FILE
+        self.lessons_file = Config.LESSONS_FILE
+        self.history = HistoryStore()
+        self.history.import_json(self.history_file)
+        self.feedback = HistoryStore(Config.FEEDBACK_DIR, retention_days=0)
+        self.feedback.import_json(self.feedback_file, key='feedback_history')
+
+    @contextmanager
+    def transaction(self):
+        """Зміни всередині записуються одним атомарним flush на файл"""
+        with self.uow:
+            yield self
+
+    def _read(self, path, default):
+        return self.uow.read(path, default)
+
+    def _write(self, path, data):
+        self.uow.stage(path, data)
+
+    def load_signals_document(self):
+        return self._read(self.signals_file, empty_signals_document())
+
+    def save_signals_document(self, data):
+        self._write(self.signals_file, data)
+
+    def append_history(self, entries):
+        self.history.append(entries)
+        self.uow.stage(self.history_file, self.history.recent(Config.MAX_SIGNALS_HISTORY), indent=None)
+        self.history.compact_in_background()
+
+    def recent_history(self, limit, asset=None):
+        return self.history.recent(limit, asset)
+
+    def history_between(self, start, end, asset=None):
+        start_ts, end_ts = to_timestamp(start), to_timestamp(end)
+        result = []
+        for entry in self.history.iter_recent(asset):
+            generated_ts = to_timestamp(entry.get('generated_at'))
+            if generated_ts is None or generated_ts > end_ts:
+                continue
+            if generated_ts < start_ts:
+                # Сегменти впорядковані за часом запису, тож далі лише старіші сигнали
+                if (to_timestamp(entry.get('saved_at')) or 0) < start_ts:
+                    break
+                continue
+            result.append(entry)
+        return result
+
+    @staticmethod
+    def _feedback_key(entry):
+        return entry.get('signal_id'), entry.get('feedback_at')
+
+    def _feedback_entries(self, signal_id=None):
+        """Відгуки з журналу від старого до нового з урахуванням позначок «вивчено»"""
+        learned = set()
+        entries = []
+        for record in self.feedback.iter_recent():
+            if signal_id is not None and record.get('signal_id') != signal_id:
+                continue
+            # Позначки дописуються після відгуку, тож при читанні з кінця трапляються раніше
+            if record.get('type') == 'learned':
+                learned.add(self._feedback_key(record))
+                continue
+            if self._feedback_key(record) in learned:
+                record['learned'] = True
+            entries.append(record)
+        entries.reverse()
+        return entries
+
+    def find_signal(self, signal_id):
+        for signal in self.load_signals_document().get('signals', []):
+            if signal.get('id') == signal_id:
+                return signal
+        # Відгуки надходять на свіжі сигнали: пошук з кінця журналу в межах вікна сайту
+        for entry in islice(self.history.iter_recent(), Config.MAX_SIGNALS_HISTORY):
+            if entry.get('id') == signal_id:
+                return entry
+        return None
+
+    def add_feedback(self, entry):
+        """Дописування відгуку в журнал; feedback.json оновлює export_views"""
+        self.feedback.append([entry])
+
+    def all_feedback(self):
+        return self._feedback_entries()
+
+    def feedback_for_signal(self, signal_id):
+        return self._feedback_entries(signal_id)
+
+    def unlearned_feedback(self):
+        return [fb for fb in self._feedback_entries() if not fb.get('learned', False)]
+
+    def mark_feedback_learned(self, entries):
+        self.feedback.append([
+            {'type': 'learned', 'signal_id': fb.get('signal_id'), 'feedback_at': fb.get('feedback_at')}
+            for fb in entries
+        ])
+
+    def load_lessons(self):
+        return self._read(self.lessons_file, {}).get('lessons', [])
+
+    def add_lessons(self, lessons, last_learning, learned_patterns):
+        data = self._read(self.lessons_file, {})
+        data.update({
+            'lessons': data.get('lessons', []) + lessons,
+            'last_learning': last_learning,
+            'learned_patterns': learned_patterns
+        })
+        self._write(self.lessons_file, data)
+
+    def export_views(self):
+        """feedback.json для сайту - лише підсумок відгуків (журнал - у FEEDBACK_DIR)"""
+        self._write(self.feedback_file, self.feedback_stats.summary())
+
+    def close(self):
+        self.history.wait()
+
+
+class SqliteStorage(StorageBackend):
+    """SQLite-сховище з індексами за активом, часом генерації та signal_id.
+
+    WAL дозволяє сайту/скриптам читати базу під час запису, а вкладені
+    transaction() фіксуються одним COMMIT на зовнішньому рівні.
+    """
+
+    name = 'sqlite'
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS meta (
+            key TEXT PRIMARY KEY,
+            value TEXT
+        );
+        CREATE TABLE IF NOT EXISTS signals (
+            signal_id TEXT PRIMARY KEY,
+            asset TEXT,
+            generated_ts REAL,
+            position INTEGER,
+            payload TEXT NOT NULL
+        );
+        CREATE TABLE IF NOT EXISTS history (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            history_id TEXT,
+            signal_id TEXT,
+            asset TEXT,
+            generated_ts REAL,
+            payload TEXT NOT NULL
+        );
+        CREATE INDEX IF NOT EXISTS idx_history_asset_generated ON history(asset, generated_ts);
+        CREATE INDEX IF NOT EXISTS idx_history_generated ON history(generated_ts);
+        CREATE INDEX IF NOT EXISTS idx_history_signal ON history(signal_id);
+        CREATE TABLE IF NOT EXISTS feedback (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            signal_id TEXT,
+            success INTEGER,
+            feedback_at TEXT,
+            learned INTEGER DEFAULT 0,
+            payload TEXT NOT NULL
+        );
+        CREATE INDEX IF NOT EXISTS idx_feedback_signal ON feedback(signal_id);
+        CREATE INDEX IF NOT EXISTS idx_feedback_learned ON feedback(learned);
+        CREATE TABLE IF NOT EXISTS lessons (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            signal_id TEXT,
+            asset TEXT,
+            success INTEGER,
+            payload TEXT NOT NULL
+        );
+        CREATE INDEX IF NOT EXISTS idx_lessons_asset ON lessons(asset);
+        CREATE INDEX IF NOT EXISTS idx_lessons_signal ON lessons(signal_id);
+    """
+
+    def __init__(self, path=None, uow=None):
+        self.uow = uow or UnitOfWork()
+        self.feedback_stats = FeedbackStats(self.uow)
+        self.path = str(path or Config.SQLITE_FILE)
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        is_new = not os.path.exists(self.path)
+        self.conn = sqlite3.connect(self.path, isolation_level=None, check_same_thread=False)
+        self.conn.row_factory = sqlite3.Row
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript(self.SCHEMA)
+        self._lock = threading.RLock()
+        self._depth = 0
+        if is_new:
+            self._import_json()
+
+    @contextmanager
+    def transaction(self):
+        with self._lock:
+            if self._depth == 0:
+                self.conn.execute("BEGIN")
+            self._depth += 1
+            try:
+                yield self
+            except BaseException:
+                self._depth -= 1
+                if self._depth == 0:
+                    self.conn.execute("ROLLBACK")
+                raise
+            self._depth -= 1
+            if self._depth == 0:
+                self.conn.execute("COMMIT")
+
+    @staticmethod
+    def _dumps(data):
+        return json.dumps(data, ensure_ascii=False, default=str, separators=(',', ':'))
+
+    def _import_json(self):
+        """Перенесення наявних JSON-даних у нову базу"""
+        source = JsonStorage(self.uow)
+        with self.transaction():
+            document = source.load_signals_document()
+            if document.get('signals') or document.get('generation_count'):
+                self.save_signals_document(document)
+            history = list(source.history.iter_recent())
+            history.reverse()
+            self.append_history(history)
+            for entry in source.all_feedback():
+                self.add_feedback(entry)
+            lessons = source._read(source.lessons_file, {})
+            self.add_lessons(lessons.get('lessons', []), lessons.get('last_learning'),
+                             lessons.get('learned_patterns', []))
+        if history:
+            logger.info(f"🗄️ SQLite: перенесено {len(history)} записів історії з JSON")
+
+    def _set_meta(self, key, value):
+        self.conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)", (key, self._dumps(value)))
+
+    def _get_meta(self, key, default=None):
+        row = self.conn.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return json.loads(row['value']) if row else default
+
+    def load_signals_document(self):
+        with self._lock:
+            data = self._get_meta('signals_document', empty_signals_document())
+            rows = self.conn.execute("SELECT payload FROM signals ORDER BY position").fetchall()
+        data['signals'] = [json.loads(row['payload']) for row in rows]
+        return data
+
+    def save_signals_document(self, data):
+        meta = {key: value for key, value in data.items() if key != 'signals'}
+        rows = [
+            (signal.get('id') or f"#{position}", signal.get('asset'),
+             signal.get('generated_ts') or to_timestamp(signal.get('generated_at')), position, self._dumps(signal))
+            for position, signal in enumerate(data.get('signals', []))
+        ]
+        with self.transaction():
+            self._set_meta('signals_document', meta)
+            self.conn.execute("DELETE FROM signals")
+            self.conn.executemany(
+                "INSERT OR REPLACE INTO signals (signal_id, asset, generated_ts, position, payload) VALUES (?, ?, ?, ?, ?)",
+                rows
+            )
+
+    def append_history(self, entries):
+        rows = [
+            (entry.get('history_id'), entry.get('id'), entry.get('asset'),
+             to_timestamp(entry.get('generated_at')), self._dumps(entry))
+            for entry in entries
+        ]
+        with self.transaction():
+            self.conn.executemany(
+                "INSERT INTO history (history_id, signal_id, asset, generated_ts, payload) VALUES (?, ?, ?, ?, ?)",
+                rows
+            )
+
+    def recent_history(self, limit, asset=None):
+        query = "SELECT payload FROM history"
+        params = []
+        if asset is not None:
+            query += " WHERE asset = ?"
+            params.append(asset)
+        query += " ORDER BY id DESC LIMIT ?"
+        params.append(limit)
+        with self._lock:
+            rows = self.conn.execute(query, params).fetchall()
+        return [json.loads(row['payload']) for row in reversed(rows)]
+
+    def history_between(self, start, end, asset=None):
+        query = "SELECT payload FROM history WHERE generated_ts BETWEEN ? AND ?"
+        params = [to_timestamp(start), to_timestamp(end)]
+        if asset is not None:
+            query += " AND asset = ?"
+            params.append(asset)
+        query += " ORDER BY generated_ts DESC"
+        with self._lock:
+            rows = self.conn.execute(query, params).fetchall()
+        return [json.loads(row['payload']) for row in rows]
+
+    def history_for_signal(self, signal_id):
+        with self._lock:
+            rows = self.conn.execute("SELECT payload FROM history WHERE signal_id = ? ORDER BY id", (signal_id,)).fetchall()
+        return [json.loads(row['payload']) for row in rows]
+
+    def add_feedback(self, entry):
+        with self.transaction():
+            self.conn.execute(
+                "INSERT INTO feedback (signal_id, success, feedback_at, learned, payload) VALUES (?, ?, ?, ?, ?)",
+                (entry.get('signal_id'), int(bool(entry.get('success'))), entry.get('feedback_at'),
+                 int(bool(entry.get('learned'))), self._dumps(entry))
+            )
+
+    def find_signal(self, signal_id):
+        with self._lock:
+            row = self.conn.execute("SELECT payload FROM signals WHERE signal_id = ?", (signal_id,)).fetchone()
+            if row is None:
+                row = self.conn.execute(
+                    "SELECT payload FROM history WHERE signal_id = ? ORDER BY id DESC LIMIT 1", (signal_id,)
+                ).fetchone()
+        return json.loads(row['payload']) if row else None
+
+    def all_feedback(self):
+        return self._feedback_rows("1 = 1")
+
+    def _feedback_rows(self, where, params=()):
+        with self._lock:
+            rows = self.conn.execute(f"SELECT payload, learned FROM feedback WHERE {where} ORDER BY id", params).fetchall()
+        result = []
+        for row in rows:
+            entry = json.loads(row['payload'])
+            entry['learned'] = bool(row['learned'])
+            result.append(entry)
+        return result
+
+    def feedback_for_signal(self, signal_id):
+        return self._feedback_rows("signal_id = ?", (signal_id,))
+
+    def unlearned_feedback(self):
+        return self._feedback_rows("learned = 0")
+
+    def mark_feedback_learned(self, entries):
+        with self.transaction():
+            self.conn.executemany(
+                "UPDATE feedback SET learned = 1 WHERE signal_id = ? AND feedback_at = ?",
+                [(fb.get('signal_id'), fb.get('feedback_at')) for fb in entries]
+            )
+
+    def load_lessons(self):
+        with self._lock:
+            rows = self.conn.execute("SELECT payload FROM lessons ORDER BY id").fetchall()
+        return [json.loads(row['payload']) for row in rows]
+
+    def add_lessons(self, lessons, last_learning, learned_patterns):
+        with self.transaction():
+            self.conn.executemany(
+                "INSERT INTO lessons (signal_id, asset, success, payload) VALUES (?, ?, ?, ?)",
+                [(lesson.get('signal_id'), lesson.get('asset'), int(bool(lesson.get('success'))), self._dumps(lesson))
+                 for lesson in lessons]
+            )
+            self._set_meta('last_learning', last_learning)
+            self._set_meta('learned_patterns', learned_patterns)
+
+    def export_views(self):
+        """JSON-представлення для сайту: обмежені вибірки замість повних таблиць"""
+        limit = Config.MAX_SIGNALS_HISTORY
+        with self._lock:
+            rows = self.conn.execute("SELECT payload FROM lessons ORDER BY id DESC LIMIT ?", (limit,)).fetchall()
+        views = {
+            Config.SIGNALS_FILE: self.load_signals_document(),
+            Config.HISTORY_FILE: self.recent_history(limit),
+            Config.FEEDBACK_FILE: self.feedback_stats.summary(),
+            Config.LESSONS_FILE: {
+                'lessons': [json.loads(row['payload']) for row in reversed(rows)],
+                'last_learning': self._get_meta('last_learning'),
+                'learned_patterns': self._get_meta('learned_patterns', [])
+            }
+        }
+        with self.uow:
+            for path, data in views.items():
+                self.uow.stage(path, data, indent=None if path == Config.HISTORY_FILE else 2)
+
+    def close(self):
+        with self._lock:
+            # Переносимо WAL у основний файл, щоб у репозиторій потрапила цілісна база
+            self.conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+            self.conn.close()
+
+
+def create_storage(backend=None, uow=None):
+    """Сховище за STORAGE_BACKEND (json / sqlite)"""
+    backend = (backend or Config.STORAGE_BACKEND).lower()
+    if backend == 'sqlite':
+        return SqliteStorage(uow=uow)
+    if backend != 'json':
+        logger.warning(f"⚠️ Невідоме сховище {backend}, використовую json")
+    return JsonStorage(uow)
@@ -0,0 +1,184 @@
+import asyncio
+import logging
+import time
+from config import Config
+from metrics import metrics
+from utils.indicators import IndicatorEngine
+
+logger = logging.getLogger("signal_bot")
+
+
+class TokenBucket:
+    """Глобальне обмеження частоти: rate токенів за секунду, не більше capacity про запас"""
+
+    def __init__(self, rate, capacity):
+        self.rate = rate
+        self.capacity = max(1.0, capacity)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+
+    def try_acquire(self, now=None):
+        now = now if now is not None else time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return True
+        return False
+
+
+class TriggerEngine:
+    """Позачергова генерація сигналу на закритті свічки, коли спрацювала умова.
+
+    На кожній закритій свічці таймфрейму TIMEFRAMES актив стає в чергу; воркер рахує
+    індикатори поточного та попереднього вікна і перевіряє тригери з TRIGGERS. Якщо
+    хоч один спрацював, а актив поза кулдауном (спільним з плановим циклом) і глобальний
+    ліміт дозволяє, для активу запускається generate_signal. Закриття свічок приходять
+    з потокового режиму (OhlcAggregator); без нього - власний таймер на межах таймфрейму.
+    """
+
+    def __init__(self, generator, triggers=None, cooldown=None, rate_per_minute=None, burst=None):
+        self.generator = generator
+        self.timeframe = Config.TIMEFRAMES
+        self.triggers = {}
+        for name in triggers or Config.TRIGGERS:
+            trigger = getattr(self, f"_trigger_{name}", None)
+            if trigger is None:
+                logger.warning(f"⚠️ Невідомий тригер: {name}")
+                continue
+            self.triggers[name] = trigger
+
+        self.cooldown = Config.TRIGGER_COOLDOWN if cooldown is None else cooldown
+        rate_per_minute = Config.TRIGGER_RATE_PER_MINUTE if rate_per_minute is None else rate_per_minute
+        self.bucket = TokenBucket(rate_per_minute / 60, Config.TRIGGER_BURST if burst is None else burst)
+        self.queue = asyncio.Queue()
+        self._queued = set()
+        self._last_fired = {}
+        self._tasks = []
+        self.stats = {'evaluated': 0, 'fired': 0, 'cooldown': 0, 'rate_limited': 0, 'signals': 0}
+
+    async def start(self):
+        client = self.generator.pocket_client
+        if Config.STREAMING_ENABLED and hasattr(client, 'add_bar_listener'):
+            if await client.ensure_connected() and not client.streaming:
+                await client.start_streaming(Config.ASSETS)
+            client.add_bar_listener(self.on_candle_close)
+            source = "закриття свічок потоку"
+        else:
+            self._tasks.append(asyncio.create_task(self._boundary_loop()))
+            source = "таймер на межах таймфрейму"
+        workers = max(1, Config.MAX_CONCURRENT_ASSETS)
+        self._tasks.extend(asyncio.create_task(self._worker()) for _ in range(workers))
+        logger.info(f"🎯 Тригери {list(self.triggers)}: {source}, кулдаун {self.cooldown:.0f} сек, "
+                    f"ліміт {self.bucket.rate * 60:.1f}/хв")
+        return self
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    def on_candle_close(self, asset, timeframe, candle):
+        """Обробник закриття свічки (синхронний, з обробника кадрів websocket)"""
+        if timeframe != self.timeframe or asset in self._queued:
+            return
+        self._queued.add(asset)
+        self.queue.put_nowait((asset, time.monotonic()))
+
+    async def _boundary_loop(self):
+        """Без потоку: усі активи в чергу одразу після кожної межі таймфрейму"""
+        while True:
+            now = time.time()
+            await asyncio.sleep((now // self.timeframe + 1) * self.timeframe - now + 1)
+            for asset in Config.ASSETS:
+                self.on_candle_close(asset, self.timeframe, None)
+
+    async def _worker(self):
+        while True:
+            asset, closed_at = await self.queue.get()
+            self._queued.discard(asset)
+            try:
+                await self._evaluate(asset, closed_at)
+            except Exception as e:
+                logger.error(f"❌ Помилка тригерів для {asset}: {e}")
+
+    async def _evaluate(self, asset, closed_at):
+        candles = await self.generator.pocket_client.get_candles(asset, self.timeframe, 50)
+        if not candles or len(candles) < 30:
+            return
+        candles = list(candles)
+        self.stats['evaluated'] += 1
+        indicators = IndicatorEngine.compute_batch({'current': candles, 'previous': candles[:-1]})
+        context = {
+            'candles': candles,
+            'indicators': indicators['current'],
+            'previous': indicators['previous']
+        }
+
+        hits = []
+        for name, trigger in self.triggers.items():
+            try:
+                if trigger(context):
+                    hits.append(name)
+            except (KeyError, TypeError, ZeroDivisionError):
+                continue
+        if not hits:
+            return
+
+        now = time.monotonic()
+        last = self._last_fired.get(asset)
+        # Власний кулдаун спрацювань + спільний з плановим циклом кулдаун сигналів
+        if (last is not None and now - last < self.cooldown) or self.generator.in_cooldown(asset, now, self.cooldown):
+            self.stats['cooldown'] += 1
+            metrics.inc('triggers_suppressed_total', reason='cooldown')
+            return
+        if not self.bucket.try_acquire(now):
+            self.stats['rate_limited'] += 1
+            metrics.inc('triggers_suppressed_total', reason='rate_limit')
+            logger.info(f"🚦 {asset}: тригер {', '.join(hits)} відкладено - глобальний ліміт")
+            return
+
+        self._last_fired[asset] = now
+        self.stats['fired'] += 1
+        for name in hits:
+            metrics.inc('triggers_fired_total', trigger=name)
+        logger.info(f"🎯 {asset}: спрацювали тригери {', '.join(hits)}, позачергова генерація")
+        signal = await self.generator.generate_for_trigger(asset, hits)
+        metrics.observe('trigger_to_signal_seconds', time.monotonic() - closed_at)
+        if signal:
+            self.stats['signals'] += 1
+
+    # Тригери: отримують {'candles', 'indicators', 'previous'}
+    @staticmethod
+    def _trigger_ema_cross(ctx):
+        """EMA9 перетнула EMA21 на цій свічці"""
+        current, previous = ctx['indicators'], ctx['previous']
+        return (current['ema_9'] > current['ema_21']) != (previous['ema_9'] > previous['ema_21'])
+
+    @staticmethod
+    def _trigger_macd_cross(ctx):
+        """Гістограма MACD змінила знак"""
+        return (ctx['indicators']['macd_hist'] > 0) != (ctx['previous']['macd_hist'] > 0)
+
+    def _trigger_volatility_breakout(self, ctx):
+        """Волатильність останніх 10 свічок у TRIGGER_VOLATILITY_RATIO разів вища за попередні 10"""
+        calculate = self.generator.analyzer.calculate_volatility
+        current = calculate(ctx['candles'])
+        previous = calculate(ctx['candles'][:-10])
+        return current >= Config.SCREENER_VOLATILITY_MIN and current >= previous * Config.TRIGGER_VOLATILITY_RATIO
+
+    def _trigger_pattern_match(self, ctx):
+        """Схожі ситуації з пам'яті шаблонів мають виразний напрямок"""
+        memory = getattr(self.generator.analyzer, 'pattern_memory', None)
+        if memory is None:
+            return False
+        result = memory.query(ctx['candles'])
+        if not result or result['count'] < Config.PATTERN_MIN_SAMPLES:
+            return False
+        return abs(result['up_probability'] - 50) >= Config.TRIGGER_PATTERN_EDGE
+
+    def log_summary(self):
+        stats = self.stats
+        logger.info(f"🎯 Тригери: оцінено {stats['evaluated']}, спрацювало {stats['fired']}, сигналів {stats['signals']}, "
+                    f"кулдаун {stats['cooldown']}, ліміт {stats['rate_limited']}")
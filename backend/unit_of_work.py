@@ -0,0 +1,138 @@
+import hashlib
+import json
+import logging
+import os
+import threading
+
+logger = logging.getLogger("signal_bot")
+
+
+def dump_json(data, indent=2):
+    return json.dumps(data, indent=indent, ensure_ascii=False, default=str).encode('utf-8')
+
+
+def atomic_write(path, content):
+    """Запис через тимчасовий файл у тій самій теці: fsync і rename.
+
+    Читач (деплой Pages, дашборд) бачить або старий, або новий файл повністю.
+    """
+    path = str(path)
+    directory = os.path.dirname(path) or '.'
+    os.makedirs(directory, exist_ok=True)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'wb') as f:
+        f.write(content)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+    try:
+        dir_fd = os.open(directory, os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(dir_fd)
+    except OSError:
+        pass
+    finally:
+        os.close(dir_fd)
+
+
+class UnitOfWork:
+    """Відкладений запис JSON-файлів одного запуску.
+
+    Зміни накопичуються в пам'яті (read() бачить уже підготовлені дані),
+    а flush() записує кожен файл не більше одного разу. Файл, вміст якого
+    збігається з прочитаним з диска (за SHA-256), не перезаписується, тож
+    запуск без змін не торкається диска і не створює коміту.
+
+        with uow:
+            uow.stage(path, data)
+            ...
+        # тут - один атомарний запис на файл
+    """
+
+    def __init__(self):
+        self._staged = {}
+        self._hashes = {}
+        self._depth = 0
+        self._lock = threading.RLock()
+        self.stats = {'flushed': 0, 'skipped': 0}
+
+    @staticmethod
+    def _digest(content):
+        return hashlib.sha256(content).hexdigest()
+
+    def read(self, path, default):
+        """Дані файлу з урахуванням ще не записаних змін"""
+        path = str(path)
+        with self._lock:
+            if path in self._staged:
+                return json.loads(self._staged[path])
+            if not os.path.exists(path):
+                return default
+            with open(path, 'rb') as f:
+                content = f.read()
+            self._remember(path, self._digest(content))
+            data = json.loads(content)
+        return data if isinstance(data, type(default)) else default
+
+    def stage(self, path, data, indent=2):
+        """Підготовка нового вмісту файлу. Поза `with uow:` записується одразу"""
+        with self._lock:
+            self._staged[str(path)] = dump_json(data, indent)
+            if self._depth == 0:
+                self.flush()
+
+    def __enter__(self):
+        with self._lock:
+            self._depth += 1
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        with self._lock:
+            self._depth -= 1
+            if self._depth == 0:
+                # Навіть після помилки записуємо вже узгоджені зміни,
+                # як це робили прямі записи до появи UnitOfWork
+                self.flush()
+        return False
+
+    def _remember(self, path, digest):
+        stat = os.stat(path)
+        self._hashes[path] = (digest, stat.st_mtime_ns, stat.st_size)
+
+    def _current_hash(self, path):
+        """Хеш вмісту на диску; повторно читається лише якщо файл змінив хтось інший"""
+        try:
+            stat = os.stat(path)
+        except FileNotFoundError:
+            return None
+        cached = self._hashes.get(path)
+        if cached and cached[1:] == (stat.st_mtime_ns, stat.st_size):
+            return cached[0]
+        with open(path, 'rb') as f:
+            digest = self._digest(f.read())
+        self._hashes[path] = (digest, stat.st_mtime_ns, stat.st_size)
+        return digest
+
+    def flush(self):
+        """Атомарний запис змінених файлів, повертає кількість записаних"""
+        with self._lock:
+            staged, self._staged = self._staged, {}
+            written = 0
+            for path, content in staged.items():
+                digest = self._digest(content)
+                if digest == self._current_hash(path):
+                    self.stats['skipped'] += 1
+                    continue
+                try:
+                    atomic_write(path, content)
+                except Exception as e:
+                    logger.error(f"❌ Не вдалося записати {path}: {e}")
+                    continue
+                self._remember(path, digest)
+                self.stats['flushed'] += 1
+                written += 1
+            if staged:
+                logger.debug(f"💾 Запис стану: {written} з {len(staged)} файлів змінено")
+            return written
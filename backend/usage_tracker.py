@@ -0,0 +1,163 @@
+import json
+import logging
+import os
+from contextlib import contextmanager
+from contextvars import ContextVar
+from config import Config
+from metrics import metrics
+from unit_of_work import atomic_write, dump_json
+
+logger = logging.getLogger("signal_bot")
+
+# Облік поточного запуску (цикл чи тригер), свій для кожної задачі asyncio
+_current_run = ContextVar('usage_run', default=None)
+
+
+class UsageTracker:
+    """Облік токенів, затримки та вартості викликів Groq по активах і запусках"""
+
+    def __init__(self, usage_file=None):
+        self.usage_file = usage_file or Config.USAGE_FILE
+        self.last_runs = {}  # джерело -> підсумок останнього завершеного запуску
+        self.reset_run()
+
+    @staticmethod
+    def _empty_totals():
+        return {
+            'calls': 0,
+            'cache_hits': 0,
+            'prompt_tokens': 0,
+            'completion_tokens': 0,
+            'total_tokens': 0,
+            'latency': 0.0,
+            'signals': 0
+        }
+
+    @classmethod
+    def _new_run(cls, source):
+        return {'source': source, 'run': cls._empty_totals(), 'by_asset': {}}
+
+    def reset_run(self):
+        """Облік поза scope() (бектест) починається заново"""
+        self._default_run = self._new_run('run')
+
+    @contextmanager
+    def scope(self, source):
+        """Окремий облік запуску: цикл і позачергові тригери демона не змішуються і не обнуляють один одного"""
+        state = self._new_run(source)
+        token = _current_run.set(state)
+        try:
+            yield state
+        finally:
+            _current_run.reset(token)
+            self.last_runs[source] = self.summary(state)
+
+    @property
+    def _state(self):
+        return _current_run.get() or self._default_run
+
+    @property
+    def run(self):
+        return self._state['run']
+
+    @property
+    def by_asset(self):
+        return self._state['by_asset']
+
+    def _asset(self, asset):
+        if asset not in self.by_asset:
+            self.by_asset[asset] = self._empty_totals()
+        return self.by_asset[asset]
+
+    def record(self, assets, usage, latency):
+        """Облік одного виклику. Для пакетного виклику токени діляться між активами порівну"""
+        prompt_tokens = getattr(usage, 'prompt_tokens', 0) or 0
+        completion_tokens = getattr(usage, 'completion_tokens', 0) or 0
+        total_tokens = getattr(usage, 'total_tokens', 0) or prompt_tokens + completion_tokens
+
+        self.run['calls'] += 1
+        self.run['prompt_tokens'] += prompt_tokens
+        self.run['completion_tokens'] += completion_tokens
+        self.run['total_tokens'] += total_tokens
+        self.run['latency'] += latency
+        metrics.inc('groq_calls_total')
+        metrics.inc('groq_tokens_total', prompt_tokens, kind='prompt')
+        metrics.inc('groq_tokens_total', completion_tokens, kind='completion')
+
+        share = 1 / len(assets) if assets else 0
+        for asset in assets:
+            totals = self._asset(asset)
+            totals['calls'] += share
+            totals['prompt_tokens'] += prompt_tokens * share
+            totals['completion_tokens'] += completion_tokens * share
+            totals['total_tokens'] += total_tokens * share
+            totals['latency'] += latency * share
+
+        logger.debug(f"🔢 Токени {', '.join(assets)}: {prompt_tokens} + {completion_tokens}, {latency:.2f} сек")
+
+    def record_cache_hit(self, asset):
+        self.run['cache_hits'] += 1
+        metrics.inc('groq_cache_hits_total')
+        self._asset(asset)['cache_hits'] += 1
+
+    def record_signal(self, asset):
+        self.run['signals'] += 1
+        metrics.inc('signals_total', asset=asset)
+        self._asset(asset)['signals'] += 1
+
+    @staticmethod
+    def cost(totals):
+        """Вартість у USD за цінами GROQ_PRICE_*_PER_M"""
+        return (totals['prompt_tokens'] * Config.GROQ_PRICE_INPUT_PER_M +
+                totals['completion_tokens'] * Config.GROQ_PRICE_OUTPUT_PER_M) / 1_000_000
+
+    @staticmethod
+    def _with_derived(totals):
+        result = {key: round(value, 4) if isinstance(value, float) else value for key, value in totals.items()}
+        result['cost_usd'] = round(UsageTracker.cost(totals), 6)
+        signals = totals['signals']
+        result['tokens_per_signal'] = round(totals['total_tokens'] / signals, 1) if signals else None
+        result['latency_per_signal'] = round(totals['latency'] / signals, 3) if signals else None
+        result['cost_per_signal'] = round(result['cost_usd'] / signals, 6) if signals else None
+        return result
+
+    def summary(self, state=None):
+        state = state or self._state
+        return {
+            'source': state['source'],
+            'run': self._with_derived(state['run']),
+            'by_asset': {asset: self._with_derived(totals) for asset, totals in state['by_asset'].items()}
+        }
+
+    def log_summary(self):
+        run = self._with_derived(self.run)
+        logger.info(f"🔢 Використання Groq: {run['calls']} викликів, {run['cache_hits']} з кешу, "
+                    f"{run['prompt_tokens']} + {run['completion_tokens']} токенів, "
+                    f"{run['latency']:.2f} сек, ${run['cost_usd']:.5f}")
+        if run['signals']:
+            logger.info(f"   На сигнал: {run['tokens_per_signal']} токенів, "
+                        f"{run['latency_per_signal']:.2f} сек, ${run['cost_per_signal']:.5f}")
+
+    def save(self):
+        """Накопичення статистики по активах у USAGE_FILE та збереження підсумку запуску (за джерелом)"""
+        try:
+            data = {'totals': self._empty_totals(), 'by_asset': {}, 'last_runs': {}}
+            if os.path.exists(self.usage_file):
+                with open(self.usage_file, 'r', encoding='utf-8') as f:
+                    data.update(json.load(f))
+
+            for key, value in self.run.items():
+                data['totals'][key] = data['totals'].get(key, 0) + value
+            for asset, totals in self.by_asset.items():
+                stored = data['by_asset'].setdefault(asset, self._empty_totals())
+                for key, value in totals.items():
+                    stored[key] = stored.get(key, 0) + value
+
+            data['totals'] = self._with_derived(data['totals'])
+            data['by_asset'] = {asset: self._with_derived(totals) for asset, totals in data['by_asset'].items()}
+            data.pop('last_run', None)
+            data['last_runs'] = {**data.get('last_runs', {}), self._state['source']: self.summary()['run']}
+
+            atomic_write(self.usage_file, dump_json(data))
+        except Exception as e:
+            logger.warning(f"⚠️ Не вдалося зберегти статистику використання: {e}")
@@ -0,0 +1,140 @@
+"""
+Мікробенчмарк: векторизований IndicatorEngine проти поточних циклів Python.
+
+Запуск:
+    python benchmarks/bench_indicators.py --assets 50 --candles 50 --repeat 20
+"""
+import argparse
+import random
+import sys
+import time
+from collections import namedtuple
+from pathlib import Path
+
+BASE_DIR = Path(__file__).parent.parent
+sys.path.insert(0, str(BASE_DIR))
+sys.path.insert(0, str(BASE_DIR / 'backend'))
+
+from utils.helpers import Helpers
+from utils.indicators import IndicatorEngine
+
+Candle = namedtuple('Candle', ['timestamp', 'open', 'high', 'low', 'close'])
+
+
+def make_candles(count, base_price, rng):
+    candles = []
+    price = base_price
+    for i in range(count):
+        open_price = price
+        close_price = open_price * (1 + rng.gauss(0, 0.0005))
+        high_price = max(open_price, close_price) * (1 + abs(rng.gauss(0, 0.0002)))
+        low_price = min(open_price, close_price) * (1 - abs(rng.gauss(0, 0.0002)))
+        candles.append(Candle(i * 60, open_price, high_price, low_price, close_price))
+        price = close_price
+    return candles
+
+
+def current_python(candles):
+    """Поточний код: Helpers.calculate_indicators + GroqAnalyzer.calculate_volatility"""
+    result = Helpers.calculate_indicators(candles)
+    closes = [c.close for c in candles[-10:]]
+    avg_price = sum(closes) / len(closes)
+    result['volatility_pct'] = round((max(closes) - min(closes)) / avg_price * 100, 4)
+    return result
+
+
+def full_python(candles):
+    """Повний набір індикаторів циклами по свічках (еталон для порівняння)"""
+    closes = [c.close for c in candles]
+
+    def ema(values, period):
+        alpha = 2 / (period + 1)
+        out = [values[0]]
+        for value in values[1:]:
+            out.append(alpha * value + (1 - alpha) * out[-1])
+        return out
+
+    def wilder(values, period):
+        value_ema = values[0]
+        for value in values[1:]:
+            value_ema = value / period + (1 - 1 / period) * value_ema
+        return value_ema
+
+    deltas = [closes[i + 1] - closes[i] for i in range(len(closes) - 1)]
+    avg_gain = wilder([max(d, 0) for d in deltas], 14)
+    avg_loss = wilder([max(-d, 0) for d in deltas], 14)
+    rsi = 100 - 100 / (1 + avg_gain / avg_loss) if avg_loss else 100.0
+
+    macd_line = [f - s for f, s in zip(ema(closes, 12), ema(closes, 26))]
+    signal_line = ema(macd_line, 9)
+
+    window = closes[-20:]
+    middle = sum(window) / 20
+    std = (sum((x - middle) ** 2 for x in window) / 20) ** 0.5
+
+    highest = max(c.high for c in candles[-14:])
+    lowest = min(c.low for c in candles[-14:])
+    stoch_k = (closes[-1] - lowest) / (highest - lowest) * 100 if highest > lowest else 50.0
+
+    true_ranges = []
+    for prev, cur in zip(candles, candles[1:]):
+        true_ranges.append(max(cur.high - cur.low, abs(cur.high - prev.close), abs(cur.low - prev.close)))
+
+    return {
+        'rsi': rsi,
+        'macd': macd_line[-1],
+        'macd_signal': signal_line[-1],
+        'bb_upper': middle + 2 * std,
+        'bb_lower': middle - 2 * std,
+        'ema_9': ema(closes, 9)[-1],
+        'ema_21': ema(closes, 21)[-1],
+        'stoch_k': stoch_k,
+        'atr': wilder(true_ranges, 14)
+    }
+
+
+def timeit(func, repeat):
+    best = float('inf')
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - started)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Бенчмарк індикаторів")
+    parser.add_argument('--assets', type=int, default=50)
+    parser.add_argument('--candles', type=int, default=50)
+    parser.add_argument('--repeat', type=int, default=20)
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    data = {
+        f"ASSET{i}_otc": make_candles(args.candles, rng.choice([1.08, 1.27, 150.0, 190.0]), rng)
+        for i in range(args.assets)
+    }
+
+    timings = {
+        'current_python (SMA5/10 + volatility)': timeit(
+            lambda: [current_python(c) for c in data.values()], args.repeat),
+        'full_python (RSI/MACD/BB/EMA/Stoch/ATR)': timeit(
+            lambda: [full_python(c) for c in data.values()], args.repeat),
+        'IndicatorEngine.compute_batch': timeit(
+            lambda: IndicatorEngine.compute_batch(data), args.repeat),
+    }
+
+    # Окремо: лише векторний прохід без перетворення свічок у масиви
+    _, open_, high, low, close = IndicatorEngine.to_arrays(data)
+    timings['IndicatorEngine.compute (arrays ready)'] = timeit(
+        lambda: IndicatorEngine.compute(open_, high, low, close), args.repeat)
+
+    print(f"Активів: {args.assets}, свічок: {args.candles}, повторів: {args.repeat} (найкращий час)")
+    baseline = timings['full_python (RSI/MACD/BB/EMA/Stoch/ATR)']
+    for name, seconds in timings.items():
+        print(f"  {name:<42} {seconds * 1000:9.3f} ms  x{baseline / seconds:6.1f}")
+
+
+if __name__ == "__main__":
+    main()
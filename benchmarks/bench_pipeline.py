@@ -0,0 +1,260 @@
+"""
+Наскрізний бенчмарк SignalGenerator.generate_all_signals без мережі.
+
+Свічки - з MarketSimulator, аналізатор - справжній GroqAnalyzer проти локальної заглушки
+(benchmarks/groq_stub.py) через GROQ_BASE_URL, DataHandler - справжній у тимчасовій теці.
+Перебирає комбінації кількості активів, паралельності та розміру історії; кожна комбінація
+виконується в окремому процесі, тож пікова RSS - саме її. Звіт: p50/p95/p99 кожного етапу
+(candles, indicators, screener, resample, analyze, finalize, save) і всього запуску, пропускна
+здатність, пікова RSS, кількість запитів до AI. Результати - JSON для порівняння між комітами.
+
+Запуск:
+    python benchmarks/bench_pipeline.py --assets 3,30,100 --concurrency 1,5,20 --history 0,10000
+    python benchmarks/bench_pipeline.py --assets 50 --batch 10 --latency-ms 600 --storage sqlite
+"""
+import argparse
+import asyncio
+import contextlib
+import io
+import itertools
+import json
+import logging
+import os
+import platform
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import timedelta
+from multiprocessing import get_context
+from pathlib import Path
+
+import numpy as np
+
+BASE_DIR = Path(__file__).parent.parent
+sys.path.insert(0, str(BASE_DIR))
+sys.path.insert(0, str(BASE_DIR / 'backend'))
+sys.path.insert(0, str(BASE_DIR / 'benchmarks'))
+
+from groq_stub import GroqStub
+
+CURRENCIES = ['EUR', 'USD', 'GBP', 'JPY', 'AUD', 'CAD', 'CHF', 'NZD', 'SEK', 'NOK', 'SGD', 'HKD']
+
+
+def asset_names(count):
+    """Назви активів у форматі бота: спершу OTC, потім без суфікса"""
+    pairs = [a + b for a, b in itertools.permutations(CURRENCIES, 2)]
+    names = [f"{pair}_otc" for pair in pairs] + pairs
+    if count > len(names):
+        raise ValueError(f"Не більше {len(names)} активів")
+    return names[:count]
+
+
+def percentiles(values):
+    if not values:
+        return None
+    data = np.array(values) * 1000
+    return {
+        'calls': len(values),
+        'mean': round(float(data.mean()), 3),
+        'p50': round(float(np.percentile(data, 50)), 3),
+        'p95': round(float(np.percentile(data, 95)), 3),
+        'p99': round(float(np.percentile(data, 99)), 3)
+    }
+
+
+class SimulatedCandleSource:
+    """Замінник PocketOptionClient: свічки MarketSimulator, що закінчуються поточним часом"""
+
+    client = True
+
+    def __init__(self, simulator):
+        self.simulator = simulator
+
+    async def connect(self):
+        return True
+
+    async def ensure_connected(self):
+        return True
+
+    async def disconnect(self):
+        pass
+
+    async def get_candles(self, asset, timeframe, count=50):
+        from config import Config
+        return self.simulator.candles(asset, count, end=Config.get_kyiv_time())
+
+
+def _redirect_data(config, data_dir):
+    """Усі файли data/ і cache/ - у тимчасову теку"""
+    for root_name in ('DATA_DIR', 'CACHE_DIR'):
+        root = getattr(config, root_name)
+        for name in dir(config):
+            value = getattr(config, name)
+            if isinstance(value, Path) and name != root_name and str(value).startswith(str(root)):
+                setattr(config, name, data_dir / root_name.lower() / value.relative_to(root))
+        setattr(config, root_name, data_dir / root_name.lower())
+
+
+def _prefill_history(data_handler, size, assets):
+    """Історія заданого розміру до початку вимірювань"""
+    from config import Config
+    now = Config.get_kyiv_time()
+    chunk = 5000
+    for offset in range(0, size, chunk):
+        entries = []
+        for i in range(offset, min(size, offset + chunk)):
+            moment = now - timedelta(minutes=10 * (size - i))
+            asset = assets[i % len(assets)]
+            entries.append({
+                'id': f"{asset}_{moment.strftime('%Y%m%d%H%M%S')}",
+                'history_id': f"{asset}_{moment.strftime('%Y%m%d%H%M%S')}_{i}",
+                'asset': asset, 'direction': 'UP' if i % 2 else 'DOWN', 'confidence': 0.8,
+                'duration': 2, 'generated_at': moment.isoformat(), 'saved_at': moment.isoformat(),
+                'status': 'saved'
+            })
+        data_handler.storage.append_history(entries)
+    # JSON-сховище ущільнює журнал у фоні - вимірювання не повинні з ним перетинатися
+    if hasattr(data_handler.storage, 'history'):
+        data_handler.storage.history.wait()
+
+
+def run_case(case):
+    """Одна комбінація параметрів в окремому процесі"""
+    from config import Config
+
+    data_dir = Path(tempfile.mkdtemp(prefix='bench_pipeline_'))
+    _redirect_data(Config, data_dir)
+    assets = asset_names(case['assets'])
+    Config.ASSETS = assets
+    Config.MAX_ASSETS_PER_RUN = len(assets)
+    Config.MAX_CONCURRENT_ASSETS = case['concurrency']
+    Config.GROQ_MAX_IN_FLIGHT = case['concurrency']
+    Config.GROQ_BATCH_SIZE = case['batch']
+    Config.GROQ_API_KEY = 'stub'
+    Config.GROQ_BASE_URL = case['groq_url']
+    Config.GROQ_CACHE_ENABLED = False
+    Config.SCREENER_ENABLED = case['screener']
+    Config.STORAGE_BACKEND = case['storage']
+    Config.CONCURRENT_GENERATION = True
+
+    logging.getLogger("signal_bot").setLevel(logging.ERROR)
+    from data_handler import DataHandler
+    from groq_analyzer import GroqAnalyzer
+    from market_simulator import MarketSimulator
+    from signal_generator import SignalGenerator
+
+    # DataHandler пише звіти через print - у звіт бенчмарку вони не потрапляють
+    with contextlib.redirect_stdout(io.StringIO()):
+        data_handler = DataHandler()
+        _prefill_history(data_handler, case['history'], assets)
+        generator = SignalGenerator(
+            pocket_client=SimulatedCandleSource(MarketSimulator(seed=case['seed'], timeframe=Config.TIMEFRAMES)),
+            analyzer=GroqAnalyzer(),
+            data_handler=data_handler
+        )
+
+        async def runs():
+            # Перший запуск - прогрів (імпорти, з'єднання HTTP), у статистику не входить
+            await generator.generate_all_signals(keep_connection=True)
+            generator.stage_samples = {}
+            durations, signals, calls = [], 0, 0
+            for _ in range(case['runs']):
+                started = time.perf_counter()
+                signals += len(await generator.generate_all_signals(keep_connection=True))
+                durations.append(time.perf_counter() - started)
+                calls += generator.analyzer.usage.last_runs['cycle']['run']['calls']
+            return durations, signals, calls
+
+        durations, signals, calls = asyncio.run(runs())
+        data_handler.close()
+
+    total = sum(durations)
+    return {
+        **{key: case[key] for key in ('assets', 'concurrency', 'history', 'batch', 'storage', 'screener', 'runs')},
+        'run_ms': percentiles(durations),
+        'stages_ms': {name: percentiles(samples) for name, samples in generator.stage_samples.items()},
+        'assets_per_second': round(case['assets'] * case['runs'] / total, 2) if total else None,
+        'signals': signals,
+        'groq_calls': calls,
+        'peak_rss_mb': round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1)
+    }
+
+
+def _git_revision():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=BASE_DIR, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except Exception:
+        return None
+
+
+def _ints(value):
+    return [int(item) for item in value.split(',') if item.strip()]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Наскрізний бенчмарк генерації сигналів")
+    parser.add_argument('--assets', default='3,10,30', help="кількості активів через кому")
+    parser.add_argument('--concurrency', default='1,3,10', help="MAX_CONCURRENT_ASSETS через кому")
+    parser.add_argument('--history', default='0,10000', help="записів історії до початку")
+    parser.add_argument('--batch', default='0', help="GROQ_BATCH_SIZE через кому")
+    parser.add_argument('--storage', default='json', help="json,sqlite")
+    parser.add_argument('--runs', type=int, default=5, help="вимірюваних запусків на комбінацію")
+    parser.add_argument('--latency-ms', type=float, default=300.0, help="затримка заглушки Groq")
+    parser.add_argument('--jitter-ms', type=float, default=100.0)
+    parser.add_argument('--screener', action='store_true', help="увімкнути скринер")
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--output', default='pipeline_bench.json')
+    args = parser.parse_args()
+
+    stub = GroqStub(port=0, latency_ms=args.latency_ms, jitter_ms=args.jitter_ms, seed=args.seed).start_in_thread()
+    cases = [
+        {
+            'assets': assets, 'concurrency': concurrency, 'history': history, 'batch': batch, 'storage': storage,
+            'runs': args.runs, 'screener': args.screener, 'seed': args.seed, 'groq_url': stub.url
+        }
+        for assets, concurrency, history, batch, storage in itertools.product(
+            _ints(args.assets), _ints(args.concurrency), _ints(args.history), _ints(args.batch),
+            [item.strip() for item in args.storage.split(',') if item.strip()]
+        )
+    ]
+
+    results = []
+    print(f"{'активів':>8} {'паралельно':>10} {'історія':>8} {'пакет':>5} {'сховище':>8} "
+          f"{'run p50':>9} {'p95':>9} {'p99':>9} {'акт/сек':>8} {'RSS МБ':>7}")
+    try:
+        for case in cases:
+            # Свіжий процес на кожну комбінацію: чиста пікова RSS і кеші
+            with ProcessPoolExecutor(max_workers=1, mp_context=get_context('spawn')) as pool:
+                result = pool.submit(run_case, case).result()
+            results.append(result)
+            run = result['run_ms'] or {}
+            print(f"{result['assets']:>8} {result['concurrency']:>10} {result['history']:>8} {result['batch']:>5} "
+                  f"{result['storage']:>8} {run.get('p50', 0):>9.1f} {run.get('p95', 0):>9.1f} "
+                  f"{run.get('p99', 0):>9.1f} {result['assets_per_second']:>8} {result['peak_rss_mb']:>7}")
+    finally:
+        stub.stop_thread()
+
+    report = {
+        'meta': {
+            'git': _git_revision(),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'cpus': os.cpu_count(),
+            'created_at': time.strftime('%Y-%m-%dT%H:%M:%S'),
+            'groq_latency_ms': args.latency_ms,
+            'groq_jitter_ms': args.jitter_ms,
+            'groq_requests': stub.stats['requests']
+        },
+        'results': results
+    }
+    with open(args.output, 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2, ensure_ascii=False)
+    print(f"💾 Результати: {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,134 @@
+"""
+Навантажувальний тест PocketOptionClient проти локальної заглушки (benchmarks/pocket_stub.py).
+
+Піднімає заглушку в тому ж процесі, під'єднує --clients клієнтів і кожним робить --rounds
+проходів get_candles по --assets активах. З --sessions N кожен клієнт - пул PocketOptionPool
+з N сесій (активи шардуються між з'єднаннями). Звіт: час підключення, затримки запиту свічок
+(p50/p95/p99), помилки, виявлені нульові свічки, статистика сервера.
+
+Запуск:
+    python benchmarks/bench_pocket_client.py --clients 2 --assets 100 --rounds 3 --latency-ms 30 --jitter-ms 10
+    python benchmarks/bench_pocket_client.py --assets 20 --zero-prices 0.1 --disconnect 0.02
+    python benchmarks/bench_pocket_client.py --assets 100 --sessions 4 --latency-ms 30
+"""
+import argparse
+import asyncio
+import json
+import logging
+import os
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+BASE_DIR = Path(__file__).parent.parent
+sys.path.insert(0, str(BASE_DIR))
+sys.path.insert(0, str(BASE_DIR / 'backend'))
+sys.path.insert(0, str(BASE_DIR / 'benchmarks'))
+
+os.environ.setdefault('POCKET_SSID', '42["auth",{"session":"stub-session","isDemo":1,"uid":1,"platform":1}]')
+
+from config import Config
+from pocket_client import PocketOptionClient
+from pocket_pool import PocketOptionPool
+from pocket_stub import FaultProfile, MarketFeed, PocketOptionStub
+
+
+def percentiles(values):
+    if not values:
+        return {}
+    data = np.array(values) * 1000
+    return {name: round(float(np.percentile(data, q)), 2) for name, q in (('p50', 50), ('p95', 95), ('p99', 99))}
+
+
+async def run_client(index, assets, args, results):
+    client = PocketOptionPool(sessions_per_ssid=args.sessions) if args.sessions > 1 else PocketOptionClient()
+    started = time.perf_counter()
+    connected = await client.connect()
+    results['connect'].append(time.perf_counter() - started)
+    if not connected:
+        results['connect_failures'] += 1
+        return
+
+    semaphore = asyncio.Semaphore(args.concurrency)
+
+    async def fetch(asset):
+        async with semaphore:
+            started = time.perf_counter()
+            candles = await client.get_candles(asset, Config.TIMEFRAMES, 50)
+            results['latency'].append(time.perf_counter() - started)
+            if candles is None:
+                results['empty'] += 1
+            else:
+                results['candles'] += len(candles)
+
+    for _ in range(args.rounds):
+        await asyncio.gather(*(fetch(asset) for asset in assets))
+    await client.disconnect()
+
+
+async def main_async(args):
+    from pocketoptionapi_async.constants import ASSETS
+
+    faults = FaultProfile(args.latency_ms, args.jitter_ms, args.loss, args.disconnect, args.zero_prices, seed=args.seed)
+    stub = await PocketOptionStub(port=0, faults=faults, feed=MarketFeed(args.seed), tick_interval=0).start()
+    Config.POCKET_WS_URL = stub.url
+    # Без демо-підміни: збої мають бути видно як порожні відповіді
+    Config.POCKET_DEMO = False
+
+    # Бібліотека приймає лише відомі їй активи; спершу OTC
+    known = sorted(ASSETS, key=lambda asset: (not asset.endswith('_otc'), asset))
+    assets = known[:args.assets]
+    results = {'connect': [], 'latency': [], 'connect_failures': 0, 'empty': 0, 'candles': 0}
+
+    started = time.perf_counter()
+    await asyncio.gather(*(run_client(i, assets, args, results) for i in range(args.clients)))
+    wall = time.perf_counter() - started
+    await stub.stop()
+
+    requests = len(results['latency'])
+    report = {
+        'clients': args.clients,
+        'sessions': args.sessions,
+        'assets': len(assets),
+        'requests': requests,
+        'empty_responses': results['empty'],
+        'connect_failures': results['connect_failures'],
+        'candles_received': results['candles'],
+        'connect_ms': percentiles(results['connect']),
+        'get_candles_ms': percentiles(results['latency']),
+        'requests_per_second': round(requests / wall, 1) if wall else None,
+        'wall_time': round(wall, 2),
+        'server': stub.stats
+    }
+    print(json.dumps(report, indent=2, ensure_ascii=False))
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2, ensure_ascii=False)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Навантажувальний тест клієнта PocketOption")
+    parser.add_argument('--clients', type=int, default=1)
+    parser.add_argument('--assets', type=int, default=50)
+    parser.add_argument('--rounds', type=int, default=3)
+    parser.add_argument('--concurrency', type=int, default=20, help="одночасних запитів на клієнта")
+    parser.add_argument('--sessions', type=int, default=1, help="сесій у пулі на клієнта (1 - без пулу)")
+    parser.add_argument('--latency-ms', type=float, default=0.0)
+    parser.add_argument('--jitter-ms', type=float, default=0.0)
+    parser.add_argument('--loss', type=float, default=0.0)
+    parser.add_argument('--disconnect', type=float, default=0.0)
+    parser.add_argument('--zero-prices', type=float, default=0.0)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--output', help="JSON-файл для звіту")
+    parser.add_argument('--log-level', default='ERROR')
+    args = parser.parse_args()
+
+    logging.basicConfig(level=args.log_level.upper(), format='%(message)s')
+    logging.getLogger("signal_bot").setLevel(args.log_level.upper())
+    asyncio.run(main_async(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+"""
+Мікробенчмарк: MarketSimulator (масиви та потік чанків) проти старого циклу _get_mock_candles.
+
+Запуск:
+    python benchmarks/bench_simulator.py --candles 1000000 --chunk 100000 --repeat 5
+"""
+import argparse
+import random
+import sys
+import time
+from collections import namedtuple
+from datetime import datetime, timedelta
+from pathlib import Path
+
+BASE_DIR = Path(__file__).parent.parent
+sys.path.insert(0, str(BASE_DIR))
+sys.path.insert(0, str(BASE_DIR / 'backend'))
+
+from market_simulator import MarketSimulator
+
+
+def legacy_mock(count):
+    """Колишній _get_mock_candles: цикл Python з глобальним random"""
+    Candle = namedtuple('Candle', ['timestamp', 'open', 'high', 'low', 'close'])
+    now = datetime.now()
+    candles = []
+    base_price = 150.0
+    for i in range(count):
+        timestamp = now - timedelta(minutes=2 * (count - i))
+        change = random.uniform(-0.5, 0.5)
+        open_price = base_price + random.uniform(-1, 1)
+        close_price = open_price + change
+        high_price = max(open_price, close_price) + random.uniform(0, 0.3)
+        low_price = min(open_price, close_price) - random.uniform(0, 0.3)
+        candles.append(Candle(timestamp, round(open_price, 5), round(high_price, 5),
+                              round(low_price, 5), round(close_price, 5)))
+        base_price = close_price
+    return candles
+
+
+def timeit(func, repeat):
+    best = float('inf')
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - started)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Бенчмарк синтетичного ринку")
+    parser.add_argument('--candles', type=int, default=1_000_000)
+    parser.add_argument('--chunk', type=int, default=100_000)
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+
+    legacy_count = min(args.candles, 100_000)
+
+    def stream():
+        simulator = MarketSimulator(seed=args.seed)
+        for _ in simulator.stream('EURUSD_otc', args.chunk, chunks=max(1, args.candles // args.chunk)):
+            pass
+
+    timings = {
+        'legacy _get_mock_candles': (legacy_count, timeit(lambda: legacy_mock(legacy_count), args.repeat)),
+        'MarketSimulator.generate (arrays)': (args.candles, timeit(
+            lambda: MarketSimulator(seed=args.seed).generate('EURUSD_otc', args.candles), args.repeat)),
+        'MarketSimulator.stream (chunks)': (max(1, args.candles // args.chunk) * args.chunk,
+                                            timeit(stream, args.repeat)),
+        'MarketSimulator.candles (namedtuple)': (legacy_count, timeit(
+            lambda: MarketSimulator(seed=args.seed).candles('EURUSD_otc', legacy_count), args.repeat)),
+    }
+
+    print(f"Свічок: {args.candles}, чанк: {args.chunk}, повторів: {args.repeat} (найкращий час)")
+    for name, (count, seconds) in timings.items():
+        print(f"  {name:<38} {count:>9} свічок {seconds * 1000:9.1f} ms  {count / seconds / 1e6:7.2f} M/сек")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,163 @@
+"""
+Локальний сервер, сумісний з Groq/OpenAI chat completions, для бенчмарків без мережі.
+
+Відповідає на POST /openai/v1/chat/completions (шлях SDK groq) та /v1/chat/completions
+(OpenAI). Вміст відповіді - JSON сигналу для кожного активу з промпту (пакетний промпт
+отримує {"signals": [...]}) або готовий JSON з файлу --response. Затримка з розкидом і
+частка помилок 500 налаштовуються.
+
+Запуск (аналізатор під'єднується через GROQ_BASE_URL):
+    python benchmarks/groq_stub.py --port 8808 --latency-ms 400 --jitter-ms 150
+    GROQ_BASE_URL=http://127.0.0.1:8808 GROQ_API_KEY=stub python backend/signal_generator.py
+"""
+import argparse
+import asyncio
+import json
+import random
+import re
+import threading
+import time
+import zlib
+
+from aiohttp import web
+
+ASSET_PATTERN = re.compile(r'\b([A-Z]{6}(?:_otc)?)\b')
+
+
+class GroqStub:
+    def __init__(self, host='127.0.0.1', port=8808, latency_ms=0.0, jitter_ms=0.0, error_rate=0.0,
+                 canned=None, confidence=0.82, seed=None):
+        self.host = host
+        self.port = port
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.error_rate = error_rate
+        self.canned = canned
+        self.confidence = confidence
+        self.rng = random.Random(seed)
+        self.stats = {'requests': 0, 'errors': 0, 'prompt_chars': 0}
+        self._runner = None
+        self._thread = None
+        self._loop = None
+
+    @property
+    def url(self):
+        return f"http://{self.host}:{self.port}"
+
+    def _signal(self, asset, prompt):
+        # Напрямок залежить від промпту: однаковий вхід - однакова відповідь
+        digest = zlib.crc32(f"{asset}:{prompt}".encode())
+        return {
+            'asset': asset,
+            'direction': 'UP' if digest % 2 else 'DOWN',
+            'confidence': self.confidence,
+            'entry_time': time.strftime('%H:%M'),
+            'duration': 2 + digest % 2,
+            'reason': 'stub'
+        }
+
+    def _content(self, prompt):
+        if self.canned is not None:
+            return self.canned
+        assets = list(dict.fromkeys(ASSET_PATTERN.findall(prompt))) or ['EURUSD_otc']
+        if '"signals"' in prompt:
+            return json.dumps({'signals': [self._signal(asset, prompt) for asset in assets]})
+        return json.dumps(self._signal(assets[0], prompt))
+
+    async def _completions(self, request):
+        body = await request.json()
+        self.stats['requests'] += 1
+        prompt = body['messages'][-1]['content']
+        self.stats['prompt_chars'] += len(prompt)
+
+        delay = max(0.0, self.latency_ms + self.rng.uniform(-self.jitter_ms, self.jitter_ms)) / 1000
+        if delay:
+            await asyncio.sleep(delay)
+        if self.error_rate and self.rng.random() < self.error_rate:
+            self.stats['errors'] += 1
+            return web.json_response({'error': {'message': 'stub: injected error', 'type': 'server_error'}},
+                                     status=500)
+
+        content = self._content(prompt)
+        prompt_tokens = sum(len(m.get('content', '')) for m in body['messages']) // 4
+        completion_tokens = len(content) // 4
+        return web.json_response({
+            'id': f"chatcmpl-stub-{self.stats['requests']}",
+            'object': 'chat.completion',
+            'created': int(time.time()),
+            'model': body.get('model', 'stub'),
+            'choices': [{
+                'index': 0,
+                'message': {'role': 'assistant', 'content': content},
+                'finish_reason': 'stop'
+            }],
+            'usage': {
+                'prompt_tokens': prompt_tokens,
+                'completion_tokens': completion_tokens,
+                'total_tokens': prompt_tokens + completion_tokens
+            }
+        })
+
+    def app(self):
+        app = web.Application()
+        app.router.add_post('/openai/v1/chat/completions', self._completions)
+        app.router.add_post('/v1/chat/completions', self._completions)
+        return app
+
+    async def start(self):
+        self._runner = web.AppRunner(self.app(), access_log=None)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, self.host, self.port)
+        await site.start()
+        # Порт 0 - вільний порт від системи
+        self.port = self._runner.addresses[0][1]
+        return self
+
+    async def stop(self):
+        if self._runner:
+            await self._runner.cleanup()
+            self._runner = None
+
+    def start_in_thread(self):
+        """Окремий потік зі своїм циклом подій (для процесів-воркерів бенчмарку)"""
+        ready = threading.Event()
+
+        def run():
+            self._loop = asyncio.new_event_loop()
+            self._loop.run_until_complete(self.start())
+            ready.set()
+            self._loop.run_forever()
+            self._loop.run_until_complete(self.stop())
+
+        self._thread = threading.Thread(target=run, name='groq-stub', daemon=True)
+        self._thread.start()
+        ready.wait()
+        return self
+
+    def stop_thread(self):
+        if self._loop:
+            self._loop.call_soon_threadsafe(self._loop.stop)
+            self._thread.join()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Локальний сервер-замінник Groq")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8808)
+    parser.add_argument('--latency-ms', type=float, default=0.0)
+    parser.add_argument('--jitter-ms', type=float, default=0.0)
+    parser.add_argument('--error-rate', type=float, default=0.0)
+    parser.add_argument('--confidence', type=float, default=0.82)
+    parser.add_argument('--response', help="файл з готовим вмістом відповіді (JSON)")
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+
+    canned = open(args.response, encoding='utf-8').read() if args.response else None
+    stub = GroqStub(args.host, args.port, args.latency_ms, args.jitter_ms, args.error_rate, canned,
+                    args.confidence, args.seed)
+    print(f"🧪 Заглушка Groq: {stub.url}")
+    web.run_app(stub.app(), host=args.host, port=args.port, access_log=None, print=None)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,322 @@
+"""
+Локальний замінник сервера PocketOption для навантажувальних тестів і вимірювання затримок.
+
+Говорить тією підмножиною протоколу Socket.IO, яку використовує pocketoptionapi_async:
+рукостискання Engine.IO (0 / 40), auth -> successauth, getBalance -> successupdateBalance,
+changeSymbol -> історія свічок і підписка, updateStream -> тіки підписаних активів (випадкове
+блукання від закриття останньої свічки). Відповіді з даними йдуть як у справжнього сервера:
+текстовий кадр 451-[подія, placeholder] + бінарний кадр JSON.
+Свічки - з MarketSimulator, тож ряди детерміновані й актуальні на поточний час.
+
+Збої вмикаються параметрами: затримка з розкидом, втрата відповідей, розриви з'єднання,
+нульові ціни, відмова авторизації.
+
+Запуск (клієнт під'єднується через POCKET_WS_URL):
+    python benchmarks/pocket_stub.py --port 8765 --latency-ms 50 --jitter-ms 20 --loss 0.01
+    POCKET_WS_URL="wss://127.0.0.1:8765/socket.io/?EIO=4&transport=websocket" python backend/signal_generator.py
+"""
+import argparse
+import asyncio
+import json
+import logging
+import random
+import ssl
+import subprocess
+import sys
+import tempfile
+import time
+import uuid
+from pathlib import Path
+
+import numpy as np
+import websockets
+
+BASE_DIR = Path(__file__).parent.parent
+sys.path.insert(0, str(BASE_DIR))
+sys.path.insert(0, str(BASE_DIR / 'backend'))
+
+from market_simulator import MarketSimulator
+
+logger = logging.getLogger("pocket_stub")
+
+
+def self_signed_context(directory=None):
+    """TLS-контекст із самопідписаним сертифікатом (клієнт бібліотеки працює лише через wss://)"""
+    directory = Path(directory or tempfile.mkdtemp(prefix='pocket_stub_'))
+    cert, key = directory / 'cert.pem', directory / 'key.pem'
+    if not cert.exists():
+        subprocess.run(
+            ['openssl', 'req', '-x509', '-newkey', 'rsa:2048', '-nodes', '-days', '1',
+             '-subj', '/CN=localhost', '-keyout', str(key), '-out', str(cert)],
+            check=True, capture_output=True
+        )
+    context = ssl.SSLContext(ssl.PROTOCOL_TLS_SERVER)
+    context.load_cert_chain(str(cert), str(key))
+    return context
+
+
+class FaultProfile:
+    """Параметри збоїв; ймовірності - на кожну відповідь з даними"""
+
+    def __init__(self, latency_ms=0.0, jitter_ms=0.0, loss=0.0, disconnect=0.0, zero_prices=0.0,
+                 auth_failure=0.0, seed=None):
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.loss = loss
+        self.disconnect = disconnect
+        self.zero_prices = zero_prices
+        self.auth_failure = auth_failure
+        self.rng = random.Random(seed)
+
+    def delay(self):
+        if not self.latency_ms and not self.jitter_ms:
+            return 0.0
+        return max(0.0, self.latency_ms + self.rng.uniform(-self.jitter_ms, self.jitter_ms)) / 1000
+
+    def hit(self, probability):
+        return probability > 0 and self.rng.random() < probability
+
+
+class MarketFeed:
+    """Історія свічок на (актив, таймфрейм), що дорощується до поточного часу"""
+
+    def __init__(self, seed=42, history=150):
+        self.seed = seed
+        self.history = history
+        self._simulators = {}
+        self._series = {}
+        self._ticks = {}  # актив -> [час відкриття поточної свічки, ціна]
+        self._rng = np.random.default_rng(seed)
+
+    def candles(self, asset, period, now=None):
+        """Закриті свічки, останні history штук: рядки [timestamp, open, close, high, low]"""
+        now = now or time.time()
+        aligned = (now // period) * period
+        series = self._series.get((asset, period))
+        simulator = self._simulators.get(period)
+        if simulator is None:
+            simulator = self._simulators[period] = MarketSimulator(seed=self.seed, timeframe=period)
+
+        if series is None:
+            arrays = simulator.generate(asset, self.history, start=aligned - self.history * period)
+            series = np.column_stack([arrays[k] for k in ('timestamp', 'open', 'close', 'high', 'low')])
+        else:
+            missing = int((aligned - series[-1, 0]) // period) - 1
+            if missing > 0:
+                arrays = simulator.generate(asset, missing)
+                fresh = np.column_stack([arrays[k] for k in ('timestamp', 'open', 'close', 'high', 'low')])
+                series = np.concatenate((series, fresh))[-self.history:]
+        self._series[(asset, period)] = series
+        return series
+
+    def last_price(self, asset, period):
+        return float(self.candles(asset, period)[-1, 2])
+
+    def tick(self, asset, period, now=None):
+        """Ціна тіку: випадкове блукання від закриття останньої свічки, заново на кожній межі"""
+        now = now or time.time()
+        bar = (now // period) * period
+        state = self._ticks.get(asset)
+        if state is None or state[0] != bar:
+            state = self._ticks[asset] = [bar, self.last_price(asset, period)]
+        state[1] *= 1 + self._rng.normal(0, 5e-5)
+        return state[1]
+
+
+class PocketOptionStub:
+    """Сервер-замінник: одне з'єднання - один клієнт з власними підписками"""
+
+    def __init__(self, host='127.0.0.1', port=8765, faults=None, feed=None, tick_interval=1.0,
+                 balance=10000.0, tls=True):
+        self.host = host
+        self.port = port
+        self.faults = faults or FaultProfile()
+        self.feed = feed or MarketFeed()
+        self.tick_interval = tick_interval
+        self.balance = balance
+        self.tls = tls
+        self._server = None
+        self.stats = {
+            'connections': 0, 'active': 0, 'auth': 0, 'auth_rejected': 0, 'balance_requests': 0,
+            'candle_requests': 0, 'candles_sent': 0, 'dropped': 0, 'disconnects': 0,
+            'zero_payloads': 0, 'ticks': 0, 'messages_in': 0
+        }
+
+    @property
+    def url(self):
+        scheme = 'wss' if self.tls else 'ws'
+        return f"{scheme}://{self.host}:{self.port}/socket.io/?EIO=4&transport=websocket"
+
+    async def start(self):
+        self._server = await websockets.serve(
+            self._handle, self.host, self.port,
+            ssl=self_signed_context() if self.tls else None,
+            ping_interval=None, max_size=None
+        )
+        # Порт 0 - вільний порт від системи
+        self.port = self._server.sockets[0].getsockname()[1]
+        logger.info(f"🧪 Заглушка PocketOption слухає {self.url}")
+        return self
+
+    async def stop(self):
+        if self._server:
+            self._server.close()
+            await self._server.wait_closed()
+            self._server = None
+
+    async def _send_event(self, websocket, event, payload):
+        """Подія з даними у форматі сервера: placeholder-кадр + бінарний JSON.
+        Пара кадрів не повинна перемежовуватися з іншими відповідями, тому - під замком з'єднання"""
+        body = json.dumps(payload, separators=(',', ':')).encode()
+        async with websocket.send_lock:
+            await websocket.send(f'451-["{event}",{{"_placeholder":true,"num":0}}]')
+            await websocket.send(body)
+
+    async def _reply(self, websocket, event, payload):
+        """Відповідь з урахуванням профілю збоїв (окрема задача: затримки запитів не складаються)"""
+        delay = self.faults.delay()
+        if delay:
+            await asyncio.sleep(delay)
+        if self.faults.hit(self.faults.disconnect):
+            self.stats['disconnects'] += 1
+            await websocket.close(code=1011, reason='stub: injected disconnect')
+            return
+        if self.faults.hit(self.faults.loss):
+            self.stats['dropped'] += 1
+            return
+        try:
+            await self._send_event(websocket, event, payload)
+        except websockets.ConnectionClosed:
+            pass
+
+    def _candles(self, websocket, data, subscriptions):
+        asset = data.get('asset')
+        period = int(data.get('period', 60))
+        self.stats['candle_requests'] += 1
+        subscriptions[asset] = period
+
+        rows = self.feed.candles(asset, period)
+        if self.faults.hit(self.faults.zero_prices):
+            self.stats['zero_payloads'] += 1
+            rows = rows.copy()
+            rows[:, 1:] = 0.0
+        self.stats['candles_sent'] += len(rows)
+        payload = {'asset': asset, 'period': period, 'candles': rows.tolist()}
+        return self._reply(websocket, 'updateHistoryNewFast', payload)
+
+    async def _stream(self, websocket, subscriptions):
+        """Тіки підписаних активів: [[актив, час, ціна], ...] раз на tick_interval"""
+        try:
+            while True:
+                await asyncio.sleep(self.tick_interval)
+                if not subscriptions:
+                    continue
+                now = time.time()
+                ticks = [[asset, now, self.feed.tick(asset, period, now)] for asset, period in subscriptions.items()]
+                self.stats['ticks'] += len(ticks)
+                await self._send_event(websocket, 'updateStream', ticks)
+        except (asyncio.CancelledError, websockets.ConnectionClosed):
+            pass
+
+    async def _handle(self, websocket, path=None):
+        self.stats['connections'] += 1
+        self.stats['active'] += 1
+        subscriptions = {}
+        stream_task = None
+        pending = set()
+        websocket.send_lock = asyncio.Lock()
+        sid = uuid.uuid4().hex[:20]
+        try:
+            await websocket.send('0' + json.dumps({
+                'sid': sid, 'upgrades': [], 'pingInterval': 25000, 'pingTimeout': 20000
+            }))
+            async for message in websocket:
+                self.stats['messages_in'] += 1
+                if isinstance(message, bytes):
+                    continue
+                if message == '40':
+                    await websocket.send('40' + json.dumps({'sid': sid}))
+                    continue
+                if message in ('2', '3'):
+                    if message == '2':
+                        await websocket.send('3')
+                    continue
+                if not message.startswith('42'):
+                    continue
+
+                event, *args = json.loads(message[2:])
+                data = args[0] if args else {}
+                if event == 'auth':
+                    if self.faults.hit(self.faults.auth_failure):
+                        self.stats['auth_rejected'] += 1
+                        await websocket.send('42["NotAuthorized"]')
+                        continue
+                    self.stats['auth'] += 1
+                    await self._send_event(websocket, 'successauth', {'id': sid, 'uid': data.get('uid', 0)})
+                    await self._send_event(websocket, 'successupdateBalance', {
+                        'balance': self.balance, 'isDemo': data.get('isDemo', 1), 'uid': data.get('uid', 0)
+                    })
+                    if stream_task is None and self.tick_interval > 0:
+                        stream_task = asyncio.create_task(self._stream(websocket, subscriptions))
+                elif event == 'getBalance':
+                    self.stats['balance_requests'] += 1
+                    reply = self._reply(websocket, 'successupdateBalance', {'balance': self.balance, 'isDemo': 1})
+                    self._spawn(pending, reply)
+                elif event == 'changeSymbol':
+                    self._spawn(pending, self._candles(websocket, data, subscriptions))
+                # 'ps' та інші службові події відповіді не потребують
+        except websockets.ConnectionClosed:
+            pass
+        finally:
+            if stream_task:
+                stream_task.cancel()
+            for task in pending:
+                task.cancel()
+            self.stats['active'] -= 1
+
+    @staticmethod
+    def _spawn(pending, coroutine):
+        task = asyncio.create_task(coroutine)
+        pending.add(task)
+        task.add_done_callback(pending.discard)
+
+
+async def serve_forever(stub, report_interval):
+    await stub.start()
+    print(f"🧪 Заглушка PocketOption: {stub.url}")
+    try:
+        while True:
+            await asyncio.sleep(report_interval)
+            print(f"📊 {json.dumps(stub.stats, ensure_ascii=False)}")
+    finally:
+        await stub.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Локальний сервер-замінник PocketOption")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--latency-ms', type=float, default=0.0)
+    parser.add_argument('--jitter-ms', type=float, default=0.0)
+    parser.add_argument('--loss', type=float, default=0.0, help="ймовірність не відповісти")
+    parser.add_argument('--disconnect', type=float, default=0.0, help="ймовірність розірвати з'єднання")
+    parser.add_argument('--zero-prices', type=float, default=0.0, help="ймовірність нульових свічок")
+    parser.add_argument('--auth-failure', type=float, default=0.0)
+    parser.add_argument('--history', type=int, default=150, help="свічок в історії")
+    parser.add_argument('--tick-interval', type=float, default=1.0, help="секунд між тіками (0 - без потоку)")
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--report', type=float, default=10.0, help="секунд між звітами")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(message)s')
+    faults = FaultProfile(args.latency_ms, args.jitter_ms, args.loss, args.disconnect, args.zero_prices,
+                          args.auth_failure, seed=args.seed)
+    stub = PocketOptionStub(args.host, args.port, faults, MarketFeed(args.seed, args.history), args.tick_interval)
+    try:
+        asyncio.run(serve_forever(stub, args.report))
+    except KeyboardInterrupt:
+        print(f"\n📊 {json.dumps(stub.stats, ensure_ascii=False)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -19,6 +19,37 @@ class Helpers:
             )
         return "\n".join(formatted)
     
+    @staticmethod
+    def estimate_tokens(text):
+        """Груба оцінка кількості токенів (≈3 символи на токен для цифр і кирилиці)"""
+        return len(text) // 3 + 1
+    
+    @staticmethod
+    def encode_candles_compact(candles, max_candles=30, token_budget=None):
+        """Компактне кодування OHLC: базова ціна + цілі відхилення в кроках ціни.
+        
+        Повертає (рядок, база, крок, кількість свічок). Кількість свічок
+        зменшується, доки рядок не вміститься в token_budget.
+        """
+        if not candles:
+            return "", 0.0, 0.0, 0
+        
+        last_close = candles[-1].close
+        digits = 3 if last_close >= 10 else 5
+        step = 10 ** -digits
+        count = min(max_candles, len(candles))
+        
+        while True:
+            window = candles[-count:]
+            base = round(window[0].open, digits)
+            encoded = " ".join(
+                ",".join(str(int(round((price - base) / step))) for price in (c.open, c.high, c.low, c.close))
+                for c in window
+            )
+            if token_budget is None or count <= 8 or Helpers.estimate_tokens(encoded) <= token_budget:
+                return encoded, base, step, count
+            count -= 1
+    
     @staticmethod
     def calculate_indicators(candles):
         """Розрахунок простих технічних індикаторів"""
@@ -0,0 +1,219 @@
+import math
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+
+class IndicatorEngine:
+    """Векторизований розрахунок технічних індикаторів для багатьох активів одночасно.
+
+    Усі методи працюють з 2-D масивами форми (активи, свічки), тому один
+    прохід рахує індикатори для всього набору активів.
+    """
+
+    RSI_PERIOD = 14
+    MACD_FAST = 12
+    MACD_SLOW = 26
+    MACD_SIGNAL = 9
+    BOLLINGER_PERIOD = 20
+    BOLLINGER_STD = 2.0
+    STOCH_PERIOD = 14
+    STOCH_SMOOTH = 3
+    ATR_PERIOD = 14
+    VOLATILITY_PERIOD = 10
+    MAX_MATRIX_LENGTH = 512
+
+    _weights_cache = {}
+
+    @staticmethod
+    def to_arrays(candles_by_asset, length=None):
+        """Перетворює {актив: свічки} на масиви OHLC форми (активи, свічки).
+
+        Ряди вирівнюються за останніми свічками до спільної довжини.
+        """
+        assets = [asset for asset, candles in candles_by_asset.items() if candles]
+        if not assets:
+            empty = np.empty((0, 0))
+            return [], empty, empty, empty, empty
+
+        if length is None:
+            length = min(len(candles_by_asset[asset]) for asset in assets)
+
+        # Одне створення масиву на всі активи замість масиву на кожен актив
+        flat = np.fromiter(
+            (value
+             for asset in assets
+             for c in candles_by_asset[asset][-length:]
+             for value in (c.open, c.high, c.low, c.close)),
+            dtype=np.float64,
+            count=len(assets) * length * 4
+        )
+        ohlc = flat.reshape(len(assets), length, 4).transpose(2, 0, 1)
+        return assets, ohlc[0], ohlc[1], ohlc[2], ohlc[3]
+
+    @staticmethod
+    def _ewm_weights(length, alpha):
+        """Нижньотрикутна матриця ваг рекурсії y[t] = a*x[t] + (1-a)*y[t-1]"""
+        key = (length, alpha)
+        weights = IndicatorEngine._weights_cache.get(key)
+        if weights is None:
+            t = np.arange(length)
+            lag = t[:, None] - t[None, :]
+            weights = np.where(lag >= 0, alpha * (1 - alpha) ** np.clip(lag, 0, None), 0.0)
+            # Перше значення ряду є початковим станом рекурсії
+            weights[:, 0] = (1 - alpha) ** t
+            IndicatorEngine._weights_cache[key] = weights
+        return weights
+
+    @staticmethod
+    def ewm(values, alpha):
+        """Експоненційне згладжування по осі часу одним матричним множенням"""
+        length = values.shape[-1]
+        if length > IndicatorEngine.MAX_MATRIX_LENGTH:
+            # Для довгих рядів матриця ваг завелика - рекурсія по часу, векторно по активах
+            out = np.empty_like(values, dtype=np.float64)
+            out[..., 0] = values[..., 0]
+            for t in range(1, length):
+                out[..., t] = alpha * values[..., t] + (1 - alpha) * out[..., t - 1]
+            return out
+        return values @ IndicatorEngine._ewm_weights(length, alpha).T
+
+    @staticmethod
+    def ema(values, period):
+        return IndicatorEngine.ewm(values, 2.0 / (period + 1))
+
+    @staticmethod
+    def rsi(close, period=RSI_PERIOD):
+        delta = np.diff(close, axis=1)
+        if delta.shape[1] < period:
+            return np.full(close.shape[0], np.nan)
+        gains = np.clip(delta, 0, None)
+        losses = np.clip(-delta, 0, None)
+        # Згладжування Вайлдера
+        avg_gain = IndicatorEngine.ewm(gains, 1.0 / period)[:, -1]
+        avg_loss = IndicatorEngine.ewm(losses, 1.0 / period)[:, -1]
+        with np.errstate(divide='ignore', invalid='ignore'):
+            rs = avg_gain / avg_loss
+            rsi = 100.0 - 100.0 / (1.0 + rs)
+        rsi = np.where(avg_loss == 0, np.where(avg_gain == 0, 50.0, 100.0), rsi)
+        return rsi
+
+    @staticmethod
+    def macd(close, fast=MACD_FAST, slow=MACD_SLOW, signal=MACD_SIGNAL):
+        macd_line = IndicatorEngine.ema(close, fast) - IndicatorEngine.ema(close, slow)
+        signal_line = IndicatorEngine.ema(macd_line, signal)
+        return macd_line[:, -1], signal_line[:, -1], (macd_line - signal_line)[:, -1]
+
+    @staticmethod
+    def bollinger(close, period=BOLLINGER_PERIOD, num_std=BOLLINGER_STD):
+        if close.shape[1] < period:
+            nan = np.full(close.shape[0], np.nan)
+            return nan, nan, nan
+        window = close[:, -period:]
+        middle = window.mean(axis=1)
+        std = window.std(axis=1)
+        return middle + num_std * std, middle, middle - num_std * std
+
+    @staticmethod
+    def stochastic(high, low, close, period=STOCH_PERIOD, smooth=STOCH_SMOOTH):
+        if close.shape[1] < period + smooth - 1:
+            nan = np.full(close.shape[0], np.nan)
+            return nan, nan
+        highest = sliding_window_view(high, period, axis=1).max(axis=2)
+        lowest = sliding_window_view(low, period, axis=1).min(axis=2)
+        price_range = highest - lowest
+        with np.errstate(divide='ignore', invalid='ignore'):
+            k = np.where(price_range > 0, (close[:, period - 1:] - lowest) / price_range * 100.0, 50.0)
+        d = k[:, -smooth:].mean(axis=1)
+        return k[:, -1], d
+
+    @staticmethod
+    def atr(high, low, close, period=ATR_PERIOD):
+        if close.shape[1] < 2:
+            return np.full(close.shape[0], np.nan)
+        prev_close = close[:, :-1]
+        true_range = np.maximum.reduce([
+            high[:, 1:] - low[:, 1:],
+            np.abs(high[:, 1:] - prev_close),
+            np.abs(low[:, 1:] - prev_close)
+        ])
+        return IndicatorEngine.ewm(true_range, 1.0 / period)[:, -1]
+
+    @staticmethod
+    def volatility(close, period=VOLATILITY_PERIOD):
+        """Розмах цін закриття за period свічок у % від середньої (як GroqAnalyzer)"""
+        if close.shape[1] < period:
+            return np.zeros(close.shape[0])
+        window = close[:, -period:]
+        mean = window.mean(axis=1)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            vol = np.where(mean != 0, (window.max(axis=1) - window.min(axis=1)) / mean * 100.0, 0.0)
+        return np.round(vol, 4)
+
+    @staticmethod
+    def compute(open_, high, low, close):
+        """Усі індикатори для масивів (активи, свічки). Повертає {назва: масив (активи,)}"""
+        ema_9 = IndicatorEngine.ema(close, 9)[:, -1]
+        ema_21 = IndicatorEngine.ema(close, 21)[:, -1]
+        macd, macd_signal, macd_hist = IndicatorEngine.macd(close)
+        bb_upper, bb_middle, bb_lower = IndicatorEngine.bollinger(close)
+        stoch_k, stoch_d = IndicatorEngine.stochastic(high, low, close)
+        price = close[:, -1]
+
+        with np.errstate(divide='ignore', invalid='ignore'):
+            bb_width = bb_upper - bb_lower
+            bb_percent = np.where(bb_width > 0, (price - bb_lower) / bb_width, 0.5)
+
+        return {
+            'price': price,
+            'rsi': IndicatorEngine.rsi(close),
+            'macd': macd,
+            'macd_signal': macd_signal,
+            'macd_hist': macd_hist,
+            'bb_upper': bb_upper,
+            'bb_middle': bb_middle,
+            'bb_lower': bb_lower,
+            'bb_percent': bb_percent,
+            'ema_9': ema_9,
+            'ema_21': ema_21,
+            'stoch_k': stoch_k,
+            'stoch_d': stoch_d,
+            'atr': IndicatorEngine.atr(high, low, close),
+            'volatility': IndicatorEngine.volatility(close)
+        }
+
+    @staticmethod
+    def compute_batch(candles_by_asset):
+        """Індикатори для {актив: свічки} одним проходом. Повертає {актив: {назва: значення}}"""
+        result = {}
+        # Групуємо за довжиною ряду, щоб кожна група була суцільним 2-D масивом
+        by_length = {}
+        for asset, candles in candles_by_asset.items():
+            if candles:
+                by_length.setdefault(len(candles), {})[asset] = candles
+
+        for group in by_length.values():
+            assets, open_, high, low, close = IndicatorEngine.to_arrays(group)
+            values = {name: column.tolist() for name, column in IndicatorEngine.compute(open_, high, low, close).items()}
+            for row, asset in enumerate(assets):
+                result[asset] = {name: column[row] for name, column in values.items()}
+        return result
+
+    @staticmethod
+    def format_for_prompt(indicators):
+        """Компактний текстовий блок індикаторів для промпту"""
+        def fmt(name, digits):
+            value = indicators.get(name)
+            if value is None or math.isnan(value):
+                return "n/a"
+            return f"{value:.{digits}f}"
+
+        price_digits = 3 if indicators.get('price', 0) >= 10 else 5
+        lines = [
+            f"RSI(14): {fmt('rsi', 1)}",
+            f"MACD(12,26,9): {fmt('macd', price_digits + 1)} / signal {fmt('macd_signal', price_digits + 1)} / hist {fmt('macd_hist', price_digits + 1)}",
+            f"Bollinger(20,2): {fmt('bb_lower', price_digits)} - {fmt('bb_middle', price_digits)} - {fmt('bb_upper', price_digits)} (%B {fmt('bb_percent', 2)})",
+            f"EMA9/EMA21: {fmt('ema_9', price_digits)} / {fmt('ema_21', price_digits)}",
+            f"Stochastic(14,3): %K {fmt('stoch_k', 1)} / %D {fmt('stoch_d', 1)}",
+            f"ATR(14): {fmt('atr', price_digits + 1)}"
+        ]
+        return "\n".join(lines)
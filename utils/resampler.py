@@ -0,0 +1,115 @@
+import math
+from datetime import datetime
+import numpy as np
+from utils.indicators import IndicatorEngine
+
+
+class Resampler:
+    """Векторизоване перетворення базового ряду свічок (1 хв) на старші таймфрейми.
+
+    Свічки старшого таймфрейму вирівнюються на межі epoch (5 хв - :00, :05, ...;
+    15 хв - :00, :15, ...), тож збігаються зі свічками брокера. Свічка повна, якщо в ній
+    усі target/base базових свічок і (за заданого now) її інтервал уже минув; інакше -
+    часткова: незакрита остання, обрізана вікном перша або з пропусками всередині.
+    """
+
+    @staticmethod
+    def to_arrays(candles):
+        """Свічки -> (мітки часу epoch, open, high, low, close)"""
+        count = len(candles)
+        flat = np.fromiter(
+            (value for c in candles for value in (c.open, c.high, c.low, c.close)),
+            dtype=np.float64,
+            count=count * 4
+        ).reshape(count, 4).T
+        timestamps = np.fromiter(
+            (int(c.timestamp.timestamp()) if isinstance(c.timestamp, datetime) else int(c.timestamp) for c in candles),
+            dtype=np.int64,
+            count=count
+        )
+        return timestamps, flat[0], flat[1], flat[2], flat[3]
+
+    @staticmethod
+    def resample(timestamps, open_, high, low, close, base, target, now=None):
+        """Свічки таймфрейму target з базового ряду (мітки часу - початок свічки, зростають).
+        Повертає {'timestamp', 'open', 'high', 'low', 'close', 'count', 'complete'}"""
+        if target % base:
+            raise ValueError(f"таймфрейм {target} не кратний базовому {base}")
+        if not len(timestamps):
+            empty = np.empty(0)
+            return {'timestamp': empty.astype(np.int64), 'open': empty, 'high': empty, 'low': empty,
+                    'close': empty, 'count': empty.astype(np.int64), 'complete': empty.astype(bool)}
+
+        buckets = timestamps // target * target
+        starts = np.flatnonzero(np.r_[True, buckets[1:] != buckets[:-1]])
+        ends = np.r_[starts[1:], len(timestamps)] - 1
+        count = ends - starts + 1
+
+        complete = count == target // base
+        if now is not None:
+            complete &= buckets[starts] + target <= now
+
+        return {
+            'timestamp': buckets[starts],
+            'open': open_[starts],
+            'high': np.maximum.reduceat(high, starts),
+            'low': np.minimum.reduceat(low, starts),
+            'close': close[ends],
+            'count': count,
+            'complete': complete
+        }
+
+    @staticmethod
+    def resample_many(candles, base, targets, now=None):
+        """{таймфрейм: свічки} для кількох таймфреймів з одного перетворення ряду"""
+        arrays = Resampler.to_arrays(candles)
+        return {target: Resampler.resample(*arrays, base, target, now=now) for target in targets if target % base == 0}
+
+    @staticmethod
+    def summarize(bars, target, base):
+        """Стислий стан таймфрейму: за повними свічками + незакрита остання"""
+        complete = bars['complete']
+        close = bars['close'][complete]
+        summary = {'timeframe': target, 'bars': int(complete.sum())}
+        if len(close) >= 2:
+            summary['close'] = float(close[-1])
+            summary['change_pct'] = float((close[-1] - close[-2]) / close[-2] * 100) if close[-2] else 0.0
+            series = close[None, :]
+            if len(close) >= 21:
+                ema_9 = IndicatorEngine.ema(series, 9)[0, -1]
+                ema_21 = IndicatorEngine.ema(series, 21)[0, -1]
+                summary['trend'] = 'UP' if ema_9 > ema_21 else 'DOWN'
+            rsi = float(IndicatorEngine.rsi(series)[0])
+            if not math.isnan(rsi):
+                summary['rsi'] = rsi
+            # Положення ціни в діапазоні повних свічок: 0 - мінімум, 1 - максимум
+            low, high = bars['low'][complete].min(), bars['high'][complete].max()
+            summary['range_position'] = float((close[-1] - low) / (high - low)) if high > low else 0.5
+        if len(bars['complete']) and not bars['complete'][-1]:
+            summary['forming'] = f"{int(bars['count'][-1])}/{target // base}"
+            summary['forming_change_pct'] = (
+                float((bars['close'][-1] - bars['open'][-1]) / bars['open'][-1] * 100) if bars['open'][-1] else 0.0
+            )
+        return summary
+
+    @staticmethod
+    def format_for_prompt(summaries, language='uk'):
+        """Рядок на кожен таймфрейм для промпту"""
+        if not summaries:
+            return ""
+        ru = language == 'ru'
+        lines = ["Старшие таймфреймы:" if ru else "Старші таймфрейми:"]
+        for summary in summaries:
+            if 'close' not in summary:
+                continue
+            label = f"{summary['timeframe'] // 60}m"
+            parts = [f"{summary['bars']} {'свечей' if ru else 'свічок'}", f"Δ {summary['change_pct']:+.3f}%"]
+            if 'trend' in summary:
+                parts.append(f"EMA9/21 {summary['trend']}")
+            if 'rsi' in summary:
+                parts.append(f"RSI {summary['rsi']:.1f}")
+            parts.append(f"{'диапазон' if ru else 'діапазон'} {summary['range_position']:.2f}")
+            if 'forming' in summary:
+                parts.append(f"{'незакрыта' if ru else 'незакрита'} {summary['forming']} ({summary['forming_change_pct']:+.3f}%)")
+            lines.append(f"{label}: " + ", ".join(parts))
+        return "\n".join(lines) if len(lines) > 1 else ""